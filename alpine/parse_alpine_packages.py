@@ -2,77 +2,112 @@
 
 import os
 import sys
-import csv
 import logging
-import requests
 from pathlib import Path
-from typing import Dict, List, Optional, Iterator
+from typing import BinaryIO, Dict, Optional, Iterator, Union
 import re
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils import LicenseDetector, SHASplitter, PURLGenerator, SignatureVerifier
+from utils import SPDXNormalizer, SHASplitter, PURLGenerator, SignatureVerifier, StanzaParser, PackageWriter, HTTPClient, MetadataCache
+from utils.package_writer import FIELDNAMES, FORMATS
+from utils.catalog import DEFAULT_CATALOG
+from utils.compression import iter_tar_members
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class AlpinePackageParser:
+    PACKAGE_FIELDS = ('P', 'V', 'C', 'F', 'L')
+    FIELDNAMES = FIELDNAMES + ['checksum_sha1', 'checksum_sha256']
+    
     def __init__(self):
-        self.license_detector = LicenseDetector()
+        self.spdx_normalizer = SPDXNormalizer()
         self.sha_splitter = SHASplitter()
         self.purl_generator = PURLGenerator()
         self.signature_verifier = SignatureVerifier()
+        self.stanza_parser = StanzaParser(self.PACKAGE_FIELDS)
         self.verify_signatures = True
+        # Output file format: csv, parquet or arrow (the last two need pyarrow)
+        self.output_format = 'csv'
+        # SQLite catalog that also receives the rows (None = CSV / columnar output only)
+        self.catalog_path = None
+        self.http_client = HTTPClient()
+        # Repository indexes downloaded concurrently
+        self.download_workers = 4
         
         self.script_dir = Path(__file__).parent
         self.output_dir = self.script_dir.parent / "output" / "alpine"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.metadata_cache = MetadataCache(self.script_dir.parent / "temp" / "alpine" / "metadata_cache", self.http_client)
         
         self.alpine_releases = ["3.18", "3.19", "3.20"]
         self.architectures = ["x86_64", "aarch64"]
         self.repositories = ["main", "community"]
     
-    def download_and_parse_apkindex(self, release: str, arch: str, repo: str) -> Iterator[Dict[str, str]]:
-        """Download and parse Alpine APKINDEX."""
-        base_url = f"https://dl-cdn.alpinelinux.org/alpine/v{release}/{repo}/{arch}/APKINDEX.tar.gz"
+    def apkindex_url(self, release: str, arch: str, repo: str) -> str:
+        """URL of the APKINDEX of one repository."""
+        return f"https://dl-cdn.alpinelinux.org/alpine/v{release}/{repo}/{arch}/APKINDEX.tar.gz"
+    
+    def fetch_apkindex(self, release: str, arch: str, repo: str) -> Optional[Path]:
+        """Download one APKINDEX into the metadata cache (run from the download pool); None if the download failed."""
+        logger.info(f"Processing Alpine {release} {arch} {repo}")
+        base_url = self.apkindex_url(release, arch, repo)
         
         try:
             logger.info(f"Downloading APKINDEX from {base_url}")
-            response = requests.get(base_url, timeout=60)
-            response.raise_for_status()
-            
-            import tarfile
-            import io
-            
-            with tarfile.open(fileobj=io.BytesIO(response.content), mode='r:gz') as tar:
-                apkindex_member = tar.getmember('APKINDEX')
-                apkindex_content = tar.extractfile(apkindex_member).read().decode('utf-8')
-            
-            yield from self.parse_apkindex_content(apkindex_content, release, arch, repo)
+            return self.metadata_cache.fetch(base_url, timeout=60)
             
         except Exception as e:
             logger.error(f"Error processing Alpine {release} {arch} {repo}: {e}")
+            return None
     
-    def parse_apkindex_content(self, content: str, release: str, arch: str, repo: str) -> Iterator[Dict[str, str]]:
-        """Parse APKINDEX content and yield package metadata."""
-        current_package = {}
-        
-        for line in content.split('\n'):
-            line = line.strip()
+    def parse_apkindex(self, apkindex_path: Optional[Path], release: str, arch: str, repo: str) -> Iterator[Dict[str, str]]:
+        """Stream the rows of an APKINDEX downloaded by fetch_apkindex (nothing if its download failed)."""
+        if apkindex_path is None:
+            return
+        try:
+            yield from self.parse_apkindex_archive(apkindex_path, release, arch, repo,
+                                                   name=self.apkindex_url(release, arch, repo))
+        except Exception as e:
+            logger.error(f"Error processing Alpine {release} {arch} {repo}: {e}")
+    
+    def download_and_parse_apkindex(self, release: str, arch: str, repo: str) -> Iterator[Dict[str, str]]:
+        """Download and parse Alpine APKINDEX."""
+        yield from self.parse_apkindex(self.fetch_apkindex(release, arch, repo), release, arch, repo)
+    
+    def parse_apkindex_archive(self, source: Union[str, Path, BinaryIO], release: str, arch: str, repo: str,
+                               name: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """
+        Parse an APKINDEX.tar.gz straight from a file or HTTP response stream.
+        
+        The archive is decompressed and untarred on the fly and the APKINDEX
+        member is parsed in chunks, so the index is never held in memory.
+        
+        Args:
+            source: Path to APKINDEX.tar.gz or a binary file object
+            release: Alpine release
+            arch: Architecture
+            repo: Repository (main, community)
+            name: File name or URL used to detect the compression of a file object
             
-            if not line:
-                if current_package:
-                    metadata = self.extract_package_metadata(current_package, release, repo, arch)
+        Returns:
+            Iterator of package metadata dictionaries
+        """
+        for member, fileobj in iter_tar_members(source, name or 'APKINDEX.tar.gz'):
+            if member.name == 'APKINDEX':
+                for package in self.stanza_parser.iter_stanzas(fileobj, member.name):
+                    metadata = self.extract_package_metadata(package, release, repo, arch)
                     if metadata:
                         yield metadata
-                    current_package = {}
-                continue
-            
-            if ':' in line:
-                key, value = line.split(':', 1)
-                current_package[key] = value.strip()
-        
-        if current_package:
-            metadata = self.extract_package_metadata(current_package, release, repo, arch)
+                return
+        logger.warning(f"No APKINDEX member found for Alpine {release} {arch} {repo}")
+    
+    def parse_apkindex_content(self, content: Union[str, bytes], release: str, arch: str, repo: str) -> Iterator[Dict[str, str]]:
+        """Parse already extracted APKINDEX content and yield package metadata."""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        for package in self.stanza_parser.iter_buffer(content):
+            metadata = self.extract_package_metadata(package, release, repo, arch)
             if metadata:
                 yield metadata
     
@@ -84,8 +119,13 @@ class AlpinePackageParser:
         if not name or not version:
             return None
         
-        checksum = package.get('C', '')
-        sha256, sha512 = self.sha_splitter.extract_hashes(checksum)
+        # C: is a base64 digest of the package's control segment, "Q1" for
+        # SHA-1 and "Q2" for SHA-256 (apk-tools v3 indexes). It is not the
+        # digest of the .apk file, so sha256 / sha512 stay empty.
+        checksum_type, checksum = self.sha_splitter.decode_apk_checksum(package.get('C', ''))
+        checksum_sha256 = checksum if checksum_type == 'sha256' else ''
+        sha1 = checksum if checksum_type == 'sha1' else ''
+        sha256 = sha512 = ''
         
         filename = package.get('F', '')
         if filename:
@@ -95,8 +135,7 @@ class AlpinePackageParser:
         
         license_info = package.get('L', '')
         if license_info:
-            detected_license = self.license_detector.detect_license(license_info)
-            license_info = detected_license if detected_license else license_info
+            license_info = self.spdx_normalizer.normalize(license_info)
         else:
             license_info = "Unknown"
         
@@ -124,47 +163,33 @@ class AlpinePackageParser:
             'release': f"alpine{release}",
             'signature_verified': signature_info['verified'],
             'signature_method': signature_info['method'],
-            'signer': signature_info['signer']
+            'signer': signature_info['signer'],
+            'checksum_sha1': sha1,
+            'checksum_sha256': checksum_sha256
         }
     
     def process_all_packages(self):
         """Process all Alpine repositories."""
         logger.info("Starting Alpine package processing")
         
-        all_packages = []
-        
-        for release in self.alpine_releases:
-            for arch in self.architectures:
-                for repo in self.repositories:
-                    logger.info(f"Processing Alpine {release} {arch} {repo}")
-                    
-                    package_count = 0
-                    for metadata in self.download_and_parse_apkindex(release, arch, repo):
-                        all_packages.append(metadata)
-                        package_count += 1
-                    
-                    logger.info(f"Processed {package_count} packages from Alpine {release} {arch} {repo}")
-        
-        if all_packages:
-            output_file = self.output_dir / "alpine_packages.csv"
-            self.write_csv(all_packages, output_file)
-            logger.info(f"Written {len(all_packages)} packages to {output_file}")
-        else:
+        tasks = [(release, arch, repo)
+                 for release in self.alpine_releases
+                 for arch in self.architectures
+                 for repo in self.repositories]
+        
+        with PackageWriter(self.output_dir, "alpine", per_release=False, fieldnames=self.FIELDNAMES,
+                           output_format=self.output_format, catalog=self.catalog_path) as writer:
+            # Only the downloads run in the pool; each index is parsed and streamed here, in order
+            downloads = self.http_client.fan_out(self.fetch_apkindex, tasks, self.download_workers)
+            for (release, arch, repo), apkindex_path in zip(tasks, downloads):
+                package_count = writer.write_rows(self.parse_apkindex(apkindex_path, release, arch, repo))
+                
+                logger.info(f"Processed {package_count} packages from Alpine {release} {arch} {repo}")
+        
+        if not writer.total:
             logger.warning("No packages processed")
-    
-    def write_csv(self, packages: List[Dict[str, str]], output_file: Path):
-        """Write packages to CSV file."""
-        fieldnames = ['package', 'version', 'sha256', 'sha512', 'component', 
-                     'architecture', 'deb_url', 'license', 'purl', 'release',
-                     'signature_verified', 'signature_method', 'signer']
         
-        try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(packages)
-        except Exception as e:
-            logger.error(f"Error writing CSV file {output_file}: {e}")
+        logger.info(f"Metadata cache: {self.metadata_cache.format_stats()}")
     
     def get_apk_signature_info(self) -> Dict[str, str]:
         """Get APK signature verification information for Alpine."""
@@ -181,7 +206,18 @@ class AlpinePackageParser:
             return {'verified': 'error', 'method': 'signature check failed', 'signer': 'N/A'}
 
 def main():
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description='Parse Alpine packages')
+    arg_parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                            help='Output file format (parquet and arrow need pyarrow)')
+    arg_parser.add_argument('--catalog', nargs='?', const=str(DEFAULT_CATALOG), metavar='DB',
+                            help=f'Also load the rows into a SQLite catalog (default: {DEFAULT_CATALOG})')
+    args = arg_parser.parse_args()
+    
     parser = AlpinePackageParser()
+    parser.output_format = args.format
+    parser.catalog_path = args.catalog
     parser.process_all_packages()
 
 if __name__ == "__main__":
@@ -2,40 +2,41 @@
 
 import os
 import sys
-import csv
 import logging
-import requests
-import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List, Optional, Iterator
-import gzip
-import tempfile
+from typing import Dict, List, Optional, Iterator, Tuple
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils import LicenseDetector, SHASplitter, PURLGenerator, SignatureVerifier
+from utils import SPDXNormalizer, SHASplitter, PURLGenerator, SignatureVerifier, RepodataReader, RpmPackage, PackageWriter, HTTPClient, MetadataCache
+from utils.package_writer import FORMATS
+from utils.catalog import DEFAULT_CATALOG
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class AmazonLinuxPackageParser:
     def __init__(self):
-        self.license_detector = LicenseDetector()
+        self.spdx_normalizer = SPDXNormalizer()
         self.sha_splitter = SHASplitter()
         self.purl_generator = PURLGenerator()
         self.signature_verifier = SignatureVerifier()
+        self.repodata_reader = RepodataReader()
         self.verify_signatures = True
+        # Output file format: csv, parquet or arrow (the last two need pyarrow)
+        self.output_format = 'csv'
+        # SQLite catalog that also receives the rows (None = CSV / columnar output only)
+        self.catalog_path = None
+        self.http_client = HTTPClient()
+        # Repository indexes downloaded concurrently
+        self.download_workers = 4
         
         self.script_dir = Path(__file__).parent
         self.output_dir = self.script_dir.parent / "output" / "amazonlinux"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.metadata_cache = MetadataCache(self.script_dir.parent / "temp" / "amazonlinux" / "metadata_cache", self.http_client)
         
         self.amazon_releases = ["2", "2023"]
         self.architectures = ["x86_64", "aarch64"]
-        
-        self.namespaces = {
-            'rpm': 'http://linux.duke.edu/metadata/common',
-            'repo': 'http://linux.duke.edu/metadata/repo'
-        }
     
     def get_repo_urls(self, release: str, arch: str) -> List[Dict[str, str]]:
         """Get repository URLs for Amazon Linux releases."""
@@ -60,110 +61,62 @@ class AmazonLinuxPackageParser:
     
     def download_and_parse_repo(self, release: str, arch: str, repo_info: Dict[str, str]) -> Iterator[Dict[str, str]]:
         """Download and parse an Amazon Linux repository."""
+        yield from self.parse_repo(self.fetch_repo(release, arch, repo_info), release, arch, repo_info['name'])
+    
+    def parse_repo(self, fetched: Optional[Tuple[Path, str, str]], release: str, arch: str, repo: str) -> Iterator[Dict[str, str]]:
+        """Stream the rows of a repository downloaded by fetch_repo (nothing if its download failed)."""
+        if fetched is None:
+            return
+        primary_path, primary_url, mirror_url = fetched
+        yield from self.parse_primary_xml_stream(primary_path, primary_url, release, arch, repo, mirror_url)
+    
+    def fetch_repo(self, release: str, arch: str, repo_info: Dict[str, str]) -> Optional[Tuple[Path, str, str]]:
+        """
+        Download the primary metadata of one repository into the metadata cache (run from the download pool).
+        
+        Returns:
+            Tuple of (cached primary path, primary URL, mirror URL), or None if the download failed
+        """
+        logger.info(f"Processing Amazon Linux {release} {arch} {repo_info['name']}")
         try:
             # Get mirror list
-            response = requests.get(repo_info["url"], timeout=30)
+            response = self.http_client.get(repo_info["url"], timeout=30)
             response.raise_for_status()
             
             mirror_urls = [line.strip() for line in response.text.split('\n') if line.strip().startswith('http')]
             if not mirror_urls:
                 logger.error(f"No mirrors found for Amazon Linux {release} {arch} {repo_info['name']}")
-                return
+                return None
             
             mirror_url = mirror_urls[0].rstrip('/')
             repomd_url = f"{mirror_url}/repodata/repomd.xml"
             
             logger.info(f"Downloading repomd.xml from {repomd_url}")
-            repomd_response = requests.get(repomd_url, timeout=30)
-            repomd_response.raise_for_status()
-            
-            root = ET.fromstring(repomd_response.content)
-            
-            primary_location = None
-            for data in root.findall('.//{http://linux.duke.edu/metadata/repo}data'):
-                if data.get('type') == 'primary':
-                    location_elem = data.find('.//{http://linux.duke.edu/metadata/repo}location')
-                    if location_elem is not None:
-                        primary_location = location_elem.get('href')
-                        break
+            repomd_path = self.metadata_cache.fetch(repomd_url, timeout=30)
             
-            if not primary_location:
+            primary = self.repodata_reader.find_primary(repomd_path.read_bytes())
+            if primary is None or not primary.href:
                 logger.error(f"Primary metadata not found for {release} {arch} {repo_info['name']}")
-                return
+                return None
             
+            primary_location = primary.href
             primary_url = f"{mirror_url}/{primary_location}"
             logger.info(f"Downloading primary metadata from {primary_url}")
             
-            primary_response = requests.get(primary_url, timeout=60)
-            primary_response.raise_for_status()
-            
-            with tempfile.NamedTemporaryFile() as temp_file:
-                temp_file.write(primary_response.content)
-                temp_file.flush()
-                
-                if primary_url.endswith('.gz'):
-                    with gzip.open(temp_file.name, 'rt', encoding='utf-8') as f:
-                        content = f.read()
-                else:
-                    with open(temp_file.name, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                
-                yield from self.parse_primary_xml_content(content, release, arch, repo_info['name'], mirror_url)
+            # Skipped entirely when a primary with the checksum repomd.xml lists is already cached
+            primary_path = self.metadata_cache.fetch_verified(primary_url, primary.checksum_type, primary.checksum, timeout=60)
+            return primary_path, primary_url, mirror_url
                 
         except Exception as e:
             logger.error(f"Error processing Amazon Linux {release} {arch} {repo_info['name']}: {e}")
+            return None
     
-    def parse_primary_xml_content(self, content: str, release: str, arch: str, repo: str, mirror_url: str) -> Iterator[Dict[str, str]]:
-        """Parse primary.xml content and yield package metadata."""
+    def parse_primary_xml_stream(self, stream, name: str, release: str, arch: str, repo: str, mirror_url: str) -> Iterator[Dict[str, str]]:
+        """Parse a (compressed) primary.xml stream and yield package metadata."""
         try:
-            root = ET.fromstring(content)
-            
-            for package in root.findall('.//rpm:package', self.namespaces):
+            for package in self.repodata_reader.iter_records(stream, name):
                 try:
-                    pkg_data = {}
-                    
-                    # Get package name from child element, not attribute
-                    name_elem = package.find('rpm:name', self.namespaces)
-                    pkg_data['name'] = name_elem.text if name_elem is not None else ''
-                    
-                    # Get architecture from child element
-                    arch_elem = package.find('rpm:arch', self.namespaces)
-                    pkg_data['arch'] = arch_elem.text if arch_elem is not None else ''
-                    
-                    version_elem = package.find('rpm:version', self.namespaces)
-                    if version_elem is not None:
-                        epoch = version_elem.get('epoch', '0')
-                        ver = version_elem.get('ver', '')
-                        rel = version_elem.get('rel', '')
-                        
-                        if epoch and epoch != '0':
-                            pkg_data['version'] = f"{epoch}:{ver}-{rel}"
-                        else:
-                            pkg_data['version'] = f"{ver}-{rel}"
-                        
-                        pkg_data['epoch'] = epoch
-                        pkg_data['ver'] = ver
-                        pkg_data['rel'] = rel
-                    
-                    location_elem = package.find('rpm:location', self.namespaces)
-                    if location_elem is not None:
-                        href = location_elem.get('href', '')
-                        pkg_data['rpm_url'] = f"{mirror_url}/{href}"
-                    
-                    checksum_elem = package.find('rpm:checksum', self.namespaces)
-                    if checksum_elem is not None:
-                        checksum_type = checksum_elem.get('type', '').lower()
-                        checksum_value = checksum_elem.text or ''
-                        if checksum_type == 'sha256':
-                            pkg_data['sha256'] = checksum_value
-                    
-                    format_elem = package.find('rpm:format', self.namespaces)
-                    if format_elem is not None:
-                        license_elem = format_elem.find('rpm:license', self.namespaces)
-                        if license_elem is not None:
-                            pkg_data['license'] = license_elem.text or ''
-                    
-                    metadata = self.extract_package_metadata(pkg_data, release, repo, arch)
+                    metadata = self.extract_package_metadata(package, release, repo, arch, mirror_url)
                     if metadata:  # Only yield valid packages
                         yield metadata
                     
@@ -174,25 +127,23 @@ class AmazonLinuxPackageParser:
         except Exception as e:
             logger.error(f"Error parsing XML content: {e}")
     
-    def extract_package_metadata(self, package: Dict[str, str], release: str, repo: str, architecture: str) -> Optional[Dict[str, str]]:
+    def extract_package_metadata(self, package: RpmPackage, release: str, repo: str, architecture: str, mirror_url: str) -> Optional[Dict[str, str]]:
         """Extract and normalize package metadata."""
-        name = package.get('name', '').strip()
-        version = package.get('version', '').strip()
-        ver = package.get('ver', '').strip()
+        name = package.name.strip()
+        version = package.version.strip()
+        ver = package.ver.strip()
         
         # Skip packages without required fields
         if not name or not ver:
             return None
         
-        sha256 = package.get('sha256', '')
-        sha512 = ''
+        sha256, sha512 = self.sha_splitter.extract_checksum(package.checksum_type, package.checksum)
         
-        rpm_url = package.get('rpm_url', '')
+        rpm_url = f"{mirror_url}/{package.location_href}" if package.location_href else ''
         
-        license_info = package.get('license', '')
+        license_info = package.license
         if license_info:
-            detected_license = self.license_detector.detect_license(license_info)
-            license_info = detected_license if detected_license else license_info
+            license_info = self.spdx_normalizer.normalize(license_info)
         else:
             license_info = "Unknown"
         
@@ -200,9 +151,9 @@ class AmazonLinuxPackageParser:
             name=name,
             version=ver,
             distribution="amazonlinux",
-            release=package.get('rel', ''),
+            release=package.rel,
             architecture=architecture,
-            epoch=package.get('epoch', '0') if package.get('epoch', '0') != '0' else None
+            epoch=package.epoch if package.epoch != '0' else None
         )
         
         # Get signature verification info
@@ -212,8 +163,8 @@ class AmazonLinuxPackageParser:
         return {
             'package': name,
             'version': version,
-            'sha256': sha256,
-            'sha512': sha512,
+            'sha256': sha256 or '',
+            'sha512': sha512 or '',
             'component': repo,
             'architecture': architecture,
             'deb_url': rpm_url,
@@ -229,42 +180,24 @@ class AmazonLinuxPackageParser:
         """Process all Amazon Linux repositories."""
         logger.info("Starting Amazon Linux package processing")
         
-        all_packages = []
+        tasks = [(release, arch, repo_info)
+                 for release in self.amazon_releases
+                 for arch in self.architectures
+                 for repo_info in self.get_repo_urls(release, arch)]
         
-        for release in self.amazon_releases:
-            for arch in self.architectures:
-                repo_urls = self.get_repo_urls(release, arch)
+        with PackageWriter(self.output_dir, "amazonlinux", per_release=False,
+                           output_format=self.output_format, catalog=self.catalog_path) as writer:
+            # Only the downloads run in the pool; each repository is parsed and streamed here, in order
+            downloads = self.http_client.fan_out(self.fetch_repo, tasks, self.download_workers)
+            for (release, arch, repo_info), fetched in zip(tasks, downloads):
+                package_count = writer.write_rows(self.parse_repo(fetched, release, arch, repo_info['name']))
                 
-                for repo_info in repo_urls:
-                    logger.info(f"Processing Amazon Linux {release} {arch} {repo_info['name']}")
-                    
-                    package_count = 0
-                    for metadata in self.download_and_parse_repo(release, arch, repo_info):
-                        all_packages.append(metadata)
-                        package_count += 1
-                    
-                    logger.info(f"Processed {package_count} packages from Amazon Linux {release} {arch} {repo_info['name']}")
+                logger.info(f"Processed {package_count} packages from Amazon Linux {release} {arch} {repo_info['name']}")
         
-        if all_packages:
-            output_file = self.output_dir / "amazonlinux_packages.csv"
-            self.write_csv(all_packages, output_file)
-            logger.info(f"Written {len(all_packages)} packages to {output_file}")
-        else:
+        if not writer.total:
             logger.warning("No packages processed")
-    
-    def write_csv(self, packages: List[Dict[str, str]], output_file: Path):
-        """Write packages to CSV file."""
-        fieldnames = ['package', 'version', 'sha256', 'sha512', 'component', 
-                     'architecture', 'deb_url', 'license', 'purl', 'release',
-                     'signature_verified', 'signature_method', 'signer']
         
-        try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(packages)
-        except Exception as e:
-            logger.error(f"Error writing CSV file {output_file}: {e}")
+        logger.info(f"Metadata cache: {self.metadata_cache.format_stats()}")
     
     def get_rpm_signature_info(self) -> Dict[str, str]:
         """Get RPM signature verification information for Amazon Linux."""
@@ -281,7 +214,18 @@ class AmazonLinuxPackageParser:
             return {'verified': 'error', 'method': 'signature check failed', 'signer': 'N/A'}
 
 def main():
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description='Parse Amazon Linux packages')
+    arg_parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                            help='Output file format (parquet and arrow need pyarrow)')
+    arg_parser.add_argument('--catalog', nargs='?', const=str(DEFAULT_CATALOG), metavar='DB',
+                            help=f'Also load the rows into a SQLite catalog (default: {DEFAULT_CATALOG})')
+    args = arg_parser.parse_args()
+    
     parser = AmazonLinuxPackageParser()
+    parser.output_format = args.format
+    parser.catalog_path = args.catalog
     parser.process_all_packages()
 
 if __name__ == "__main__":
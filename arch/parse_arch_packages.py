@@ -2,84 +2,136 @@
 
 import os
 import sys
-import csv
 import logging
-import requests
 from pathlib import Path
-from typing import Dict, List, Optional, Iterator
+from typing import BinaryIO, Dict, Optional, Iterator, Union
 import json
-import gzip
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils import LicenseDetector, SHASplitter, PURLGenerator, SignatureVerifier
+from utils import SPDXNormalizer, SHASplitter, PURLGenerator, SignatureVerifier, PackageWriter, HTTPClient, MetadataCache
+from utils.package_writer import FORMATS
+from utils.catalog import DEFAULT_CATALOG
+from utils.compression import iter_tar_members
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class ArchPackageParser:
+    DESC_SECTIONS = ('name', 'version', 'license', 'sha256sum', 'filename')
+    
     def __init__(self):
-        self.license_detector = LicenseDetector()
+        self.spdx_normalizer = SPDXNormalizer()
         self.sha_splitter = SHASplitter()
         self.purl_generator = PURLGenerator()
         self.signature_verifier = SignatureVerifier()
         self.verify_signatures = True
+        # Output file format: csv, parquet or arrow (the last two need pyarrow)
+        self.output_format = 'csv'
+        # SQLite catalog that also receives the rows (None = CSV / columnar output only)
+        self.catalog_path = None
+        self.http_client = HTTPClient()
+        # Repository indexes downloaded concurrently
+        self.download_workers = 4
         
         self.script_dir = Path(__file__).parent
         self.output_dir = self.script_dir.parent / "output" / "arch"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.metadata_cache = MetadataCache(self.script_dir.parent / "temp" / "arch" / "metadata_cache", self.http_client)
         
         self.architectures = ["x86_64", "aarch64"]
         self.repositories = ["core", "extra"]
         
         self.x86_64_mirror = "https://mirror.rackspace.com/archlinux"
         self.aarch64_mirror = "http://mirror.archlinuxarm.org"
+        # ".db.tar.zst" needs the optional zstandard package
+        self.db_extension = ".db.tar.gz"
+        
+        self._desc_sections = {f"%{section.upper()}%".encode(): section for section in self.DESC_SECTIONS}
     
-    def download_and_parse_repo_db(self, arch: str, repo: str) -> Iterator[Dict[str, str]]:
-        """Download and parse Arch repository database."""
+    def repo_db_url(self, arch: str, repo: str) -> str:
+        """URL of the database of one repository."""
         if arch == "x86_64":
-            db_url = f"{self.x86_64_mirror}/{repo}/os/{arch}/{repo}.db.tar.gz"
-        else:  # aarch64
-            db_url = f"{self.aarch64_mirror}/aarch64/{repo}/{repo}.db.tar.gz"
+            return f"{self.x86_64_mirror}/{repo}/os/{arch}/{repo}{self.db_extension}"
+        # aarch64
+        return f"{self.aarch64_mirror}/aarch64/{repo}/{repo}{self.db_extension}"
+    
+    def fetch_repo_db(self, arch: str, repo: str) -> Optional[Path]:
+        """Download one repository database into the metadata cache (run from the download pool); None if the download failed."""
+        logger.info(f"Processing Arch Linux {arch} {repo}")
+        db_url = self.repo_db_url(arch, repo)
         
         try:
             logger.info(f"Downloading repository database from {db_url}")
-            response = requests.get(db_url, timeout=120)
-            response.raise_for_status()
-            
-            import tarfile
-            import io
-            
-            with tarfile.open(fileobj=io.BytesIO(response.content), mode='r:gz') as tar:
-                for member in tar.getmembers():
-                    if member.name.endswith('/desc'):
-                        desc_content = tar.extractfile(member).read().decode('utf-8')
-                        package_data = self.parse_desc_file(desc_content)
-                        if package_data:
-                            metadata = self.extract_package_metadata(package_data, repo, arch)
-                            if metadata:
-                                yield metadata
+            return self.metadata_cache.fetch(db_url, timeout=120)
             
         except Exception as e:
             logger.error(f"Error processing Arch {arch} {repo}: {e}")
+            return None
     
-    def parse_desc_file(self, content: str) -> Optional[Dict[str, str]]:
-        """Parse a desc file from Arch repository database."""
-        package_data = {}
-        current_section = None
+    def parse_fetched_repo_db(self, db_path: Optional[Path], arch: str, repo: str) -> Iterator[Dict[str, str]]:
+        """Stream the rows of a database downloaded by fetch_repo_db (nothing if its download failed)."""
+        if db_path is None:
+            return
+        try:
+            yield from self.parse_repo_db(db_path, repo, arch, name=self.repo_db_url(arch, repo))
+        except Exception as e:
+            logger.error(f"Error processing Arch {arch} {repo}: {e}")
+    
+    def download_and_parse_repo_db(self, arch: str, repo: str) -> Iterator[Dict[str, str]]:
+        """Download and parse Arch repository database."""
+        yield from self.parse_fetched_repo_db(self.fetch_repo_db(arch, repo), arch, repo)
+    
+    def parse_repo_db(self, source: Union[str, Path, BinaryIO], repo: str, arch: str,
+                      name: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """
+        Parse a repository database (.db.tar.gz or .db.tar.zst) in a single streaming pass.
+        
+        Members are read in archive order straight from the file or HTTP
+        response, so memory use stays constant however large the repository is.
+        
+        Args:
+            source: Path to the database or a binary file object
+            repo: Repository (core, extra)
+            arch: Architecture
+            name: File name or URL used to detect the compression of a file object
+            
+        Returns:
+            Iterator of package metadata dictionaries
+        """
+        for member, fileobj in iter_tar_members(source, name):
+            if member.name.endswith('/desc'):
+                package_data = self.parse_desc_file(fileobj.read())
+                if package_data:
+                    metadata = self.extract_package_metadata(package_data, repo, arch)
+                    if metadata:
+                        yield metadata
+    
+    def parse_desc_file(self, content: Union[str, bytes]) -> Optional[Dict[str, str]]:
+        """
+        Parse a desc file from Arch repository database.
+        
+        Only the DESC_SECTIONS are decoded; multi-line values (e.g. several
+        licenses) are joined with spaces.
         
-        for line in content.split('\n'):
-            line = line.strip()
+        Args:
+            content: Raw desc file
             
-            if line.startswith('%') and line.endswith('%'):
-                current_section = line[1:-1].lower()
+        Returns:
+            Dictionary of lowercase section name to value, or None without a name
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        package_data = {}
+        
+        # Sections are "%NAME%\nvalue\n[value\n...]" separated by blank lines
+        for section in content.split(b'\n\n'):
+            header, _, body = section.strip().partition(b'\n')
+            key = self._desc_sections.get(header.strip())
+            if key is None:
                 continue
-            
-            if line and current_section:
-                if current_section in ['name', 'version', 'desc', 'url', 'arch', 'license', 'md5sum', 'sha256sum', 'filename']:
-                    if current_section in package_data:
-                        package_data[current_section] += f" {line}"
-                    else:
-                        package_data[current_section] = line
+            value = ' '.join(line.strip() for line in body.decode('utf-8', 'ignore').split('\n') if line.strip())
+            if value:
+                package_data[key] = f"{package_data[key]} {value}" if key in package_data else value
         
         return package_data if package_data.get('name') else None
     
@@ -91,8 +143,7 @@ class ArchPackageParser:
         if not name or not version:
             return None
         
-        sha256 = package.get('sha256sum', '')
-        sha512 = ''
+        sha256, sha512 = self.sha_splitter.extract_known_hashes(package, 'alpm')
         
         filename = package.get('filename', '')
         if filename:
@@ -105,8 +156,7 @@ class ArchPackageParser:
         
         license_info = package.get('license', '')
         if license_info:
-            detected_license = self.license_detector.detect_license(license_info)
-            license_info = detected_license if detected_license else license_info
+            license_info = self.spdx_normalizer.normalize(license_info)
         else:
             license_info = "Unknown"
         
@@ -124,8 +174,8 @@ class ArchPackageParser:
         return {
             'package': name,
             'version': version,
-            'sha256': sha256,
-            'sha512': sha512,
+            'sha256': sha256 or '',
+            'sha512': sha512 or '',
             'component': repo,
             'architecture': architecture,
             'deb_url': pkg_url,
@@ -141,39 +191,21 @@ class ArchPackageParser:
         """Process all Arch repositories."""
         logger.info("Starting Arch Linux package processing")
         
-        all_packages = []
+        tasks = [(arch, repo) for arch in self.architectures for repo in self.repositories]
         
-        for arch in self.architectures:
-            for repo in self.repositories:
-                logger.info(f"Processing Arch Linux {arch} {repo}")
-                
-                package_count = 0
-                for metadata in self.download_and_parse_repo_db(arch, repo):
-                    all_packages.append(metadata)
-                    package_count += 1
+        with PackageWriter(self.output_dir, "arch", per_release=False,
+                           output_format=self.output_format, catalog=self.catalog_path) as writer:
+            # Only the downloads run in the pool; each database is parsed and streamed here, in order
+            downloads = self.http_client.fan_out(self.fetch_repo_db, tasks, self.download_workers)
+            for (arch, repo), db_path in zip(tasks, downloads):
+                package_count = writer.write_rows(self.parse_fetched_repo_db(db_path, arch, repo))
                 
                 logger.info(f"Processed {package_count} packages from Arch Linux {arch} {repo}")
         
-        if all_packages:
-            output_file = self.output_dir / "arch_packages.csv"
-            self.write_csv(all_packages, output_file)
-            logger.info(f"Written {len(all_packages)} packages to {output_file}")
-        else:
+        if not writer.total:
             logger.warning("No packages processed")
-    
-    def write_csv(self, packages: List[Dict[str, str]], output_file: Path):
-        """Write packages to CSV file."""
-        fieldnames = ['package', 'version', 'sha256', 'sha512', 'component', 
-                     'architecture', 'deb_url', 'license', 'purl', 'release',
-                     'signature_verified', 'signature_method', 'signer']
         
-        try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(packages)
-        except Exception as e:
-            logger.error(f"Error writing CSV file {output_file}: {e}")
+        logger.info(f"Metadata cache: {self.metadata_cache.format_stats()}")
     
     def get_arch_signature_info(self) -> Dict[str, str]:
         """Get Arch signature verification information."""
@@ -190,7 +222,18 @@ class ArchPackageParser:
             return {'verified': 'error', 'method': 'signature check failed', 'signer': 'N/A'}
 
 def main():
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description='Parse Arch Linux packages')
+    arg_parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                            help='Output file format (parquet and arrow need pyarrow)')
+    arg_parser.add_argument('--catalog', nargs='?', const=str(DEFAULT_CATALOG), metavar='DB',
+                            help=f'Also load the rows into a SQLite catalog (default: {DEFAULT_CATALOG})')
+    args = arg_parser.parse_args()
+    
     parser = ArchPackageParser()
+    parser.output_format = args.format
+    parser.catalog_path = args.catalog
     parser.process_all_packages()
 
 if __name__ == "__main__":
@@ -55,19 +55,17 @@ download_centos7_repodata() {
     if curl -f -L -o "$output_file" "$url"; then
         log "Successfully downloaded: $output_file"
         
-        local primary_href=$(grep -o 'href="[^"]*primary[^"]*\.xml\.gz"' "$output_file" | sed 's/href="//;s/"//' | head -1)
+        local primary_href=$(grep -oE 'href="[^"]*primary[^"]*\.xml\.(gz|xz|zst)"' "$output_file" | sed 's/href="//;s/"//' | head -1)
         if [[ -n "$primary_href" ]]; then
             local primary_url="${base_url}/${repo}/${arch}/${primary_href}"
-            local primary_file="${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml.gz"
+            # Keep primary compressed - the parser streams it directly
+            local primary_file="${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml.${primary_href##*.}"
+            rm -f "${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml"{,.gz,.xz,.zst}
             
-            log "Downloading primary.xml.gz: $primary_url"
+            log "Downloading primary metadata: $primary_url"
             if curl -f -L -o "$primary_file" "$primary_url"; then
-                local uncompressed="${primary_file%.gz}"
-                if gunzip -c "$primary_file" > "$uncompressed"; then
-                    log "Decompressed: $uncompressed"
-                    rm "$primary_file"
-                    return 0
-                fi
+                log "Successfully downloaded: $primary_file"
+                return 0
             fi
         fi
     fi
@@ -123,7 +121,7 @@ download_centos89_repodata() {
     if curl -f -L -o "$output_file" "$url"; then
         log "Successfully downloaded: $output_file"
         
-        local primary_href=$(grep -o 'href="[^"]*primary[^"]*\.xml\.gz"' "$output_file" | sed 's/href="//;s/"//' | head -1)
+        local primary_href=$(grep -oE 'href="[^"]*primary[^"]*\.xml\.(gz|xz|zst)"' "$output_file" | sed 's/href="//;s/"//' | head -1)
         if [[ -n "$primary_href" ]]; then
             local repo_path
             case "$repo" in
@@ -139,16 +137,14 @@ download_centos89_repodata() {
             esac
             
             local primary_url="${base_url}/${repo_path}/${arch}/os/${primary_href}"
-            local primary_file="${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml.gz"
+            # Keep primary compressed - the parser streams it directly
+            local primary_file="${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml.${primary_href##*.}"
+            rm -f "${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml"{,.gz,.xz,.zst}
             
-            log "Downloading primary.xml.gz: $primary_url"
+            log "Downloading primary metadata: $primary_url"
             if curl -f -L -o "$primary_file" "$primary_url"; then
-                local uncompressed="${primary_file%.gz}"
-                if gunzip -c "$primary_file" > "$uncompressed"; then
-                    log "Decompressed: $uncompressed"
-                    rm "$primary_file"
-                    return 0
-                fi
+                log "Successfully downloaded: $primary_file"
+                return 0
             fi
         fi
     fi
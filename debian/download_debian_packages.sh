@@ -26,34 +26,19 @@ download_packages_file() {
     
     log "Downloading: $url"
     
+    # Keep Packages compressed - the parser streams it directly
+    rm -f "${output_file%.gz}"
+    
     if curl -f -L -o "$output_file" "$url"; then
         log "Successfully downloaded: $output_file"
-        
-        local uncompressed="${output_file%.gz}"
-        if gunzip -c "$output_file" > "$uncompressed"; then
-            log "Decompressed: $uncompressed"
-            rm "$output_file"
-            return 0
-        else
-            log "Failed to decompress: $output_file"
-            return 1
-        fi
+        return 0
     else
         log "Failed to download: $url (trying alternate mirror)"
         
         local alt_url="http://ftp.debian.org/debian/dists/${release}/${component}/binary-${arch}/Packages.gz"
         if curl -f -L -o "$output_file" "$alt_url"; then
             log "Successfully downloaded from alternate mirror: $output_file"
-            
-            local uncompressed="${output_file%.gz}"
-            if gunzip -c "$output_file" > "$uncompressed"; then
-                log "Decompressed: $uncompressed"
-                rm "$output_file"
-                return 0
-            else
-                log "Failed to decompress: $output_file"
-                return 1
-            fi
+            return 0
         else
             log "Failed to download from both mirrors: $release/$component/$arch"
             return 1
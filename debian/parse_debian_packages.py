@@ -2,8 +2,6 @@
 
 import os
 import sys
-import csv
-import gzip
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Iterator
@@ -11,18 +9,31 @@ import re
 import urllib.parse
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils import LicenseDetector, SHASplitter, PURLGenerator, SignatureVerifier
+from utils import LicenseDetector, SHASplitter, PURLGenerator, SignatureVerifier, StanzaParser, PackageWriter
+from utils.package_writer import FORMATS
+from utils.catalog import DEFAULT_CATALOG
+from utils.parse_manifest import ParseManifest, write_changes
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class DebianPackageParser:
+    # Packages fields used to build a row; everything else is skipped while parsing.
+    # Stanzas carry no license field, and the lowercase names guess_license_from_fields
+    # looks for never match deb822 keys, so no license fields are extracted.
+    PACKAGE_FIELDS = ('Package', 'Version', 'Filename', 'SHA256', 'SHA512')
+    
     def __init__(self):
         self.license_detector = LicenseDetector()
         self.sha_splitter = SHASplitter()
         self.purl_generator = PURLGenerator()
         self.signature_verifier = SignatureVerifier()
+        self.stanza_parser = StanzaParser(fields=self.PACKAGE_FIELDS)
         self.verify_signatures = True
+        # Output file format: csv, parquet or arrow (the last two need pyarrow)
+        self.output_format = 'csv'
+        # SQLite catalog that also receives the rows (None = CSV / columnar output only)
+        self.catalog_path = None
         
         self.script_dir = Path(__file__).parent
         self.temp_dir = self.script_dir.parent / "temp" / "debian"
@@ -31,34 +42,9 @@ class DebianPackageParser:
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
     def parse_packages_file(self, file_path: Path) -> Iterator[Dict[str, str]]:
-        """Parse a Packages file and yield package dictionaries."""
+        """Parse a (possibly compressed) Packages file and yield package dictionaries."""
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                current_package = {}
-                current_field = None
-                
-                for line in f:
-                    line = line.rstrip('\n')
-                    
-                    if not line:
-                        if current_package:
-                            yield current_package
-                            current_package = {}
-                        continue
-                    
-                    if line.startswith(' ') or line.startswith('\t'):
-                        if current_field:
-                            current_package[current_field] += '\n' + line.strip()
-                        continue
-                    
-                    if ':' in line:
-                        field, value = line.split(':', 1)
-                        current_field = field.strip()
-                        current_package[current_field] = value.strip()
-                
-                if current_package:
-                    yield current_package
-                    
+            yield from self.stanza_parser.iter_stanzas(file_path)
         except Exception as e:
             logger.error(f"Error parsing {file_path}: {e}")
     
@@ -67,17 +53,7 @@ class DebianPackageParser:
         name = package.get('Package', '')
         version = package.get('Version', '')
         
-        sha256, sha512 = self.sha_splitter.extract_from_package_metadata(package)
-        
-        if not sha256:
-            sha256_field = package.get('SHA256', '')
-            if sha256_field:
-                sha256, _ = self.sha_splitter.extract_hashes(sha256_field)
-        
-        if not sha512:
-            sha512_field = package.get('SHA512', '')
-            if sha512_field:
-                _, sha512 = self.sha_splitter.extract_hashes(sha512_field)
+        sha256, sha512 = self.sha_splitter.extract_known_hashes(package, 'deb')
         
         filename = package.get('Filename', '')
         if filename:
@@ -130,8 +106,48 @@ class DebianPackageParser:
                 logger.error(f"Error reading release file {release_file}: {e}")
         return releases
     
-    def process_all_packages(self, specific_release=None):
-        """Process all downloaded Debian package files."""
+    def parse_file(self, packages_file: Path, release: str, component: str, architecture: str) -> List[Dict[str, str]]:
+        """
+        Parse one downloaded Packages file into package rows.
+        
+        Runs in a worker process when --jobs is greater than 1.
+        
+        Args:
+            packages_file: Path to the Packages file
+            release: Release the file belongs to
+            component: Component the file belongs to
+            architecture: Architecture the file belongs to
+            
+        Returns:
+            List of package metadata dictionaries
+        """
+        logger.info(f"Processing {packages_file.name}")
+        
+        packages = []
+        try:
+            for package in self.parse_packages_file(packages_file):
+                try:
+                    metadata = self.extract_package_metadata(package, release, component, architecture)
+                    packages.append(metadata)
+                except Exception as e:
+                    logger.error(f"Error processing package in {packages_file}: {e}")
+        except Exception as e:
+            logger.error(f"Error processing file {packages_file}: {e}")
+        return packages
+    
+    def process_all_packages(self, specific_release=None, jobs=1, full=False, changes_file=None):
+        """
+        Process all downloaded Debian package files, parsing up to `jobs` files at once.
+        
+        Files whose content is unchanged since the last run reuse their rows
+        from that run unless full is set.
+        
+        Args:
+            specific_release: Only process this release (no combined CSV is written)
+            jobs: Number of files to parse in parallel (0 = one per CPU)
+            full: Parse every file, even those unchanged since the last run
+            changes_file: CSV that receives the packages added, removed or updated since the last run
+        """
         logger.info("Starting Debian package processing")
         
         packages_files = list(self.temp_dir.glob("Packages_*"))
@@ -139,76 +155,54 @@ class DebianPackageParser:
             logger.error("No package files found in temp directory")
             return
         
-        # Group packages by release
-        packages_by_release = {}
-        
+        # Work out which files to parse, in the order they are written out
+        tasks = []
         for packages_file in packages_files:
-            try:
-                filename_parts = packages_file.stem.split('_')
-                if len(filename_parts) >= 4:
-                    release = filename_parts[1]
-                    component = filename_parts[2]
-                    architecture = filename_parts[3]
-                else:
-                    logger.warning(f"Unexpected filename format: {packages_file}")
-                    continue
-                
-                # Skip if specific release is requested and this isn't it
-                if specific_release and release != specific_release:
-                    continue
-                
-                logger.info(f"Processing {packages_file.name}")
-                
-                if release not in packages_by_release:
-                    packages_by_release[release] = []
-                
-                package_count = 0
-                for package in self.parse_packages_file(packages_file):
-                    try:
-                        metadata = self.extract_package_metadata(package, release, component, architecture)
-                        packages_by_release[release].append(metadata)
-                        package_count += 1
-                    except Exception as e:
-                        logger.error(f"Error processing package in {packages_file}: {e}")
-                
-                logger.info(f"Processed {package_count} packages from {packages_file.name}")
-                
-            except Exception as e:
-                logger.error(f"Error processing file {packages_file}: {e}")
-        
-        # Write CSV files for each release
-        for release, packages in packages_by_release.items():
-            if packages:
-                output_file = self.output_dir / f"debian_{release}_packages.csv"
-                self.write_csv(packages, output_file)
-                logger.info(f"Written {len(packages)} packages to {output_file}")
-        
-        # Also write combined file if processing all releases
-        if not specific_release and packages_by_release:
-            all_packages = []
-            for packages in packages_by_release.values():
-                all_packages.extend(packages)
-            if all_packages:
-                output_file = self.output_dir / "debian_packages.csv"
-                self.write_csv(all_packages, output_file)
-                logger.info(f"Written {len(all_packages)} packages to combined {output_file}")
-        
-        if not packages_by_release:
+            filename_parts = packages_file.stem.split('_')
+            if len(filename_parts) >= 4:
+                release = filename_parts[1]
+                component = filename_parts[2]
+                architecture = filename_parts[3]
+            else:
+                logger.warning(f"Unexpected filename format: {packages_file}")
+                continue
+            
+            # Skip if specific release is requested and this isn't it
+            if specific_release and release != specific_release:
+                continue
+            
+            tasks.append((packages_file, release, component, architecture))
+        
+        # Keep each release's files together so the combined CSV is grouped by release
+        release_order = {}
+        for task in tasks:
+            release_order.setdefault(task[1], len(release_order))
+        tasks.sort(key=lambda task: release_order[task[1]])
+        
+        if not tasks:
             logger.warning("No packages processed")
-    
-    def write_csv(self, packages: List[Dict[str, str]], output_file: Path):
-        """Write packages to CSV file."""
-        fieldnames = ['package', 'version', 'sha256', 'sha512', 'component', 
-                     'architecture', 'deb_url', 'license', 'purl', 'release',
-                     'signature_verified', 'signature_method', 'signer']
+            return
         
-        try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(packages)
-        except Exception as e:
-            logger.error(f"Error writing CSV file {output_file}: {e}")
+        # Unchanged files reuse the rows from the last run instead of being parsed again
+        manifest = ParseManifest(self.output_dir, "debian")
+        changes = [] if changes_file else None
+        
+        # Rows go straight to the per-release and combined CSVs as each file is parsed
+        with PackageWriter(self.output_dir, "debian", combined=not specific_release,
+                           output_format=self.output_format, catalog=self.catalog_path) as writer:
+            for (packages_file, release, component, architecture), packages in manifest.process(
+                    tasks, self.parse_file, jobs, full=full, changes=changes, release=specific_release):
+                writer.write_rows(packages, release)
+                logger.info(f"Processed {len(packages)} packages from {packages_file.name}")
+        manifest.save()
+        
+        if changes is not None:
+            count = write_changes(changes_file, changes)
+            logger.info(f"Written {count} package changes to {changes_file}")
+        
+        # With --jobs the lookups happen in the workers, each with its own cache
+        if jobs == 1:
+            logger.info(f"License detection cache: {self.license_detector.format_cache_stats()}")
     
     def get_signature_info(self) -> Dict[str, str]:
         """Get signature verification information for Debian repository."""
@@ -230,10 +224,23 @@ def main():
     
     arg_parser = argparse.ArgumentParser(description='Parse Debian packages')
     arg_parser.add_argument('--release', help='Process specific release only')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='Number of files to parse in parallel (0 = one per CPU)')
+    arg_parser.add_argument('--full', action='store_true',
+                            help='Parse every file, even those unchanged since the last run')
+    arg_parser.add_argument('--changes', metavar='CSV',
+                            help='Write the packages added, removed or updated since the last run to CSV')
+    arg_parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                            help='Output file format (parquet and arrow need pyarrow)')
+    arg_parser.add_argument('--catalog', nargs='?', const=str(DEFAULT_CATALOG), metavar='DB',
+                            help=f'Also load the rows into a SQLite catalog (default: {DEFAULT_CATALOG})')
     args = arg_parser.parse_args()
     
     parser = DebianPackageParser()
-    parser.process_all_packages(specific_release=args.release)
+    parser.output_format = args.format
+    parser.catalog_path = args.catalog
+    parser.process_all_packages(specific_release=args.release, jobs=args.jobs,
+                                full=args.full, changes_file=args.changes)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -17,6 +17,10 @@ ALPINE_COMPONENTS=("main" "release" "community")
 TEMP_DIR="temp"
 OUTPUT_DIR="output"
 DISTRO="NULL"
+CATALOG_DB=""                          # SQLite catalog that also receives the hashes (--catalog)
+STORE_DB=""                            # deduplicated file store that also receives the hashes (--store)
+DIGESTS="sha256"                       # digest algorithms, extra ones become extra CSV columns (--digests)
+REHASH=""                              # download even packages whose published sha256 was hashed (--rehash)
 
 # Network and retry settings
 MAX_RETRIES=3
@@ -41,39 +45,19 @@ open_locks() {
   # make sure the directories exist before we try to open files inside them
   mkdir -p "$TEMP_DIR" "$OUTPUT_DIR"
 
-  # 200 – packages.csv   (write‑only, shared by all workers)
-  exec 200>>"${OUTPUT_DIR}/packages.csv"
-
-  # 201 – files.csv      (write‑only, shared by all workers)
-  exec 201>>"${OUTPUT_DIR}/files.csv"
-
   # 202 – subfolders list (read‑only for the discovery phase)
   exec 202>>"${TEMP_DIR}/subfolders.txt"
-
-  # 203 – urls.csv (append‑only, used by add_url)
-  exec 203>>"${OUTPUT_DIR}/urls.csv"
-
-  # 204 – urls.csv (read/write, used by set_state)
-  exec 204>>"${OUTPUT_DIR}/urls.csv"
 }
 export -f open_locks
 
 #  Functions
 
-#  add_url – append a new URL with state = -1 (not‑started)
-add_url() {
-  local url=$1
-  flock -x 203 -c "printf '%s,-1\n' \"$url\" >> \"${OUTPUT_DIR}/urls.csv\""
-}
-export -f add_url
-
-#  set_state – update the state column for a given URL
-#  (uses an in‑place sed, far faster than rewriting the whole file)
-set_state() {
-  local url=$1 new_state=$2
-  flock -x 204 sed -i -E "s|^(${url}),.*$|\\1,${new_state}|" "${OUTPUT_DIR}/urls.csv"
+#  job_queue – run a job_queue.py command against the package URL queue
+#  (SQLite, so concurrent workers add URLs without rewriting a file)
+job_queue() {
+  python3 "${SCRIPT_ROOT}/utils/job_queue.py" --db "$JOBS_DB" "$@"
 }
-export -f set_state
+export -f job_queue
 
 # Robust curl function with retries and timeouts
 curl_robust() {
@@ -95,33 +79,6 @@ curl_robust() {
 }
 export -f curl_robust
 
-# Robust wget function with retries and timeouts
-wget_robust() {
-  local url=$1
-  local output=$2
-  local retries=0
-  
-  while [ $retries -lt $MAX_RETRIES ]; do
-    if wget -q --timeout=$TIMEOUT --tries=1 --connect-timeout=$TIMEOUT -O "$output" "$url"; then
-      # Verify the file was actually downloaded and has content
-      if [ -s "$output" ]; then
-        return 0
-      else
-        log "WARNING: Downloaded file is empty: $url"
-        rm -f "$output"
-      fi
-    fi
-    retries=$((retries + 1))
-    if [ $retries -lt $MAX_RETRIES ]; then
-      log "Retry $retries/$MAX_RETRIES for download: $url"
-      sleep $RETRY_DELAY
-    fi
-  done
-  log "ERROR: Failed to download after $MAX_RETRIES attempts: $url"
-  return 1
-}
-export -f wget_robust
-
 #  get_subfolders – fetch the list of sub‑folders for a "letter" URL
 get_subfolders() {
   local base=$1
@@ -179,8 +136,8 @@ get_packages() {
 
   if [ -n "$pkgs" ]; then
     while IFS= read -r p; do
-      [ -n "$p" ] && add_url "${subfolder_url}/${p}"
-    done <<<"$pkgs"
+      [ -n "$p" ] && printf '%s\n' "${subfolder_url}/${p}"
+    done <<<"$pkgs" | job_queue add 2>/dev/null
   fi
 }
 export -f get_packages
@@ -189,24 +146,17 @@ export -f get_packages
 check_dependencies() {
   local missing_tools=()
   
+  command -v python3 >/dev/null || missing_tools+=("python3")
+  python3 -c 'import requests' 2>/dev/null || missing_tools+=("python3-requests")
   case $DISTRO in
-    ubuntu|debian)
-      command -v dpkg-deb >/dev/null || missing_tools+=("dpkg-deb")
-      ;;
-    fedora|rocky|centos)
-      command -v rpm2cpio >/dev/null || missing_tools+=("rpm2cpio")
-      command -v cpio >/dev/null || missing_tools+=("cpio")
-      command -v rpm >/dev/null || missing_tools+=("rpm")
-      ;;
-    arch)
-      command -v unzstd >/dev/null || missing_tools+=("unzstd")
+    arch|ubuntu|fedora|centos|rocky)
+      # .pkg.tar.zst packages, recent Ubuntu debs (data.tar.zst) and the zstd
+      # compressed RPM payloads of Fedora, CentOS Stream 10 and Rocky 10
+      python3 -c 'import zstandard' 2>/dev/null || missing_tools+=("python3-zstandard")
       ;;
   esac
   
-  command -v sha256sum >/dev/null || missing_tools+=("sha256sum")
-  command -v wget >/dev/null || missing_tools+=("wget")
   command -v curl >/dev/null || missing_tools+=("curl")
-  command -v uuidgen >/dev/null || missing_tools+=("uuidgen")
   
   if [ ${#missing_tools[@]} -gt 0 ]; then
     log "ERROR: Missing required tools: ${missing_tools[*]}"
@@ -215,115 +165,15 @@ check_dependencies() {
 }
 export -f check_dependencies
 
-#  process_package – download, unpack, hash archive & files
-process_package() {
-  local PACKAGE_URL=$1
-
-  # -------------------  Check current state -------------------
-  local cur_state
-  cur_state=$(grep -m1 -F "$PACKAGE_URL" "${OUTPUT_DIR}/urls.csv" 2>/dev/null | cut -d, -f2 || echo -1)
-  [[ $cur_state != -1 ]] || return   # already processed / in‑progress
-
-  # -------------------  Mark as "downloading" -----------------
-  set_state "$PACKAGE_URL" 0
-
-  # -------------------  Download the package -----------------
-  local PACKAGE=$(basename "$PACKAGE_URL")
-  local PACKAGE_FILE="${TEMP_DIR}/${PACKAGE}"
-
-  if ! wget_robust "$PACKAGE_URL" "$PACKAGE_FILE"; then
-    log "ERROR: download failed – $PACKAGE_URL"
-    set_state "$PACKAGE_URL" -1
-    return
-  fi
-
-  # -------------------  Unpack & extract name / version -------
-  local uniq_id PACKAGE_DIR PACKAGE_NAME PACKAGE_VERSION
-  uniq_id=$(uuidgen 2>/dev/null || echo "$$-$RANDOM-$(date +%s)")
-  PACKAGE_DIR="${TEMP_DIR}/${PACKAGE}-${uniq_id}"
-  mkdir -p "$PACKAGE_DIR"
-
-  case $DISTRO in
-    ubuntu|debian)
-      PACKAGE_NAME=${PACKAGE%%_*}
-      PACKAGE_VERSION=$(echo "$PACKAGE" | cut -d '_' -f 2)
-      if ! timeout 60 dpkg-deb -x "$PACKAGE_FILE" "$PACKAGE_DIR" 2>/dev/null; then
-        log "ERROR: cannot extract $PACKAGE_FILE"
-        rm -f "$PACKAGE_FILE"
-        rm -rf "$PACKAGE_DIR"
-        set_state "$PACKAGE_URL" -1
-        return
-      fi
-      ;;
-    fedora|rocky|centos)
-      PACKAGE_NAME=$(rpm2cpio "$PACKAGE_FILE" 2>/dev/null | cpio -it 2>/dev/null | head -n1 | cut -d'-' -f1 2>/dev/null || echo "unknown")
-      PACKAGE_VERSION=$(rpm -qp --queryformat '%{VERSION}-%{RELEASE}' "$PACKAGE_FILE" 2>/dev/null || echo "unknown")
-      if ! timeout 60 bash -c "rpm2cpio '$PACKAGE_FILE' | cpio -idmv -D '$PACKAGE_DIR' 2>/dev/null"; then
-        log "ERROR: cannot extract $PACKAGE_FILE"
-        rm -f "$PACKAGE_FILE"
-        rm -rf "$PACKAGE_DIR"
-        set_state "$PACKAGE_URL" -1
-        return
-      fi
-      ;;
-    arch)
-      PACKAGE_NAME=$(basename "$PACKAGE" .zst | rev | cut -d'-' -f4- | rev)
-      PACKAGE_VERSION=$(basename "$PACKAGE" .zst | rev | cut -d'-' -f3-2 | rev)
-      if ! timeout 60 tar -I unzstd -xf "$PACKAGE_FILE" -C "$PACKAGE_DIR" 2>/dev/null; then
-        log "ERROR: cannot extract $PACKAGE_FILE"
-        rm -f "$PACKAGE_FILE"
-        rm -rf "$PACKAGE_DIR"
-        set_state "$PACKAGE_URL" -1
-        return
-      fi
-      ;;
-    alpine)
-      PACKAGE_NAME=$(basename "$PACKAGE" .apk | rev | cut -d'-' -f3- | rev)
-      PACKAGE_VERSION=$(basename "$PACKAGE" .apk | rev | cut -d'-' -f2-1 | rev)
-      if ! timeout 60 tar -xzf "$PACKAGE_FILE" -C "$PACKAGE_DIR" 2>/dev/null; then
-        log "ERROR: cannot extract $PACKAGE_FILE"
-        rm -f "$PACKAGE_FILE"
-        rm -rf "$PACKAGE_DIR"
-        set_state "$PACKAGE_URL" -1
-        return
-      fi
-      ;;
-  esac
-
-  # -------------------  Compute archive hash -----------------
-  local PKG_SHA
-  PKG_SHA=$(sha256sum "$PACKAGE_FILE" | cut -d' ' -f1)
-
-  flock -x 200 -c "printf '%s,%s,%s,%s\n' \"$PACKAGE_NAME\" \"$PACKAGE_VERSION\" \"$PKG_SHA\" \"$PACKAGE_URL\" >> \"${OUTPUT_DIR}/packages.csv\""
-
-  # -------------------   Walk every file & record its hash -----
-  while IFS= read -r -d '' f; do
-    local FILE_SHA REL_PATH
-    FILE_SHA=$(sha256sum "$f" 2>/dev/null | cut -d' ' -f1 || echo "error")
-    REL_PATH="${f#$PACKAGE_DIR/}"
-    flock -x 201 -c "printf '%s,%s,%s,%s,%s\n' \"$PACKAGE_NAME\" \"$PACKAGE_VERSION\" \"$FILE_SHA\" \"$REL_PATH\" \"$PACKAGE_URL\" >> \"${OUTPUT_DIR}/files.csv\""
-  done < <(find "$PACKAGE_DIR" -type f -print0 2>/dev/null)
-
-  # -------------------   Mark as completed & clean up ---------
-  set_state "$PACKAGE_URL" 1
-  rm -f "$PACKAGE_FILE"
-  rm -rf "$PACKAGE_DIR"
-  
-  log "Completed: $PACKAGE_NAME ($PACKAGE_VERSION)"
-}
-export -f process_package
-
 # Progress monitoring function
 show_progress() {
   while true; do
     sleep 30
-    if [ -f "${OUTPUT_DIR}/urls.csv" ]; then
-      local total=$(( $(wc -l < "${OUTPUT_DIR}/urls.csv") - 1 ))
-      local completed=$(awk -F, '$2==1{c++} END{print c}' "${OUTPUT_DIR}/urls.csv" 2>/dev/null || echo "0")
-      local in_progress=$(awk -F, '$2==0{c++} END{print c}' "${OUTPUT_DIR}/urls.csv" 2>/dev/null || echo "0")
-      local failed=$(awk -F, '$2==-1{c++} END{print c}' "${OUTPUT_DIR}/urls.csv" 2>/dev/null || echo "0")
+    if [ -f "$JOBS_DB" ]; then
+      local total completed in_progress failed pending
+      read -r total completed in_progress failed pending < <(job_queue counts --plain 2>/dev/null || echo "0 0 0 0 0")
       
-      if [ "$total" -gt 0 ]; then
+      if [ "${total:-0}" -gt 0 ]; then
         local percent=$((completed * 100 / total))
         log "Progress: $completed/$total ($percent%) completed, $in_progress in progress, $failed failed"
       fi
@@ -343,12 +193,20 @@ while [[ $# -gt 0 ]]; do
     --processes) XARGS_PROCESSES=$2; shift 2 ;;
     --timeout) TIMEOUT=$2; shift 2 ;;
     --retries) MAX_RETRIES=$2; shift 2 ;;
+    --catalog) CATALOG_DB=$(realpath -m "$2"); shift 2 ;;
+    --digests) DIGESTS=$2; shift 2 ;;
+    --store) STORE_DB=$(realpath -m "$2"); shift 2 ;;
+    --rehash) REHASH=1; shift ;;
     -h|--help)
       echo "Usage: $0 --distro <ubuntu|debian|fedora|rocky|centos|arch|alpine> [OPTIONS]"
       echo "Options:"
       echo "  --processes N    Number of parallel workers (default: $XARGS_PROCESSES)"
       echo "  --timeout N      Timeout in seconds (default: $TIMEOUT)"
       echo "  --retries N      Max retry attempts (default: $MAX_RETRIES)"
+      echo "  --catalog DB     Also record the hashes in a SQLite catalog (e.g. output/catalog.db)"
+      echo "  --store DB       Also record the hashes in a deduplicated file store (e.g. output/file_store.db)"
+      echo "  --digests LIST   Digests to compute: sha256,sha1,sha512,blake2b,md5 or all (default: $DIGESTS)"
+      echo "  --rehash         Also download packages whose published sha256 has already been hashed"
       exit 0 ;;
     *) echo "Unknown option: $1" >&2; exit 1 ;;
   esac
@@ -363,6 +221,10 @@ log "Selected distro: $DISTRO"
 log "Parallel workers: $XARGS_PROCESSES"
 log "Timeout: ${TIMEOUT}s"
 log "Max retries: $MAX_RETRIES"
+[[ -z $CATALOG_DB ]] || log "Catalog: $CATALOG_DB"
+[[ -z $STORE_DB ]] || log "File store: $STORE_DB"
+log "Digests: $DIGESTS"
+[[ -z $REHASH ]] || log "Rehashing packages that were hashed before"
 
 # ------------------- Check dependencies -----------------
 check_dependencies
@@ -379,15 +241,20 @@ case $DISTRO in
   *) log "Unsupported distro: $DISTRO"; exit 1 ;;
 esac
 
-export DISTRO TEMP_DIR OUTPUT_DIR
+JOBS_DB="${OUTPUT_DIR}/jobs.db"
+
+export DISTRO TEMP_DIR OUTPUT_DIR CATALOG_DB SCRIPT_ROOT JOBS_DB
 
 #  Open the lock files now that the directories are known
 open_locks
 
-#  Ensure CSV headers exist (files are already opened)
-[[ -s "${OUTPUT_DIR}/packages.csv" ]] || echo "name,version,sha256,url" > "${OUTPUT_DIR}/packages.csv"
-[[ -s "${OUTPUT_DIR}/files.csv"    ]] || echo "name,version,sha256,file,url" > "${OUTPUT_DIR}/files.csv"
-[[ -s "${OUTPUT_DIR}/urls.csv"     ]] || echo "url,state" > "${OUTPUT_DIR}/urls.csv"
+#  packages.csv / files.csv and their headers (one column per --digests
+#  algorithm) are created by file_hasher.py
+
+#  Runs from before the job queue kept their URLs and states in urls.csv
+if [[ ! -f "$JOBS_DB" && -s "${OUTPUT_DIR}/urls.csv" ]]; then
+  job_queue import "${OUTPUT_DIR}/urls.csv"
+fi
 
 # Start progress monitoring in background
 show_progress &
@@ -399,11 +266,7 @@ cleanup() {
   kill $PROGRESS_PID 2>/dev/null || true
   
   # Close file descriptors
-  exec 200>&- 2>/dev/null || true
-  exec 201>&- 2>/dev/null || true
   exec 202>&- 2>/dev/null || true
-  exec 203>&- 2>/dev/null || true
-  exec 204>&- 2>/dev/null || true
   
   log "Script interrupted"
   exit 1
@@ -411,7 +274,8 @@ cleanup() {
 trap cleanup INT TERM
 
 # ------------------- URL discovery (or resume) ------------
-if [[ -s "${OUTPUT_DIR}/urls.csv" && $(tail -n +2 "${OUTPUT_DIR}/urls.csv" 2>/dev/null | wc -l) -gt 0 ]]; then
+read -r TOTAL _ < <(job_queue counts --plain)
+if [[ ${TOTAL:-0} -gt 0 ]]; then
   log "Resuming – URLs already discovered"
 else
   log "Starting URL discovery..."
@@ -496,14 +360,22 @@ else
     xargs -a "${TEMP_DIR}/subfolders.txt" -P "$XARGS_PROCESSES" -I {} bash -c 'get_packages "{}" || true'
   fi
 
-  log "URL discovery finished – $(tail -n +2 "${OUTPUT_DIR}/urls.csv" 2>/dev/null | wc -l || echo 0) URLs recorded"
+  read -r TOTAL _ < <(job_queue counts --plain)
+  log "URL discovery finished – ${TOTAL:-0} URLs recorded"
 fi
 
 # ------------------- Process packages in parallel ----------
+# Archives are streamed and hashed in memory by a pool of Python workers. Packages
+# whose published sha256 (parser output / catalog) was already hashed are skipped.
 log "Starting parallel processing of packages (up to $XARGS_PROCESSES workers)"
-if [ -s "${OUTPUT_DIR}/urls.csv" ] && [ "$(tail -n +2 "${OUTPUT_DIR}/urls.csv" 2>/dev/null | wc -l)" -gt 0 ]; then
-  tail -n +2 "${OUTPUT_DIR}/urls.csv" | cut -d, -f1 |
-    xargs -P "$XARGS_PROCESSES" -I {} bash -c 'process_package "{}" || true'
+METADATA_DIR="${SCRIPT_ROOT}/output/${DISTRO}"
+[[ -d $METADATA_DIR ]] || METADATA_DIR=""
+if [[ ${TOTAL:-0} -gt 0 ]]; then
+  python3 "${SCRIPT_ROOT}/utils/file_hasher.py" --distro "$DISTRO" --output-dir "$OUTPUT_DIR" --jobs "$JOBS_DB" \
+    --workers "$XARGS_PROCESSES" --timeout "$TIMEOUT" --retries "$MAX_RETRIES" --digests "$DIGESTS" \
+    ${CATALOG_DB:+--catalog "$CATALOG_DB"} ${STORE_DB:+--store "$STORE_DB"} \
+    ${METADATA_DIR:+--metadata "$METADATA_DIR"} ${REHASH:+--rehash} ||
+    log "ERROR: package hashing failed"
 else
   log "No URLs to process"
 fi
@@ -514,13 +386,8 @@ kill $PROGRESS_PID 2>/dev/null || true
 # ------------------- Final summary -------------------------
 PKGS=$(( $(wc -l < "${OUTPUT_DIR}/packages.csv" 2>/dev/null || echo 1) - 1 ))
 FILES=$(( $(wc -l < "${OUTPUT_DIR}/files.csv" 2>/dev/null || echo 1) - 1 ))
-DONE=$(awk -F, '$2==1{c++} END{print c}' "${OUTPUT_DIR}/urls.csv" 2>/dev/null || echo 0)
-FAILED=$(awk -F, '$2==-1{c++} END{print c}' "${OUTPUT_DIR}/urls.csv" 2>/dev/null || echo 0)
+read -r _ DONE _ FAILED _ < <(job_queue counts --plain 2>/dev/null || echo "0 0 0 0 0")
 log "Finished – $PKGS packages, $FILES files, $DONE URLs completed, $FAILED failed"
 
 # ------------------- Clean‑up (close descriptors) ----------
-exec 200>&- 2>/dev/null || true
-exec 201>&- 2>/dev/null || true
 exec 202>&- 2>/dev/null || true
-exec 203>&- 2>/dev/null || true
-exec 204>&- 2>/dev/null || true
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Mirror URL collector – writes URLs to CSV as soon as they are discovered.
+Mirror URL collector – queues URLs for hashing as soon as they are discovered.
 Works for Ubuntu, Debian, CentOS, Rocky, Fedora, Alpine, and Arch mirrors.
 
 goal is to replace the url processing in hash_distros with this since its gross to do in bash
@@ -8,7 +8,6 @@ goal is to replace the url processing in hash_distros with this since its gross
 
 import os
 import sys
-import csv
 import time
 import argparse
 import logging
@@ -19,6 +18,9 @@ from urllib.parse import urljoin, urlparse
 import requests
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.job_queue import JobQueue
+
 # Mirror base URLs (trailing slash for consistency)
 UBUNTU_MAIN_URL = "https://mirrors.edge.kernel.org/ubuntu/pool/main/"
 UBUNTU_RESTRICTED_URL = "https://mirrors.edge.kernel.org/ubuntu/pool/restricted/"
@@ -63,35 +65,21 @@ ALPINE_E_M_URL = "https://mirrors.edge.kernel.org/alpine/edge/main/x86_64/"
 # rolling release distro doesnt have any versions to deal with
 ARCH = "https://mirrors.edge.kernel.org/archlinux/pool/packages/"
 
-# Helper: thread‑safe CSV writer (writes one row at a time)
-csv_locks = {}   # distro → threading.Lock()
-
-
+# Helper: one job queue per distro, shared with hash_distro_files.sh
+job_queues = {}   # distro → JobQueue
+queue_lock = threading.Lock()
 
 
-def _get_lock(distro: str) -> threading.Lock:
-    """Create (or return) a lock for a given distro."""
-    if distro not in csv_locks:
-        csv_locks[distro] = threading.Lock()
-    return csv_locks[distro]
-
-
-def write_url_to_csv(distro: str, url: str) -> None:
+def queue_url(distro: str, url: str) -> None:
     """
-    Append a single URL to <distro>/output/urls.csv.
-    The header is written only once (when the file is created).
-    we add the state of -1 for later processing in hash_distro files
+    Queue a single URL in <distro>/output/jobs.db.
+    URLs that are already queued keep their state, so a re-run only adds
+    new packages for later processing in hash_distro_files.
     """
-    out_dir = os.path.join(distro, "output")
-    os.makedirs(out_dir, exist_ok=True)
-    csv_path = os.path.join(out_dir, "urls.csv")
-
-    lock = _get_lock(distro)
-    with lock, open(csv_path, "a", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if f.tell() == 0:                     # empty file → write header
-            writer.writerow(["url", "state"])
-        writer.writerow([url, "-1"])
+    with queue_lock:
+        if distro not in job_queues:
+            job_queues[distro] = JobQueue(os.path.join(distro, "output", "jobs.db"))
+        job_queues[distro].add([url])
 
 
 # What we consider a “package file” – write it immediately and never fetch it
@@ -127,7 +115,7 @@ def scrape_all_links(base_url: str, max_depth: int = 10, distro: str = "generic"
 
         # If the URL itself is a package file → write it and skip fetching
         if is_package(cur_url):
-            write_url_to_csv(distro, cur_url)
+            queue_url(distro, cur_url)
             continue
 
         # Fetch the page – but only if it looks like HTML
@@ -177,7 +165,7 @@ def scrape_all_links(base_url: str, max_depth: int = 10, distro: str = "generic"
 
             # If it looks like a package file → write immediately
             if is_package(full_url):
-                write_url_to_csv(distro, full_url)
+                queue_url(distro, full_url)
                 continue
 
             # Otherwise queue it for further crawling (if we haven’t hit max depth)
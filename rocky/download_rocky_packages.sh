@@ -71,7 +71,6 @@ ESTIMATED TIME:
 
 REQUIREMENTS:
     - curl (for downloading)
-    - gunzip (for decompression)
     - python3 (for CSV generation)
 
 LICENSE:
@@ -195,7 +194,7 @@ download_rocky_repodata() {
     if curl -f -L -o "$output_file" "$url"; then
         log "Successfully downloaded: $output_file"
         
-        local primary_href=$(grep -A 5 'type="primary"' "$output_file" | grep -o 'href="[^"]*\.xml\.gz"' | sed 's/href="//;s/"//' | head -1)
+        local primary_href=$(grep -A 5 'type="primary"' "$output_file" | grep -oE 'href="[^"]*\.xml\.(gz|xz|zst)"' | sed 's/href="//;s/"//' | head -1)
         if [[ -n "$primary_href" ]]; then
             local repo_path
             case "$repo" in
@@ -205,16 +204,14 @@ download_rocky_repodata() {
             esac
             
             local primary_url="${base_url}/${repo_path}/${arch}/os/${primary_href}"
-            local primary_file="${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml.gz"
+            # Keep primary compressed - the parser streams it directly
+            local primary_file="${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml.${primary_href##*.}"
+            rm -f "${TEMP_DIR}/primary_${release}_${repo}_${arch}.xml"{,.gz,.xz,.zst}
             
-            log "Downloading primary.xml.gz: $primary_url"
+            log "Downloading primary metadata: $primary_url"
             if curl -f -L -o "$primary_file" "$primary_url"; then
-                local uncompressed="${primary_file%.gz}"
-                if gunzip -c "$primary_file" > "$uncompressed"; then
-                    log "Decompressed: $uncompressed"
-                    rm "$primary_file"
-                    return 0
-                fi
+                log "Successfully downloaded: $primary_file"
+                return 0
             fi
         fi
     fi
@@ -2,16 +2,17 @@
 
 import os
 import sys
-import csv
 import logging
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from typing import Dict, List, Optional, Iterator
 import re
 import urllib.parse
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils import LicenseDetector, SHASplitter, PURLGenerator, SignatureVerifier
+from utils import LicenseDetector, SPDXNormalizer, SHASplitter, PURLGenerator, SignatureVerifier, RepodataReader, RpmPackage, PackageWriter
+from utils.package_writer import FORMATS
+from utils.catalog import DEFAULT_CATALOG
+from utils.parse_manifest import ParseManifest, write_changes
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -19,119 +20,55 @@ logger = logging.getLogger(__name__)
 class RockyPackageParser:
     def __init__(self):
         self.license_detector = LicenseDetector()
+        self.spdx_normalizer = SPDXNormalizer()
         self.sha_splitter = SHASplitter()
         self.purl_generator = PURLGenerator()
         self.signature_verifier = SignatureVerifier()
+        self.repodata_reader = RepodataReader()
         self.verify_signatures = True
+        # Output file format: csv, parquet or arrow (the last two need pyarrow)
+        self.output_format = 'csv'
+        # SQLite catalog that also receives the rows (None = CSV / columnar output only)
+        self.catalog_path = None
         
         self.script_dir = Path(__file__).parent
         self.temp_dir = self.script_dir.parent / "temp" / "rocky"
         self.output_dir = self.script_dir.parent / "output" / "rocky"
         
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        
-        self.namespaces = {
-            'rpm': 'http://linux.duke.edu/metadata/common',
-            'repo': 'http://linux.duke.edu/metadata/repo'
-        }
     
-    def parse_primary_xml(self, file_path: Path) -> Iterator[Dict[str, str]]:
-        """Parse a primary.xml file and yield package dictionaries."""
+    def parse_primary_xml(self, file_path: Path) -> Iterator[RpmPackage]:
+        """Parse a primary.xml file and yield package records."""
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            
-            for package in root.findall('.//rpm:package', self.namespaces):
-                try:
-                    pkg_data = {}
-                    
-                    # Get package name from child element, not attribute
-                    name_elem = package.find('rpm:name', self.namespaces)
-                    pkg_data['name'] = name_elem.text if name_elem is not None else ''
-                    
-                    # Get architecture from child element
-                    arch_elem = package.find('rpm:arch', self.namespaces)
-                    pkg_data['arch'] = arch_elem.text if arch_elem is not None else ''
-                    
-                    version_elem = package.find('rpm:version', self.namespaces)
-                    if version_elem is not None:
-                        epoch = version_elem.get('epoch', '0')
-                        ver = version_elem.get('ver', '')
-                        rel = version_elem.get('rel', '')
-                        
-                        if epoch and epoch != '0':
-                            pkg_data['version'] = f"{epoch}:{ver}-{rel}"
-                        else:
-                            pkg_data['version'] = f"{ver}-{rel}"
-                        
-                        pkg_data['epoch'] = epoch
-                        pkg_data['ver'] = ver
-                        pkg_data['rel'] = rel
-                    
-                    description_elem = package.find('rpm:description', self.namespaces)
-                    if description_elem is not None:
-                        pkg_data['description'] = description_elem.text or ''
-                    
-                    summary_elem = package.find('rpm:summary', self.namespaces)
-                    if summary_elem is not None:
-                        pkg_data['summary'] = summary_elem.text or ''
-                    
-                    url_elem = package.find('rpm:url', self.namespaces)
-                    if url_elem is not None:
-                        pkg_data['url'] = url_elem.text or ''
-                    
-                    location_elem = package.find('rpm:location', self.namespaces)
-                    if location_elem is not None:
-                        pkg_data['location_href'] = location_elem.get('href', '')
-                    
-                    checksum_elem = package.find('rpm:checksum', self.namespaces)
-                    if checksum_elem is not None:
-                        checksum_type = checksum_elem.get('type', '').lower()
-                        checksum_value = checksum_elem.text or ''
-                        if checksum_type == 'sha256':
-                            pkg_data['sha256'] = checksum_value
-                    
-                    format_elem = package.find('rpm:format', self.namespaces)
-                    if format_elem is not None:
-                        license_elem = format_elem.find('rpm:license', self.namespaces)
-                        if license_elem is not None:
-                            pkg_data['license'] = license_elem.text or ''
-                    
-                    yield pkg_data
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing package in {file_path}: {e}")
-                    continue
-                    
+            yield from self.repodata_reader.iter_records(file_path)
         except Exception as e:
             logger.error(f"Error parsing XML file {file_path}: {e}")
     
-    def extract_package_metadata(self, package: Dict[str, str], release: str, repo: str, architecture: str) -> Optional[Dict[str, str]]:
+    def extract_package_metadata(self, package: RpmPackage, release: str, repo: str, architecture: str) -> Optional[Dict[str, str]]:
         """Extract and normalize package metadata."""
-        name = package.get('name', '').strip()
-        version = package.get('version', '').strip()
-        ver = package.get('ver', '').strip()
+        name = package.name.strip()
+        version = package.version.strip()
+        ver = package.ver.strip()
         
         # Skip packages without required fields
         if not name or not ver:
             return None
         
-        sha256 = package.get('sha256', '')
-        sha512 = ''
+        sha256, sha512 = self.sha_splitter.extract_checksum(package.checksum_type, package.checksum)
         
-        location_href = package.get('location_href', '')
+        location_href = package.location_href
         if location_href:
             repo_path = {"baseos": "BaseOS", "appstream": "AppStream", "extras": "extras"}.get(repo, repo)
             rpm_url = f"https://dl.rockylinux.org/pub/rocky/{release}/{repo_path}/{architecture}/os/{location_href}"
         else:
             rpm_url = ""
         
-        license_info = package.get('license', '')
+        license_info = package.license
         if license_info:
-            detected_license = self.license_detector.detect_license(license_info)
-            license_info = detected_license if detected_license else license_info
+            license_info = self.spdx_normalizer.normalize(license_info)
         else:
-            license_info = self.license_detector.guess_license_from_fields(package)
+            license_info = self.license_detector.guess_license_from_fields(
+                {'description': package.description, 'summary': package.summary})
             if not license_info:
                 license_info = "Unknown"
         
@@ -139,9 +76,9 @@ class RockyPackageParser:
             name=name,
             version=ver,
             distribution="rocky",
-            release=package.get('rel', ''),
+            release=package.rel,
             architecture=architecture,
-            epoch=package.get('epoch', '0') if package.get('epoch', '0') != '0' else None
+            epoch=package.epoch if package.epoch != '0' else None
         )
         
         # Get signature verification info
@@ -151,8 +88,8 @@ class RockyPackageParser:
         return {
             'package': name,
             'version': version,
-            'sha256': sha256,
-            'sha512': sha512,
+            'sha256': sha256 or '',
+            'sha512': sha512 or '',
             'component': repo,
             'architecture': architecture,
             'deb_url': rpm_url,
@@ -164,86 +101,105 @@ class RockyPackageParser:
             'signer': signature_info['signer']
         }
     
-    def process_all_packages(self, specific_release=None):
-        """Process all downloaded Rocky Linux package files."""
+    def parse_file(self, primary_file: Path, release: str, repo: str, architecture: str) -> List[Dict[str, str]]:
+        """
+        Parse one downloaded primary.xml file into package rows.
+        
+        Runs in a worker process when --jobs is greater than 1.
+        
+        Args:
+            primary_file: Path to the primary.xml file
+            release: Release the file belongs to
+            repo: Repository the file belongs to
+            architecture: Architecture the file belongs to
+            
+        Returns:
+            List of package metadata dictionaries
+        """
+        logger.info(f"Processing {primary_file.name}")
+        
+        packages = []
+        try:
+            for package in self.parse_primary_xml(primary_file):
+                try:
+                    metadata = self.extract_package_metadata(package, release, repo, architecture)
+                    if metadata:  # Only process valid packages
+                        packages.append(metadata)
+                except Exception as e:
+                    logger.error(f"Error processing package in {primary_file}: {e}")
+        except Exception as e:
+            logger.error(f"Error processing file {primary_file}: {e}")
+        return packages
+    
+    def process_all_packages(self, specific_release=None, jobs=1, full=False, changes_file=None):
+        """
+        Process all downloaded Rocky Linux package files.
+        
+        Files whose content is unchanged since the last run reuse their rows
+        from that run unless full is set.
+        
+        Args:
+            specific_release: Only process this release (no combined CSV is written)
+            jobs: Number of files to parse in parallel (0 = one per CPU)
+            full: Parse every file, even those unchanged since the last run
+            changes_file: CSV that receives the packages added, removed or updated since the last run
+        """
         logger.info("Starting Rocky Linux package processing")
         
-        primary_files = list(self.temp_dir.glob("primary_*.xml"))
+        primary_files = list(self.temp_dir.glob("primary_*.xml*"))
         if not primary_files:
             logger.error("No primary.xml files found in temp directory")
             return
         
-        # Group packages by release
-        packages_by_release = {}
-        
+        # Work out which files to parse, in the order they are written out
+        tasks = []
         for primary_file in primary_files:
-            try:
-                filename_parts = primary_file.stem.split('_')
-                if len(filename_parts) >= 4:
-                    release = filename_parts[1]
-                    repo = filename_parts[2]
-                    architecture = filename_parts[3]
-                else:
-                    logger.warning(f"Unexpected filename format: {primary_file}")
-                    continue
-                
-                # Skip if specific release is requested and this isn't it
-                if specific_release and release != specific_release:
-                    continue
-                
-                logger.info(f"Processing {primary_file.name}")
-                
-                if release not in packages_by_release:
-                    packages_by_release[release] = []
-                
-                package_count = 0
-                for package in self.parse_primary_xml(primary_file):
-                    try:
-                        metadata = self.extract_package_metadata(package, release, repo, architecture)
-                        if metadata:  # Only process valid packages
-                            packages_by_release[release].append(metadata)
-                            package_count += 1
-                    except Exception as e:
-                        logger.error(f"Error processing package in {primary_file}: {e}")
-                
-                logger.info(f"Processed {package_count} packages from {primary_file.name}")
-                
-            except Exception as e:
-                logger.error(f"Error processing file {primary_file}: {e}")
-        
-        # Write CSV files for each release
-        for release, packages in packages_by_release.items():
-            if packages:
-                output_file = self.output_dir / f"rocky_{release}_packages.csv"
-                self.write_csv(packages, output_file)
-                logger.info(f"Written {len(packages)} packages to {output_file}")
+            # primary_<release>_<repo>_<arch>.xml[.gz|.xz|.zst]
+            filename_parts = primary_file.name.split('.xml')[0].split('_')
+            if len(filename_parts) >= 4:
+                release = filename_parts[1]
+                repo = filename_parts[2]
+                architecture = filename_parts[3]
+            else:
+                logger.warning(f"Unexpected filename format: {primary_file}")
+                continue
+            
+            # Skip if specific release is requested and this isn't it
+            if specific_release and release != specific_release:
+                continue
+            
+            tasks.append((primary_file, release, repo, architecture))
         
-        # Also write combined file if processing all releases
-        if not specific_release and packages_by_release:
-            all_packages = []
-            for packages in packages_by_release.values():
-                all_packages.extend(packages)
-            if all_packages:
-                output_file = self.output_dir / "rocky_packages.csv"
-                self.write_csv(all_packages, output_file)
-                logger.info(f"Written {len(all_packages)} packages to combined {output_file}")
+        # Keep each release's files together so the combined CSV is grouped by release
+        release_order = {}
+        for task in tasks:
+            release_order.setdefault(task[1], len(release_order))
+        tasks.sort(key=lambda task: release_order[task[1]])
         
-        if not packages_by_release:
+        if not tasks:
             logger.warning("No packages processed")
-    
-    def write_csv(self, packages: List[Dict[str, str]], output_file: Path):
-        """Write packages to CSV file."""
-        fieldnames = ['package', 'version', 'sha256', 'sha512', 'component', 
-                     'architecture', 'deb_url', 'license', 'purl', 'release',
-                     'signature_verified', 'signature_method', 'signer']
+            return
         
-        try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(packages)
-        except Exception as e:
-            logger.error(f"Error writing CSV file {output_file}: {e}")
+        # Unchanged files reuse the rows from the last run instead of being parsed again
+        manifest = ParseManifest(self.output_dir, "rocky")
+        changes = [] if changes_file else None
+        
+        # Rows go straight to the per-release and combined CSVs as each file is parsed
+        with PackageWriter(self.output_dir, "rocky", combined=not specific_release,
+                           output_format=self.output_format, catalog=self.catalog_path) as writer:
+            for (primary_file, release, repo, architecture), packages in manifest.process(
+                    tasks, self.parse_file, jobs, full=full, changes=changes, release=specific_release):
+                writer.write_rows(packages, release)
+                logger.info(f"Processed {len(packages)} packages from {primary_file.name}")
+        manifest.save()
+        
+        if changes is not None:
+            count = write_changes(changes_file, changes)
+            logger.info(f"Written {count} package changes to {changes_file}")
+        
+        # With --jobs the lookups happen in the workers, each with its own cache
+        if jobs == 1:
+            logger.info(f"License detection cache: {self.license_detector.format_cache_stats()}")
     
     def get_rpm_signature_info(self) -> Dict[str, str]:
         """Get RPM signature verification information for Rocky Linux."""
@@ -264,10 +220,23 @@ def main():
     
     arg_parser = argparse.ArgumentParser(description='Parse Rocky Linux packages')
     arg_parser.add_argument('--release', help='Process specific release only')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='Number of files to parse in parallel (0 = one per CPU)')
+    arg_parser.add_argument('--full', action='store_true',
+                            help='Parse every file, even those unchanged since the last run')
+    arg_parser.add_argument('--changes', metavar='CSV',
+                            help='Write the packages added, removed or updated since the last run to CSV')
+    arg_parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                            help='Output file format (parquet and arrow need pyarrow)')
+    arg_parser.add_argument('--catalog', nargs='?', const=str(DEFAULT_CATALOG), metavar='DB',
+                            help=f'Also load the rows into a SQLite catalog (default: {DEFAULT_CATALOG})')
     args = arg_parser.parse_args()
     
     parser = RockyPackageParser()
-    parser.process_all_packages(specific_release=args.release)
+    parser.output_format = args.format
+    parser.catalog_path = args.catalog
+    parser.process_all_packages(specific_release=args.release, jobs=args.jobs,
+                                full=args.full, changes_file=args.changes)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.file_hasher import FileHasher
+
+
+def build_deb(work_dir: Path, files: int, size: int) -> Path:
+    """Build a synthetic .deb with many small files using dpkg-deb."""
+    root = work_dir / 'pkg'
+    (root / 'DEBIAN').mkdir(parents=True)
+    (root / 'DEBIAN' / 'control').write_text(
+        "Package: bench\nVersion: 1.0-1\nArchitecture: amd64\nMaintainer: bench <bench@example.com>\nDescription: bench\n")
+    rng = random.Random(0)
+    words = [rng.randbytes(rng.randint(2, 12)).hex().encode() for _ in range(4096)]
+    for i in range(files):
+        path = root / 'usr' / 'share' / 'bench' / f"{i % 64:02d}" / f"file{i}.dat"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Compressible content, like the text and binaries of real packages
+        data = b' '.join(rng.choices(words, k=rng.randint(1, size * 2) // 16 + 1))
+        path.write_bytes(data)
+    deb = work_dir / 'bench_1.0-1_amd64.deb'
+    subprocess.run(['dpkg-deb', '-Zxz', '-b', str(root), str(deb)], check=True, stdout=subprocess.DEVNULL)
+    shutil.rmtree(root)
+    return deb
+
+
+# The file loop of the old process_package in hash_distro_files.sh
+EXTRACT_SCRIPT = r'''
+set -e
+dpkg-deb -x "$1" "$2"
+exec 201>>"$3"
+while IFS= read -r -d '' f; do
+  FILE_SHA=$(sha256sum "$f" 2>/dev/null | cut -d' ' -f1 || echo "error")
+  REL_PATH="${f#$2/}"
+  flock -x 201 -c "printf '%s,%s,%s,%s,%s\n' bench 1.0-1 \"$FILE_SHA\" \"$REL_PATH\" url >> \"$3\""
+done < <(find "$2" -type f -print0)
+'''
+
+
+def run_extract(deb: Path, work_dir: Path) -> int:
+    """The old process_package approach: extract to disk, forks per file."""
+    target = work_dir / 'extract'
+    files_csv = work_dir / 'files.csv'
+    subprocess.run(['bash', '-c', EXTRACT_SCRIPT, 'bash', str(deb), str(target), str(files_csv)], check=True,
+                   cwd=work_dir)
+    count = sum(1 for _ in open(files_csv))
+    shutil.rmtree(target)
+    files_csv.unlink()
+    return count
+
+
+def run_stream(deb: Path) -> int:
+    """FileHasher: hash the archive and every member in one streaming pass."""
+    result = FileHasher('bench').hash_package(str(deb))
+    if result['error']:
+        sys.exit(result['error'])
+    return len(result['files'])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare extract + sha256sum with in-stream FileHasher hashing')
+    arg_parser.add_argument('--files', type=int, default=2000, help='Files in the synthetic package')
+    arg_parser.add_argument('--size', type=int, default=8192, help='Average file size in bytes')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        deb = build_deb(work_dir, args.files, args.size)
+        print(f"{args.files} files, {deb.stat().st_size / 1e6:.1f} MB package")
+
+        results = {}
+        for label, run in (('extract + sha256sum', lambda: run_extract(deb, work_dir)),
+                           ('in-stream FileHasher', lambda: run_stream(deb))):
+            start = time.perf_counter()
+            count = run()
+            results[label] = count / (time.perf_counter() - start)
+            print(f"  {label:<22} {results[label]:10.1f} files/sec")
+
+    before, after = results.values()
+    print(f"  speedup {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
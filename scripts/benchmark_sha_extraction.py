@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import hashlib
+import base64
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils import SHASplitter
+
+
+def make_samples(count: int):
+    """Build synthetic metadata records in the layouts the parsers see."""
+    deb, alpm, apk = [], [], []
+    for i in range(count):
+        data = f"package-{i}".encode()
+        sha256 = hashlib.sha256(data).hexdigest()
+        deb.append({
+            'Package': f"package-{i}",
+            'Version': f"1.{i}-1",
+            'Filename': f"pool/main/p/package-{i}/package-{i}_1.{i}-1_amd64.deb",
+            'SHA256': sha256,
+            'SHA512': hashlib.sha512(data).hexdigest(),
+        })
+        alpm.append({'name': f"package-{i}", 'version': f"1.{i}-1", 'sha256sum': sha256})
+        apk.append({'P': f"package-{i}", 'V': f"1.{i}-r0",
+                    'C': 'Q1' + base64.b64encode(hashlib.sha1(data).digest()).decode()})
+    return deb, alpm, apk
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare fast-path and regex hash extraction')
+    arg_parser.add_argument('--records', type=int, default=20000, help='Number of synthetic records')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = arg_parser.parse_args()
+    
+    splitter = SHASplitter()
+    deb, alpm, apk = make_samples(args.records)
+    
+    # Sanity check: both paths must agree before timing them
+    for record in deb:
+        assert splitter.extract_known_hashes(record, 'deb') == splitter.extract_from_package_metadata(record)
+    
+    cases = [
+        ('deb regex scan', lambda: [splitter.extract_from_package_metadata(r) for r in deb]),
+        ('deb known layout', lambda: [splitter.extract_known_hashes(r, 'deb') for r in deb]),
+        ('alpm regex scan', lambda: [splitter.extract_hashes(r['sha256sum']) for r in alpm]),
+        ('alpm known layout', lambda: [splitter.extract_known_hashes(r, 'alpm') for r in alpm]),
+        ('apk checksum decode', lambda: [splitter.decode_apk_checksum(r['C']) for r in apk]),
+    ]
+    
+    print(f"{args.records} records, best of {args.repeat}")
+    for label, func in cases:
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(f"  {label:<20} {best * 1000:8.1f} ms  ({best / args.records * 1e6:.2f} us/record)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import argparse
+import random
+import sqlite3
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'website_hash'))
+
+
+def make_queries(db_path: str, count: int):
+    """Build a mix of /api/search query strings from rows of the catalog."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    max_id = conn.execute("SELECT MAX(id) FROM files").fetchone()[0] or 0
+    if not max_id:
+        sys.exit(f"{db_path} has no files to search")
+    rng = random.Random(0)
+    queries = []
+    while len(queries) < count:
+        row = conn.execute("SELECT name, sha256 FROM file_rows WHERE id >= ? LIMIT 1",
+                           (rng.randint(1, max_id),)).fetchone()
+        if row is None:
+            continue
+        name, sha256 = row
+        queries.extend([
+            {'q': sha256},
+            {'q': name[:2]},
+            {'q': name},
+            {'q': '', 'sort_by': rng.choice(['name', 'sha256', 'file'])},
+        ])
+    conn.close()
+    return queries[:count]
+
+
+def run(app, queries, threads: int):
+    """Send every query through the Flask test client from several threads; return requests/sec."""
+    chunks = [queries[i::threads] for i in range(threads)]
+    errors = []
+
+    def worker(chunk):
+        client = app.test_client()
+        for params in chunk:
+            response = client.get('/api/search', query_string=params)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        sys.exit(f"{len(errors)} requests failed (status {errors[0]})")
+    return len(queries) / elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare per-request and pooled catalog connections in webapp.py')
+    arg_parser.add_argument('--db', required=True, help='Catalog database with files loaded')
+    arg_parser.add_argument('--requests', type=int, default=2000, help='Requests per run')
+    arg_parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+    arg_parser.add_argument('--pool-size', type=int, default=8, help='Pooled connections')
+    args = arg_parser.parse_args()
+
+    os.environ['CATALOG_DB'] = args.db
+    os.environ['CATALOG_POOL_SIZE'] = str(args.pool_size)
+    import webapp
+    from utils.catalog import CatalogPool
+
+    queries = make_queries(args.db, args.requests)
+    pool = CatalogPool(args.db, args.pool_size)
+
+    print(f"{args.requests} requests from {args.threads} threads against {args.db}")
+    results = {}
+    for label, use_pool in (('per-request connection', None), ('pooled connections', pool)):
+        webapp.POOL = use_pool
+        webapp._count_cache.clear()
+        run(webapp.app, queries[:args.threads * 10], args.threads)   # warm up
+        webapp._count_cache.clear()
+        results[label] = run(webapp.app, queries, args.threads)
+        print(f"  {label:<24} {results[label]:8.1f} requests/sec")
+    pool.close()
+
+    before, after = results.values()
+    print(f"  speedup {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
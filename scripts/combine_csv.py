@@ -25,6 +25,14 @@ def get_distribution_from_path(filepath):
     # Get parent directory name (e.g., 'rocky', 'ubuntu', 'centos')
     return path.parent.name
 
+def union_header(files):
+    """Columns of all files in order of first appearance (Alpine adds checksum columns)."""
+    columns = {}
+    for filepath in files:
+        with open(filepath, "r", encoding="utf-8") as infile:
+            columns.update(dict.fromkeys(next(csv.reader(infile), [])))
+    return list(columns)
+
 def combine_all_into_single_csv(output_file="combined_all_packages.csv"):
     """Combine all CSV files into a single file."""
     input_files = sorted(glob.glob("./output/*/*_packages.csv"))
@@ -34,26 +42,20 @@ def combine_all_into_single_csv(output_file="combined_all_packages.csv"):
 
     print(f"🔍 Found {len(input_files)} CSV files to combine")
     
-    header_written = False
     total_rows = 0
     
     with open(output_file, "w", newline="", encoding="utf-8") as outfile:
-        writer = None
+        # Rows are written by column name, files lacking a column leave it empty
+        writer = csv.DictWriter(outfile, fieldnames=union_header(input_files), restval="")
+        writer.writeheader()
         for filepath in input_files:
             print(f"📄 Processing: {filepath}")
             with open(filepath, "r", encoding="utf-8") as infile:
-                reader = csv.reader(infile)
-                try:
-                    header = next(reader)
-                except StopIteration:
+                reader = csv.DictReader(infile)
+                if not reader.fieldnames:
                     print(f"⚠️ Skipped empty file: {filepath}")
                     continue
 
-                if not header_written:
-                    writer = csv.writer(outfile)
-                    writer.writerow(header)
-                    header_written = True
-
                 file_rows = 0
                 for row in reader:
                     writer.writerow(row)
@@ -83,26 +85,19 @@ def combine_by_distribution():
         output_file = f"combined_{dist}_packages.csv"
         print(f"\n📦 Combining {dist} files into {output_file}")
         
-        header_written = False
         total_rows = 0
         
         with open(output_file, "w", newline="", encoding="utf-8") as outfile:
-            writer = None
+            writer = csv.DictWriter(outfile, fieldnames=union_header(files), restval="")
+            writer.writeheader()
             for filepath in sorted(files):
                 print(f"   📄 Processing: {os.path.basename(filepath)}")
                 with open(filepath, "r", encoding="utf-8") as infile:
-                    reader = csv.reader(infile)
-                    try:
-                        header = next(reader)
-                    except StopIteration:
+                    reader = csv.DictReader(infile)
+                    if not reader.fieldnames:
                         print(f"   ⚠️ Skipped empty file: {filepath}")
                         continue
 
-                    if not header_written:
-                        writer = csv.writer(outfile)
-                        writer.writerow(header)
-                        header_written = True
-
                     file_rows = 0
                     for row in reader:
                         writer.writerow(row)
@@ -197,6 +197,11 @@ main() {
     # Collate outputs
     collate_outputs
     
+    # Refresh the sha256 lookup index (only rewritten CSVs are recompiled)
+    if ! python3 "${ROOT_DIR}/utils/hash_index.py" --output-dir "$OUTPUT_DIR" build; then
+        log "WARNING: Failed to update sha256 index"
+    fi
+    
     # Generate summary
     generate_summary
     
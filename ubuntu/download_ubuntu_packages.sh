@@ -72,7 +72,6 @@ ESTIMATED TIME:
 
 REQUIREMENTS:
     - curl (for downloading)
-    - gunzip (for decompression)
     - python3 (for CSV generation)
 
 LICENSE:
@@ -153,20 +152,14 @@ download_packages_file() {
     local url="${base_url}/dists/${release}/${component}/binary-${arch}/Packages.gz"
     local output_file="${TEMP_DIR}/Packages_${release}_${component}_${arch}.gz"
     
+    # Keep Packages compressed - the parser streams it directly
+    rm -f "${output_file%.gz}"
+    
     log "Downloading: $url"
     
     if curl -f -L -o "$output_file" "$url"; then
         log "Successfully downloaded: $output_file"
-        
-        local uncompressed="${output_file%.gz}"
-        if gunzip -c "$output_file" > "$uncompressed"; then
-            log "Decompressed: $uncompressed"
-            rm "$output_file"
-            return 0
-        else
-            log "Failed to decompress: $output_file"
-            return 1
-        fi
+        return 0
     else
         log "Failed to download: $url"
         return 1
@@ -1,40 +1,41 @@
-import pandas as pd
 import argparse
+import os
+import sys
+from pathlib import Path
 
-# is this the most efficient way ? no.
-# i dont care its temporary 
-def update_url_in_csv(url, state, csv_file):
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.job_queue import JobQueue, STATES
+
+# States as they were written to urls.csv
+LEGACY_STATES = {'-1': 'pending', '0': 'running', '1': 'done'}
+
+
+def update_url_state(url, state, db_file):
     """
-    Updates a specific line in the csv_file based on the given URL and state.
+    Updates the state of the job for the given URL in the job queue.
 
     Args:
         url (str): The URL to update.
-        state (str): The state to update.
-        csv_file (str, optional): The path to the csv file. Defaults to 'urls.csv'.
-    """
+        state (str): The state to update (pending, running, done, failed or -1 / 0 / 1).
+        db_file (str): The path to the job queue database.
 
-    # Define the output file and write header only once
-    df = pd.read_csv(csv_file, on_bad_lines='warn')
-
-    # find the row where urls match
-    if url in df['urls'].values:
-        df.loc[df['urls'] == url, 'state'] = state
-        # print(f"Updated {url} to state '{state}")
-
-        df.to_csv(csv_file, index=False)
-    else:
-        # print(f"URL {url} not found in CSV")
-        return
+    Returns:
+        bool: True if the URL is queued.
+    """
+    with JobQueue(Path(db_file)) as jobs:
+        return jobs.set_state(url, LEGACY_STATES.get(state, state))
 
 
 def main():
-    parser = argparse.ArgumentParser(description='Update URL in CSV file')
+    parser = argparse.ArgumentParser(description='Update the state of a URL in the job queue')
     parser.add_argument('-u', '--url', required=True, help='The URL to update')
-    parser.add_argument('-s', '--state', required=True, help='The state to update')
-    parser.add_argument('-c', '--csv_file', default='urls.csv', help='The path to the csv file')
+    parser.add_argument('-s', '--state', required=True, choices=list(STATES) + list(LEGACY_STATES),
+                        help='The state to update')
+    parser.add_argument('-d', '--db', default='jobs.db', help='The path to the job queue database')
     args = parser.parse_args()
 
-    update_url_in_csv(args.url, args.state, args.csv_file)
+    if not update_url_state(args.url, args.state, args.db):
+        print(f"URL {args.url} not found in {args.db}")
 
 if __name__ == '__main__':
     main()
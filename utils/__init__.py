@@ -1,8 +1,26 @@
 #!/usr/bin/env python3
 
 from .license_detector import LicenseDetector
+from .spdx_normalizer import SPDXNormalizer
+from .digests import MultiDigest
 from .sha_splitter import SHASplitter
 from .purl_generator import PURLGenerator
 from .signature_verifier import SignatureVerifier
+from .hash_index import HashIndex, HashIndexBuilder
+from .repodata import RepodataReader, RpmPackage
+from .stanza_parser import StanzaParser
+from .package_writer import PackageWriter
+from .http_client import HTTPClient
+from .metadata_cache import MetadataCache
+from .parse_manifest import ParseManifest
+from .catalog import Catalog, CatalogPool
+from .job_queue import JobQueue
+from .file_hasher import FileHasher
+from .file_store import FileStore
+from .hashed_archives import HashedArchives
 
-__all__ = ['LicenseDetector', 'SHASplitter', 'PURLGenerator', 'SignatureVerifier']
\ No newline at end of file
+__all__ = ['LicenseDetector', 'SPDXNormalizer', 'MultiDigest', 'SHASplitter', 'PURLGenerator', 'SignatureVerifier',
+           'HashIndex', 'HashIndexBuilder', 'RepodataReader', 'RpmPackage', 'StanzaParser',
+           'PackageWriter', 'HTTPClient', 'MetadataCache',
+           'ParseManifest', 'Catalog', 'CatalogPool', 'JobQueue', 'FileHasher', 'FileStore',
+           'HashedArchives']
\ No newline at end of file
@@ -0,0 +1,691 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+
+DEFAULT_CATALOG = Path(__file__).resolve().parent.parent / 'output' / 'catalog.db'
+
+# Distros with a parser (output/<distro>/) and a hash_distro_files.sh output (<distro>/output/)
+KNOWN_DISTROS = ('ubuntu', 'debian', 'fedora', 'rocky', 'centos', 'arch', 'alpine', 'amazonlinux')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS distros (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS releases (
+    id INTEGER PRIMARY KEY,
+    distro_id INTEGER NOT NULL REFERENCES distros(id),
+    name TEXT NOT NULL,
+    UNIQUE (distro_id, name)
+);
+CREATE TABLE IF NOT EXISTS strings (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    release_id INTEGER NOT NULL REFERENCES releases(id),
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    sha512 TEXT NOT NULL,
+    component_id INTEGER NOT NULL REFERENCES strings(id),
+    architecture_id INTEGER NOT NULL REFERENCES strings(id),
+    url TEXT NOT NULL,
+    license_id INTEGER NOT NULL REFERENCES strings(id),
+    purl TEXT NOT NULL,
+    signature_verified_id INTEGER NOT NULL REFERENCES strings(id),
+    signature_method_id INTEGER NOT NULL REFERENCES strings(id),
+    signer_id INTEGER NOT NULL REFERENCES strings(id)
+);
+CREATE TABLE IF NOT EXISTS archives (
+    id INTEGER PRIMARY KEY,
+    distro_id INTEGER NOT NULL REFERENCES distros(id),
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    url TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    archive_id INTEGER NOT NULL REFERENCES archives(id),
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+DROP VIEW IF EXISTS package_rows;
+CREATE VIEW package_rows AS
+    SELECT p.id, d.name AS distro, p.name AS package, p.version, p.sha256, p.sha512,
+           c.value AS component, a.value AS architecture, p.url AS deb_url, l.value AS license,
+           p.purl, r.name AS release, sv.value AS signature_verified,
+           sm.value AS signature_method, s.value AS signer
+    FROM packages p
+    JOIN releases r ON r.id = p.release_id
+    JOIN distros d ON d.id = r.distro_id
+    JOIN strings c ON c.id = p.component_id
+    JOIN strings a ON a.id = p.architecture_id
+    JOIN strings l ON l.id = p.license_id
+    JOIN strings sv ON sv.id = p.signature_verified_id
+    JOIN strings sm ON sm.id = p.signature_method_id
+    JOIN strings s ON s.id = p.signer_id;
+DROP VIEW IF EXISTS file_rows;
+CREATE VIEW file_rows AS
+    SELECT f.id, f.archive_id, d.name AS distro, a.name, a.version, f.sha256, f.path AS file, a.url
+    FROM files f
+    JOIN archives a ON a.id = f.archive_id
+    JOIN distros d ON d.id = a.distro_id;
+"""
+
+# Secondary indexes: (name, table, columns). They are created after a bulk
+# load into an empty table instead of being maintained row by row.
+INDEXES = [
+    ('idx_packages_release', 'packages', 'release_id'),
+    ('idx_packages_sha256', 'packages', 'sha256'),
+    ('idx_packages_name', 'packages', 'name'),
+    ('idx_packages_purl', 'packages', 'purl'),
+    ('idx_archives_sha256', 'archives', 'sha256'),
+    ('idx_archives_name', 'archives', 'name'),
+    ('idx_archives_version', 'archives', 'version'),
+    ('idx_files_archive', 'files', 'archive_id'),
+    ('idx_files_sha256', 'files', 'sha256'),
+    ('idx_files_path', 'files', 'path'),
+]
+
+# Trigram full-text indexes for substring search: (name, table, columns).
+# They are external-content FTS5 tables kept in sync by triggers, and like
+# INDEXES are only built (in one pass) after a bulk load into an empty table.
+SEARCH_INDEXES = [
+    ('archives_fts', 'archives', 'name, version, url'),
+    ('files_fts', 'files', 'path'),
+]
+
+
+def csv_distro(csv_path: Path) -> str:
+    """
+    Work out the distribution of a CSV from where the pipeline writes it.
+
+    Args:
+        csv_path: Parser CSV (output/<distro>/) or hash_distro_files.sh CSV (<distro>/output/)
+
+    Returns:
+        Distribution name
+
+    Raises:
+        ValueError: If the CSV is not in a known distro's directory
+    """
+    directory = Path(csv_path).resolve().parent
+    distro = directory.parent.name if directory.name == 'output' else directory.name
+    if distro not in KNOWN_DISTROS:
+        raise ValueError(f"Cannot tell the distro of {csv_path} from its directory, pass the distro explicitly")
+    return distro
+
+
+class Catalog:
+    """
+    Normalized SQLite catalog of package metadata and file hashes.
+
+    Parser rows go into packages (one per package per release) and the
+    file-hash pipeline fills archives (one per downloaded package file) and
+    files (one per file inside an archive). Distros, releases and the
+    low-cardinality package columns are interned, and the package_rows and
+    file_rows views present the rows in their CSV shape.
+
+    The database runs in WAL mode so readers (the web app, update_sbom.py)
+    are never blocked by a load. Each load is a single transaction; indexes
+    of tables that were empty when it started are only built at commit.
+    Archive names / versions / URLs and file paths also get trigram FTS5
+    indexes (archives_fts, files_fts) for substring search.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        """
+        Args:
+            path: SQLite database file (created if missing unless readonly)
+            readonly: Open for queries only
+        """
+        self.path = Path(path)
+        self.readonly = readonly
+        if readonly:
+            # Read-only connections may be handed between threads by CatalogPool
+            self.conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, isolation_level=None,
+                                        check_same_thread=False, cached_statements=256)
+            self.conn.execute('PRAGMA query_only = ON')
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            self.conn.executescript(SCHEMA)
+        self.conn.execute('PRAGMA temp_store = MEMORY')
+        self.conn.execute('PRAGMA cache_size = -65536')
+        self.conn.execute('PRAGMA mmap_size = 268435456')
+        self._reset_caches()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        if self.conn.in_transaction:
+            self.rollback()
+        self.conn.close()
+
+    def _reset_caches(self):
+        self._strings: Dict[str, int] = {}
+        self._distros: Dict[str, int] = {}
+        self._releases: Dict[Tuple[int, str], int] = {}
+
+    # ------------------------------------------------------------------
+    # Transactions
+    # ------------------------------------------------------------------
+
+    def begin(self):
+        """Start a write transaction, deferring the indexes of empty tables."""
+        self.conn.execute('BEGIN IMMEDIATE')
+        empty = {table for table in {index[1] for index in INDEXES + SEARCH_INDEXES}
+                 if self.conn.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table})").fetchone()[0]}
+        for name, table, _ in INDEXES:
+            if table in empty:
+                self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+        for name, table, _ in SEARCH_INDEXES:
+            if table in empty:
+                self._drop_search_index(name, table)
+
+    def commit(self):
+        """Build any missing (deferred) indexes and commit the transaction."""
+        self.create_indexes()
+        self.conn.execute('COMMIT')
+        # Sampled statistics, so sorted pages are planned as index scans
+        self.conn.execute('PRAGMA analysis_limit = 1000')
+        self.conn.execute('ANALYZE')
+
+    def rollback(self):
+        """Abandon the transaction, leaving the catalog as it was."""
+        self.conn.execute('ROLLBACK')
+        self._reset_caches()
+
+    @contextmanager
+    def load(self) -> Iterator['Catalog']:
+        """
+        Run a write transaction that is committed if the block succeeds.
+
+        Returns:
+            Context manager yielding the catalog
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def create_indexes(self):
+        """Create every secondary and full-text index that does not exist yet."""
+        for name, table, columns in INDEXES:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+        for name, table, columns in SEARCH_INDEXES:
+            self._create_search_index(name, table, columns)
+
+    def _create_search_index(self, name: str, table: str, columns: str):
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone():
+            return
+        new_values = ', '.join(f"new.{column.strip()}" for column in columns.split(','))
+        old_values = ', '.join(f"old.{column.strip()}" for column in columns.split(','))
+        self.conn.execute(f"CREATE VIRTUAL TABLE {name} USING fts5({columns}, content='{table}', "
+                          f"content_rowid='id', tokenize='trigram')")
+        # One pass over the table instead of a trigger firing per inserted row
+        self.conn.execute(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+        # Statement by statement: executescript() would commit the load transaction
+        self.conn.execute(f"CREATE TRIGGER {name}_insert AFTER INSERT ON {table} BEGIN "
+                          f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new_values}); END")
+        self.conn.execute(f"CREATE TRIGGER {name}_delete AFTER DELETE ON {table} BEGIN "
+                          f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END")
+        self.conn.execute(f"CREATE TRIGGER {name}_update AFTER UPDATE ON {table} BEGIN "
+                          f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                          f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new_values}); END")
+
+    def _drop_search_index(self, name: str, table: str):
+        for trigger in ('insert', 'delete', 'update'):
+            self.conn.execute(f"DROP TRIGGER IF EXISTS {name}_{trigger}")
+        self.conn.execute(f"DROP TABLE IF EXISTS {name}")
+
+    # ------------------------------------------------------------------
+    # Interning
+    # ------------------------------------------------------------------
+
+    def intern(self, value: str) -> int:
+        """
+        Return the id of a string in the strings table, adding it if needed.
+
+        Args:
+            value: String to intern
+
+        Returns:
+            Row id of the string
+        """
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = self._get_or_insert('strings', value=value)
+            self._strings[value] = string_id
+        return string_id
+
+    def distro_id(self, distro: str) -> int:
+        """
+        Return the id of a distro, adding it if needed.
+
+        Args:
+            distro: Distribution name (ubuntu, fedora, ...)
+
+        Returns:
+            Row id of the distro
+        """
+        distro_id = self._distros.get(distro)
+        if distro_id is None:
+            distro_id = self._get_or_insert('distros', name=distro)
+            self._distros[distro] = distro_id
+        return distro_id
+
+    def release_id(self, distro: str, release: str) -> int:
+        """
+        Return the id of a distro release, adding it if needed.
+
+        Args:
+            distro: Distribution name
+            release: Release as written in the parser output (jammy, el9, fc40, ...)
+
+        Returns:
+            Row id of the release
+        """
+        key = (self.distro_id(distro), release)
+        release_id = self._releases.get(key)
+        if release_id is None:
+            release_id = self._get_or_insert('releases', distro_id=key[0], name=release)
+            self._releases[key] = release_id
+        return release_id
+
+    def _get_or_insert(self, table: str, **values) -> int:
+        columns = ', '.join(values)
+        where = ' AND '.join(f"{column} = ?" for column in values)
+        params = tuple(values.values())
+        self.conn.execute(f"INSERT OR IGNORE INTO {table} ({columns}) VALUES ({', '.join('?' * len(values))})",
+                          params)
+        return self.conn.execute(f"SELECT id FROM {table} WHERE {where}", params).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def package_loader(self, distro: str) -> 'PackageLoader':
+        """
+        Start loading parser rows for a distro (within a transaction).
+
+        Args:
+            distro: Distribution name
+
+        Returns:
+            PackageLoader for the distro
+        """
+        return PackageLoader(self, distro)
+
+    def add_archive(self, distro: str, name: str, version: str, sha256: str, url: str,
+                    files: Iterable[Tuple[str, str]] = (), replace_files: bool = True) -> int:
+        """
+        Record a hashed package file and its contents, replacing any earlier record of the same URL.
+
+        Args:
+            distro: Distribution name
+            name: Package name
+            version: Package version
+            sha256: SHA-256 of the package file
+            url: URL the package file was downloaded from
+            files: (sha256, path) pairs of the files inside the package
+            replace_files: Drop the files previously recorded for the URL
+
+        Returns:
+            Row id of the archive
+        """
+        distro_id = self.distro_id(distro)
+        row = self.conn.execute("SELECT id FROM archives WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            archive_id = self.conn.execute(
+                "INSERT INTO archives (distro_id, name, version, sha256, url) VALUES (?, ?, ?, ?, ?)",
+                (distro_id, name, version, sha256.lower(), url)).lastrowid
+        else:
+            archive_id = row[0]
+            # An empty sha256 (files.csv rows) keeps the archive hash already known
+            self.conn.execute("UPDATE archives SET distro_id = ?, name = ?, version = ?, "
+                              "sha256 = COALESCE(NULLIF(?, ''), sha256) WHERE id = ?",
+                              (distro_id, name, version, sha256.lower(), archive_id))
+            if replace_files:
+                self.conn.execute("DELETE FROM files WHERE archive_id = ?", (archive_id,))
+        self.add_files(archive_id, files)
+        return archive_id
+
+    def add_files(self, archive_id: int, files: Iterable[Tuple[str, str]]) -> int:
+        """
+        Add files to an archive.
+
+        Args:
+            archive_id: Archive returned by add_archive
+            files: (sha256, path) pairs
+
+        Returns:
+            Number of files added
+        """
+        count = 0
+        batch = []
+        for sha256, path in files:
+            batch.append((archive_id, sha256.lower(), path))
+            if len(batch) >= BATCH_SIZE:
+                count += self._insert_files(batch)
+                batch = []
+        if batch:
+            count += self._insert_files(batch)
+        return count
+
+    def _insert_files(self, batch: List[Tuple[int, str, str]]) -> int:
+        self.conn.executemany("INSERT INTO files (archive_id, sha256, path) VALUES (?, ?, ?)", batch)
+        return len(batch)
+
+    def import_csv(self, csv_path: Path, distro: Optional[str] = None) -> int:
+        """
+        Load a parser output CSV or a hash_distro_files.sh CSV (files.csv or packages.csv).
+
+        Args:
+            csv_path: CSV to load
+            distro: Distribution name (defaults to the distro whose directory holds the CSV, see csv_distro)
+
+        Returns:
+            Number of rows loaded
+
+        Raises:
+            ValueError: If no distro is given and the CSV is not in a known distro's directory
+        """
+        csv_path = Path(csv_path)
+        distro = distro or csv_distro(csv_path)
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f, self.load():
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            if 'purl' in fieldnames:
+                loader = self.package_loader(distro)
+                for row in reader:
+                    loader.add(row)
+                loader.finish()
+                return loader.count
+
+            # files.csv rows carry file hashes, packages.csv rows archive hashes
+            has_files = 'file' in fieldnames
+            count = 0
+            archives: Dict[str, int] = {}
+            batch = []
+            for row in reader:
+                archive_id = archives.get(row['url'])
+                if archive_id is None:
+                    archive_id = self.add_archive(distro, row['name'], row['version'],
+                                                  '' if has_files else row['sha256'], row['url'],
+                                                  replace_files=has_files)
+                    archives[row['url']] = archive_id
+                count += 1
+                if has_files:
+                    batch.append((archive_id, row['sha256'].lower(), row['file']))
+                    if len(batch) >= BATCH_SIZE:
+                        self._insert_files(batch)
+                        batch = []
+            if batch:
+                self._insert_files(batch)
+            return count
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def lookup_sha256(self, sha256: str) -> List[Dict[str, str]]:
+        """
+        Find every package row with the given sha256.
+
+        Args:
+            sha256: Hex encoded SHA256 digest
+
+        Returns:
+            List of row dictionaries (with an extra 'distro' key), empty if not found
+        """
+        cursor = self.conn.execute("SELECT * FROM package_rows WHERE sha256 = ?", ((sha256 or '').lower(),))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def purl_for(self, sha256: str, distro: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        Resolve a sha256 to its (purl, distro) pair.
+
+        Args:
+            sha256: Hex encoded SHA256 digest
+            distro: Only consider rows of this distro
+
+        Returns:
+            Tuple of (purl, distro) for the first matching row, or None
+        """
+        sql = ("SELECT p.purl, d.name FROM packages p JOIN releases r ON r.id = p.release_id "
+               "JOIN distros d ON d.id = r.distro_id WHERE p.sha256 = ? AND p.purl != ''")
+        params = [(sha256 or '').lower()]
+        if distro is not None:
+            sql += " AND d.name = ?"
+            params.append(distro)
+        row = self.conn.execute(sql + " LIMIT 1", params).fetchone()
+        return tuple(row) if row else None
+
+
+class CatalogPool:
+    """
+    Fixed-size pool of long-lived read-only catalog connections.
+
+    Connections keep their page cache, memory map and prepared statements
+    (sqlite3 caches them per connection by SQL text) between requests,
+    instead of paying for a fresh open on each one. The most recently
+    returned connection is handed out first, so its cache stays warm.
+    """
+
+    def __init__(self, path: Path, size: int = 8):
+        """
+        Args:
+            path: Catalog database
+            size: Maximum number of open connections
+        """
+        self.path = Path(path)
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Catalog:
+        """
+        Take a connection, opening one if fewer than size are open or else waiting for one.
+
+        Returns:
+            Read-only Catalog, to be given back with release()
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if not can_open:
+            return self._idle.get()
+        try:
+            return Catalog(self.path, readonly=True)
+        except BaseException:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def release(self, catalog: Catalog):
+        """
+        Give a connection back to the pool.
+
+        Args:
+            catalog: Connection from acquire()
+        """
+        self._idle.put(catalog)
+
+    @contextmanager
+    def connection(self) -> Iterator[Catalog]:
+        """
+        Borrow a connection for the duration of a with block.
+
+        Returns:
+            Context manager yielding a read-only Catalog
+        """
+        catalog = self.acquire()
+        try:
+            yield catalog
+        finally:
+            self.release(catalog)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                catalog = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            catalog.close()
+            with self._lock:
+                self._opened -= 1
+
+
+class PackageLoader:
+    """
+    Loads parser rows for one distro into the catalog.
+
+    Rows are inserted in batches. finish() then removes the rows that the
+    touched releases had before the load, so reloading a release replaces
+    it, the same way its per-release CSV is replaced.
+    """
+
+    def __init__(self, catalog: Catalog, distro: str):
+        self.catalog = catalog
+        self.distro = distro
+        self.count = 0
+        self._release_ids = set()
+        self._batch = []
+        self._first_id = catalog.conn.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM packages").fetchone()[0]
+
+    def add(self, row: Dict[str, str], release: Optional[str] = None):
+        """
+        Add one package row.
+
+        Args:
+            row: Package metadata dictionary with the FIELDNAMES keys
+            release: Release of the row (defaults to row['release'])
+        """
+        catalog = self.catalog
+        release_id = catalog.release_id(self.distro, release or row.get('release') or '')
+        self._release_ids.add(release_id)
+        self._batch.append((
+            release_id, row.get('package') or '', row.get('version') or '',
+            (row.get('sha256') or '').lower(), (row.get('sha512') or '').lower(),
+            catalog.intern(row.get('component') or ''), catalog.intern(row.get('architecture') or ''),
+            row.get('deb_url') or '', catalog.intern(row.get('license') or ''), row.get('purl') or '',
+            catalog.intern(row.get('signature_verified') or ''), catalog.intern(row.get('signature_method') or ''),
+            catalog.intern(row.get('signer') or '')
+        ))
+        if len(self._batch) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self.catalog.conn.executemany(
+            "INSERT INTO packages (release_id, name, version, sha256, sha512, component_id, architecture_id, "
+            "url, license_id, purl, signature_verified_id, signature_method_id, signer_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._batch)
+        self.count += len(self._batch)
+        self._batch = []
+
+    def finish(self) -> int:
+        """
+        Insert the remaining rows and drop the replaced rows of every touched release.
+
+        Returns:
+            Number of rows loaded
+        """
+        if self._batch:
+            self._flush()
+        for release_id in self._release_ids:
+            self.catalog.conn.execute("DELETE FROM packages WHERE id < ? AND release_id = ?",
+                                      (self._first_id, release_id))
+        return self.count
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description='Load or query the SQLite package catalog')
+    arg_parser.add_argument('--db', default=str(DEFAULT_CATALOG), help='Catalog database')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Load parser or hash_distro_files.sh CSVs')
+    import_parser.add_argument('--distro',
+                               help='Distribution name (required unless each CSV is in output/<distro>/ or <distro>/output/)')
+    import_parser.add_argument('csv', nargs='+')
+
+    archive_parser = subparsers.add_parser('add-archive',
+                                           help='Record a hashed package; reads "sha256<TAB>path" lines from stdin')
+    archive_parser.add_argument('--distro', required=True)
+    archive_parser.add_argument('--name', required=True)
+    archive_parser.add_argument('--version', required=True)
+    archive_parser.add_argument('--sha256', required=True)
+    archive_parser.add_argument('--url', required=True)
+
+    sha_parser = subparsers.add_parser('sha256', help='Look up a package sha256')
+    sha_parser.add_argument('sha256')
+
+    args = arg_parser.parse_args()
+
+    if args.command == 'sha256':
+        with Catalog(Path(args.db), readonly=True) as catalog:
+            results = catalog.lookup_sha256(args.sha256)
+        if not results:
+            print("No match found")
+            sys.exit(1)
+        for row in results:
+            print(json.dumps(row))
+        return
+
+    if args.command == 'import':
+        # Check every CSV before loading any of them
+        try:
+            distros = {csv_path: args.distro or csv_distro(Path(csv_path)) for csv_path in args.csv}
+        except ValueError as e:
+            arg_parser.error(str(e))
+
+    with Catalog(Path(args.db)) as catalog:
+        if args.command == 'import':
+            for csv_path in args.csv:
+                count = catalog.import_csv(Path(csv_path), distros[csv_path])
+                logger.info(f"Loaded {count} rows from {csv_path} into {args.db}")
+        else:
+            files = (line.rstrip('\n').split('\t', 1) for line in sys.stdin if '\t' in line)
+            with catalog.load():
+                catalog.add_archive(args.distro, args.name, args.version, args.sha256, args.url, files)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import bz2
+import gzip
+import lzma
+import tarfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for zstd compressed metadata and packages
+    zstandard = None
+
+MAGIC_NUMBERS = {
+    'gz': b'\x1f\x8b',
+    'xz': b'\xfd7zXZ\x00',
+    'bz2': b'BZh',
+    'zst': b'\x28\xb5\x2f\xfd',
+}
+
+SUFFIXES = {
+    '.gz': 'gz',
+    '.tgz': 'gz',
+    '.xz': 'xz',
+    '.bz2': 'bz2',
+    '.zst': 'zst',
+    '.zstd': 'zst',
+}
+
+
+def detect_compression(name: Optional[str] = None, header: bytes = b'') -> str:
+    """
+    Work out the compression of a file from its name or leading bytes.
+
+    Args:
+        name: File name or URL (the suffix is checked first)
+        header: First bytes of the content, used when the name is inconclusive
+
+    Returns:
+        One of 'gz', 'xz', 'bz2', 'zst' or '' for uncompressed data
+    """
+    if name:
+        suffix = Path(name.split('?', 1)[0]).suffix.lower()
+        if suffix in SUFFIXES:
+            return SUFFIXES[suffix]
+    for compression, magic in MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return compression
+    return ''
+
+
+def open_decompressed(source: Union[str, Path, BinaryIO], name: Optional[str] = None) -> BinaryIO:
+    """
+    Open a possibly compressed file as a binary stream of decompressed bytes.
+
+    Decompression is streamed, so the full payload is never held in memory.
+
+    Args:
+        source: Path to a file, or a binary file object (e.g. an HTTP response body)
+        name: File name or URL used to detect the compression of a file object
+
+    Returns:
+        Readable binary file object; closing it closes a file opened from a path
+    """
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        with open(path, 'rb') as f:
+            header = f.read(8)
+        compression = detect_compression(name or path.name, header)
+        if compression == 'gz':
+            return gzip.open(path, 'rb')
+        if compression == 'xz':
+            return lzma.open(path, 'rb')
+        if compression == 'bz2':
+            return bz2.open(path, 'rb')
+        if compression == 'zst':
+            return _open_zstd(open(path, 'rb'), closefd=True)
+        return open(path, 'rb')
+
+    header = source.peek(8)[:8] if hasattr(source, 'peek') else b''
+    compression = detect_compression(name, header)
+    if compression == 'gz':
+        return gzip.GzipFile(fileobj=source, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(source, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(source, mode='rb')
+    if compression == 'zst':
+        return _open_zstd(source, closefd=False)
+    return source
+
+
+def iter_tar_members(source: Union[str, Path, BinaryIO], name: Optional[str] = None) -> Iterator[Tuple[tarfile.TarInfo, BinaryIO]]:
+    """
+    Stream the regular file members of a (possibly compressed) tar archive.
+
+    The archive is read front to back in a single pass, without building the
+    member index that tarfile.getmembers() needs, so it can come straight
+    from an HTTP response. Concatenated gzip streams (as in Alpine's
+    APKINDEX.tar.gz) are read as one archive. Each member's file object is
+    only valid until the next member is requested.
+
+    Args:
+        source: Path to a .tar[.gz|.xz|.bz2|.zst] file or a binary file object
+        name: File name or URL used to detect the compression of a file object
+
+    Returns:
+        Iterator of (member info, member file object) tuples
+    """
+    stream = open_decompressed(source, name)
+    try:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if member.isfile():
+                    yield member, tar.extractfile(member)
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def _open_zstd(fileobj: BinaryIO, closefd: bool) -> BinaryIO:
+    if zstandard is None:
+        raise RuntimeError("zstandard is required to read zstd compressed data (.zst files, package payloads): "
+                           "pip3 install zstandard")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True, closefd=closefd)
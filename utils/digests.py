@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import hashlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Sequence, Tuple, Union
+
+CHUNK_SIZE = 1 << 20
+
+# Supported algorithms; sha256 is always computed since it keys every lookup
+ALGORITHMS = ('sha256', 'sha1', 'sha512', 'blake2b', 'md5')
+DEFAULT_ALGORITHMS = ('sha256',)
+
+
+def parse_algorithms(spec: Union[str, Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Normalize a list of digest algorithms, e.g. from --digests sha256,sha1,md5.
+
+    Args:
+        spec: Comma separated names or an iterable of names ('all' selects every algorithm)
+
+    Returns:
+        Tuple of unique algorithm names, starting with sha256
+    """
+    names = spec.split(',') if isinstance(spec, str) else list(spec)
+    names = [name.strip().lower() for name in names if name.strip()]
+    if 'all' in names:
+        names = list(ALGORITHMS)
+    unknown = [name for name in names if name not in ALGORITHMS]
+    if unknown:
+        raise ValueError(f"Unsupported digest algorithm(s): {', '.join(unknown)} (choose from {', '.join(ALGORITHMS)})")
+    return tuple(dict.fromkeys(['sha256'] + names))
+
+
+class MultiDigest:
+    """
+    Computes a configurable set of digests over each byte stream in a single pass.
+
+    Data is read with readinto() into one reusable buffer and every chunk
+    is fed to all the hash objects, so extra algorithms cost hashing time
+    but never another read of the data.
+    """
+
+    def __init__(self, algorithms: Sequence[str] = DEFAULT_ALGORITHMS, chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            algorithms: Algorithm names (see ALGORITHMS); sha256 is always included
+            chunk_size: Read buffer size in bytes
+        """
+        self.algorithms = parse_algorithms(algorithms)
+        self.chunk_size = chunk_size
+        self._buffer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buffer'] = None
+        return state
+
+    def new(self) -> List:
+        """
+        Create a fresh hash object for each algorithm.
+
+        Returns:
+            List of hashlib objects, in self.algorithms order
+        """
+        return [hashlib.new(name) for name in self.algorithms]
+
+    def hexdigests(self, hashes: List) -> Dict[str, str]:
+        """
+        Finish hash objects created by new().
+
+        Args:
+            hashes: Hash objects from new()
+
+        Returns:
+            Dictionary of algorithm name to hex digest
+        """
+        return {name: h.hexdigest() for name, h in zip(self.algorithms, hashes)}
+
+    def digest_stream(self, stream: BinaryIO) -> Dict[str, str]:
+        """
+        Hash a stream to its end.
+
+        Args:
+            stream: Binary stream (readinto is used when available)
+
+        Returns:
+            Dictionary of algorithm name to hex digest
+        """
+        if self._buffer is None:
+            self._buffer = bytearray(self.chunk_size)
+        buffer = self._buffer
+        view = memoryview(buffer)
+        hashes = self.new()
+        updates = [h.update for h in hashes]
+        readinto = getattr(stream, 'readinto', None)
+        while True:
+            if readinto is not None:
+                count = readinto(buffer)
+                data = view[:count] if count else None
+            else:
+                data = stream.read(self.chunk_size)
+                count = len(data)
+            if not count:
+                break
+            for update in updates:
+                update(data)
+        return self.hexdigests(hashes)
+
+    def digest_file(self, path: Union[str, Path]) -> Dict[str, str]:
+        """
+        Hash a file.
+
+        Args:
+            path: File to hash
+
+        Returns:
+            Dictionary of algorithm name to hex digest
+        """
+        with open(path, 'rb', buffering=0) as f:
+            if len(self.algorithms) == 1 and hasattr(hashlib, 'file_digest'):  # Python 3.11+
+                return {self.algorithms[0]: hashlib.file_digest(f, self.algorithms[0]).hexdigest()}
+            return self.digest_stream(f)
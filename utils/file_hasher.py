@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+
+import csv
+import io
+import logging
+import os
+import stat
+import sys
+import tarfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.compression import open_decompressed
+from utils.digests import ALGORITHMS, DEFAULT_ALGORITHMS, MultiDigest, parse_algorithms
+from utils.hashed_archives import HashedArchives, archive_filename, load_published
+from utils.http_client import HTTPClient
+from utils.job_queue import JobQueue
+from utils.parallel import resolve_jobs
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+
+PACKAGE_FIELDNAMES = ['name', 'version', 'sha256', 'url']
+FILE_FIELDNAMES = ['name', 'version', 'sha256', 'file', 'url']
+
+RPM_LEAD_MAGIC = b'\xed\xab\xee\xdb'
+RPM_HEADER_MAGIC = b'\x8e\xad\xe8\x01'
+RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE = 1000, 1001, 1002
+
+
+class _HashingReader(io.RawIOBase):
+    """Raw stream wrapper that feeds every byte read into a set of digests."""
+
+    def __init__(self, raw: BinaryIO, hashes: List):
+        self._raw = raw
+        self.hashes = hashes
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._raw.readinto(buffer)
+        if count:
+            data = memoryview(buffer)[:count]
+            for h in self.hashes:
+                h.update(data)
+            self.size += count
+        return count
+
+
+class _LimitedReader(io.RawIOBase):
+    """Reads at most size bytes of an underlying stream (one archive member)."""
+
+    def __init__(self, stream: BinaryIO, size: int):
+        self._stream = stream
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self.remaining]
+        count = self._stream.readinto(view)
+        if not count:
+            raise EOFError("Archive member is truncated")
+        self.remaining -= count
+        return count
+
+    def drain(self):
+        """Skip the unread rest of the member."""
+        while self.remaining > 0:
+            chunk = self._stream.read(min(self.remaining, CHUNK_SIZE))
+            if not chunk:
+                raise EOFError("Archive member is truncated")
+            self.remaining -= len(chunk)
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError(f"Expected {size} bytes, got {len(data)}")
+    return data
+
+
+def _normalize_path(name: str) -> str:
+    # Paths are recorded relative to the package root, as after extraction
+    while name.startswith('./'):
+        name = name[2:]
+    return name.lstrip('/')
+
+
+def archive_kind(name: str) -> Optional[str]:
+    """
+    Work out the package format from a file name or URL.
+
+    Args:
+        name: Package file name or URL
+
+    Returns:
+        'deb', 'rpm', 'apk' or 'tar' (Arch .pkg.tar.*), or None if unknown
+    """
+    name = name.split('?', 1)[0].lower()
+    if name.endswith(('.deb', '.udeb')):
+        return 'deb'
+    if name.endswith('.rpm'):
+        return 'rpm'
+    if name.endswith('.apk'):
+        return 'apk'
+    if '.pkg.tar' in name:
+        return 'tar'
+    return None
+
+
+def package_identity(filename: str, kind: str) -> Tuple[str, str]:
+    """
+    Derive the package name and version from a package file name.
+
+    Args:
+        filename: Package file name (name_version_arch.deb, name-ver-rel-arch.pkg.tar.zst, name-ver-rN.apk)
+        kind: Package format from archive_kind
+
+    Returns:
+        Tuple of (name, version); empty strings when the name does not follow the convention
+    """
+    if kind == 'deb':
+        parts = filename.split('_')
+        return parts[0], parts[1] if len(parts) > 1 else ''
+    if kind == 'tar':
+        parts = filename.split('.pkg.tar', 1)[0].split('-')
+        if len(parts) >= 4:
+            return '-'.join(parts[:-3]), '-'.join(parts[-3:-1])
+    if kind == 'apk':
+        parts = filename[:-len('.apk')].split('-')
+        if len(parts) >= 3:
+            return '-'.join(parts[:-2]), '-'.join(parts[-2:])
+    return filename, ''
+
+
+def iter_tar(stream: BinaryIO, name: str) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    Stream the files of a (possibly compressed) tar archive.
+
+    Args:
+        stream: Binary stream positioned at the start of the archive
+        name: Archive name, used to detect its compression
+
+    Returns:
+        Iterator of (path, file object, None) for regular files and
+        (path, None, target path) for hard links
+    """
+    decompressed = open_decompressed(stream, name)
+    try:
+        with tarfile.open(fileobj=decompressed, mode='r|') as tar:
+            for member in tar:
+                if member.isfile():
+                    yield _normalize_path(member.name), tar.extractfile(member), None
+                elif member.islnk():
+                    yield _normalize_path(member.name), None, _normalize_path(member.linkname)
+    finally:
+        if decompressed is not stream:
+            decompressed.close()
+
+
+def iter_deb(stream: BinaryIO) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    Stream the files of a .deb (an ar archive whose data.tar.* holds the files).
+
+    Args:
+        stream: Binary stream positioned at the start of the package
+
+    Returns:
+        Iterator of (path, file object, hard link target) tuples, as from iter_tar
+    """
+    if stream.read(8) != b'!<arch>\n':
+        raise ValueError("Not a Debian package (missing ar header)")
+    while True:
+        header = stream.read(60)
+        if not header:
+            return
+        if len(header) != 60:
+            raise EOFError("Truncated ar member header")
+        member_name = header[:16].decode('ascii', 'replace').strip().rstrip('/')
+        size = int(header[48:58])
+        member = _LimitedReader(stream, size)
+        if member_name.startswith('data.tar'):
+            yield from iter_tar(io.BufferedReader(member, CHUNK_SIZE), member_name)
+        member.drain()
+        if size % 2:
+            stream.read(1)
+
+
+def _read_rpm_header(stream: BinaryIO) -> Tuple[Dict[int, str], int]:
+    """Read one RPM header structure; return its string tags and its size in bytes."""
+    intro = _read_exact(stream, 16)
+    if intro[:4] != RPM_HEADER_MAGIC:
+        raise ValueError("Bad RPM header magic")
+    count = int.from_bytes(intro[8:12], 'big')
+    data_size = int.from_bytes(intro[12:16], 'big')
+    index = _read_exact(stream, count * 16)
+    store = _read_exact(stream, data_size)
+
+    tags = {}
+    for i in range(0, len(index), 16):
+        tag = int.from_bytes(index[i:i + 4], 'big')
+        tag_type = int.from_bytes(index[i + 4:i + 8], 'big')
+        offset = int.from_bytes(index[i + 8:i + 12], 'big')
+        if tag_type in (6, 9) and tag in (RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE):  # STRING, I18NSTRING
+            end = store.find(b'\0', offset)
+            tags[tag] = store[offset:end].decode('utf-8', 'replace')
+    return tags, 16 + len(index) + len(store)
+
+
+def iter_rpm(stream: BinaryIO, info: Dict[str, str]) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    Stream the files of an .rpm from its compressed cpio payload.
+
+    Args:
+        stream: Buffered binary stream positioned at the start of the package
+        info: Receives the 'name' and 'version' (VERSION-RELEASE) from the RPM header
+
+    Returns:
+        Iterator of (path, file object, hard link target) tuples, as from iter_tar
+    """
+    lead = _read_exact(stream, 96)
+    if lead[:4] != RPM_LEAD_MAGIC:
+        raise ValueError("Not an RPM package (missing lead)")
+    _, signature_size = _read_rpm_header(stream)
+    stream.read((8 - signature_size % 8) % 8)  # the signature header is padded to 8 bytes
+    tags, _ = _read_rpm_header(stream)
+    info['name'] = tags.get(RPMTAG_NAME, '')
+    info['version'] = '-'.join(v for v in (tags.get(RPMTAG_VERSION), tags.get(RPMTAG_RELEASE)) if v)
+
+    payload = open_decompressed(stream)
+    try:
+        yield from iter_cpio(payload)
+    finally:
+        if payload is not stream:
+            payload.close()
+
+
+def iter_cpio(stream: BinaryIO) -> Iterator[Tuple[str, Optional[BinaryIO], Optional[str]]]:
+    """
+    Stream the files of a cpio archive in the "new ASCII" (newc / crc) format.
+
+    Hard-linked files carry their data on the last link only; the earlier
+    links are reported once it has been read. Links of an empty file never
+    get a data entry, so those are reported as empty files at the trailer.
+
+    Args:
+        stream: Binary stream of the uncompressed archive
+
+    Returns:
+        Iterator of (path, file object, hard link target) tuples, as from iter_tar
+    """
+    pending_links: Dict[Tuple[int, int, int], List[str]] = {}
+    while True:
+        header = _read_exact(stream, 110)
+        if header[:6] not in (b'070701', b'070702'):
+            raise ValueError("Unsupported cpio format")
+        fields = [int(header[6 + 8 * i:14 + 8 * i], 16) for i in range(13)]
+        inode, mode, nlink, size = fields[0], fields[1], fields[4], fields[6]
+        device = (fields[7], fields[8])
+        name_size = fields[11]
+        name = _read_exact(stream, name_size)[:-1].decode('utf-8', 'surrogateescape')
+        _read_exact(stream, (4 - (110 + name_size) % 4) % 4)
+        if name == 'TRAILER!!!':
+            for paths in pending_links.values():
+                yield paths[0], io.BytesIO(), None
+                for link in paths[1:]:
+                    yield link, None, paths[0]
+            return
+
+        path = _normalize_path(name)
+        member = _LimitedReader(stream, size)
+        if stat.S_ISREG(mode):
+            key = (*device, inode)
+            if nlink > 1 and size == 0:
+                pending_links.setdefault(key, []).append(path)
+            else:
+                yield path, member, None
+                for link in pending_links.pop(key, []):
+                    yield link, None, path
+        member.drain()
+        _read_exact(stream, (4 - size % 4) % 4)
+
+
+class FileHasher:
+    """
+    Hashes package archives and every file inside them without unpacking to disk.
+
+    Each archive is streamed once, straight from its mirror or a local file:
+    the archive digest is computed on the bytes as they arrive while the
+    payload (deb ar + tar, rpm cpio, apk / Arch tar) is decompressed and
+    walked in memory, hashing each member with a reusable buffer. Every
+    requested digest algorithm is computed in that same pass. Packages are
+    processed by a pool of worker processes and the parent writes the rows
+    to packages.csv / files.csv in batches.
+    """
+
+    def __init__(self, distro: str, http_client: Optional[HTTPClient] = None, chunk_size: int = CHUNK_SIZE,
+                 algorithms: Sequence[str] = DEFAULT_ALGORITHMS):
+        """
+        Args:
+            distro: Distribution name recorded with the hashes
+            http_client: Client used for downloads (a new one if None)
+            chunk_size: Read buffer size in bytes
+            algorithms: Digest algorithms computed for archives and files (sha256 is always included)
+        """
+        self.distro = distro
+        self.http_client = http_client or HTTPClient()
+        self.chunk_size = chunk_size
+        self.digester = MultiDigest(algorithms, chunk_size)
+        self.algorithms = self.digester.algorithms
+
+    def hash_archive(self, stream: BinaryIO, name: str) -> Dict:
+        """
+        Hash a package archive and the files it contains in one pass.
+
+        Args:
+            stream: Raw binary stream of the package file
+            name: Package file name or URL (selects the format)
+
+        Returns:
+            Dictionary with 'name', 'version', 'sha256' and 'digests' (of the
+            archive, by algorithm) and 'files' (list of (digests, path) tuples)
+        """
+        kind = archive_kind(name)
+        if kind is None:
+            raise ValueError(f"Unknown package format: {name}")
+        filename = os.path.basename(name.split('?', 1)[0])
+        package_name, version = package_identity(filename, kind)
+        info = {'name': package_name, 'version': version}
+
+        hashes = self.digester.new()
+        reader = _HashingReader(stream, hashes)
+        buffered = io.BufferedReader(reader, self.chunk_size)
+        if kind == 'deb':
+            members = iter_deb(buffered)
+        elif kind == 'rpm':
+            members = iter_rpm(buffered, info)
+        else:
+            members = iter_tar(buffered, filename if kind == 'tar' else filename + '.tar.gz')
+
+        files = []
+        seen = {}
+        missing = dict.fromkeys(self.algorithms, '')
+        for path, member, link in members:
+            digests = self.digester.digest_stream(member) if member is not None else seen.get(link, missing)
+            seen[path] = digests
+            files.append((digests, path))
+
+        # Whatever follows the payload still belongs to the archive digest
+        while buffered.read(self.chunk_size):
+            pass
+        digests = self.digester.hexdigests(hashes)
+        return dict(info, sha256=digests['sha256'], digests=digests, files=files)
+
+    def hash_package(self, source: str) -> Dict:
+        """
+        Download (or open) one package and hash it; errors are returned, not raised.
+
+        Args:
+            source: Package URL or local path
+
+        Returns:
+            Result of hash_archive plus 'url' and 'error' (None on success)
+        """
+        try:
+            if source.startswith(('http://', 'https://')):
+                with self.http_client.stream(source) as response:
+                    result = self.hash_archive(response.raw, source)
+            else:
+                with open(source, 'rb', buffering=0) as f:
+                    result = self.hash_archive(f, source)
+        except Exception as e:
+            return {'url': source, 'error': f"{type(e).__name__}: {e}"}
+        result.update(url=source, error=None)
+        return result
+
+    def iter_results(self, sources: Iterable[str], workers: int = 4) -> Iterator[Dict]:
+        """
+        Hash packages in a pool of worker processes, yielding results as they finish.
+
+        At most a few packages per worker are in flight, so the source list
+        can be arbitrarily long.
+
+        Args:
+            sources: Package URLs or local paths
+            workers: Number of worker processes (0 = one per CPU)
+
+        Returns:
+            Iterator of hash_package results, in completion order
+        """
+        workers = resolve_jobs(workers)
+        if workers <= 1:
+            for source in sources:
+                yield self.hash_package(source)
+            return
+
+        sources = iter(sources)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            while True:
+                for source in sources:
+                    in_flight.add(executor.submit(self.hash_package, source))
+                    if len(in_flight) >= workers * 2:
+                        break
+                if not in_flight:
+                    return
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+class HashOutput:
+    """
+    Appends hash results to packages.csv / files.csv (and optionally the catalog and file store) in batches.
+
+    Digests other than sha256 go into extra columns named after their
+    algorithm, after the standard ones. Jobs of a JobQueue are only marked
+    done (and archives recorded in the HashedArchives index) once their
+    rows have been written, so an interrupted run never loses a package it
+    reported done.
+    """
+
+    def __init__(self, output_dir: Path, distro: str, catalog: Optional[Path] = None, batch_size: int = 100,
+                 jobs: Optional[JobQueue] = None, algorithms: Sequence[str] = DEFAULT_ALGORITHMS,
+                 store: Optional[Path] = None, hashed: Optional[HashedArchives] = None):
+        """
+        Args:
+            output_dir: Directory holding packages.csv and files.csv
+            distro: Distribution name for catalog records
+            catalog: SQLite catalog that also receives the hashes
+            batch_size: Packages buffered before the files are flushed
+            jobs: Job queue whose jobs are completed as their rows are flushed
+            algorithms: Digest algorithms of the results (FileHasher.algorithms)
+            store: Deduplicated file store (FileStore) that also receives the hashes
+            hashed: Index of already hashed archives that records every written package
+        """
+        self.output_dir = Path(output_dir)
+        self.distro = distro
+        self.batch_size = batch_size
+        self.algorithms = tuple(algorithms)
+        self.extra_digests = [name for name in algorithms if name != 'sha256']
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._packages_file = self._open('packages.csv', PACKAGE_FIELDNAMES + self.extra_digests)
+        self._files_file = self._open('files.csv', FILE_FIELDNAMES + self.extra_digests)
+        self._packages = csv.writer(self._packages_file)
+        self._files = csv.writer(self._files_file)
+        self._batch: List[Dict] = []
+        self.jobs = jobs
+        self.hashed = hashed
+        self.catalog = None
+        if catalog:
+            from utils.catalog import Catalog
+            self.catalog = Catalog(catalog)
+        self.store = None
+        if store:
+            from utils.file_store import FileStore
+            self.store = FileStore(store)
+
+    def _open(self, name: str, fieldnames: List[str]):
+        path = self.output_dir / name
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                header = next(csv.reader(f), [])
+            if header != fieldnames:
+                raise ValueError(f"{path} has columns {','.join(header)}, expected {','.join(fieldnames)}; "
+                                 "use the same --digests as the run that created it or a new output directory")
+            return open(path, 'a', newline='', encoding='utf-8')
+        f = open(path, 'a', newline='', encoding='utf-8')
+        csv.writer(f).writerow(fieldnames)
+        return f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, result: Dict):
+        """
+        Queue the rows of one successfully hashed package.
+
+        Args:
+            result: Result from FileHasher.hash_package
+        """
+        self._batch.append(result)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the queued packages (and commit them to the catalog and file store)."""
+        if not self._batch:
+            return
+        extra = self.extra_digests
+        for result in self._batch:
+            name, version, url = result['name'], result['version'], result['url']
+            digests = result['digests']
+            self._packages.writerow([name, version, digests['sha256'], url] + [digests[a] for a in extra])
+            self._files.writerows([name, version, digests['sha256'], path, url] + [digests[a] for a in extra]
+                                  for digests, path in result['files'])
+        self._packages_file.flush()
+        self._files_file.flush()
+        if self.catalog is not None:
+            with self.catalog.load():
+                for result in self._batch:
+                    self.catalog.add_archive(self.distro, result['name'], result['version'],
+                                             result['sha256'], result['url'],
+                                             ((digests['sha256'], path) for digests, path in result['files']))
+        if self.store is not None:
+            self.store.begin()
+            try:
+                for result in self._batch:
+                    self.store.add_package(self.distro, result['name'], result['version'], result['sha256'],
+                                           result['url'], result['files'])
+            except BaseException:
+                self.store.rollback()
+                raise
+            self.store.commit()
+        if self.hashed is not None:
+            self.hashed.add(((result['sha256'], result['url']) for result in self._batch), self.algorithms)
+        if self.jobs is not None:
+            self.jobs.complete(result['url'] for result in self._batch)
+        self._batch = []
+
+    def close(self):
+        """Flush and close the output files."""
+        self.flush()
+        self._packages_file.close()
+        self._files_file.close()
+        if self.catalog is not None:
+            self.catalog.close()
+        if self.store is not None:
+            self.store.close()
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description='Hash package archives and the files inside them')
+    arg_parser.add_argument('--distro', required=True, help='Distribution name')
+    arg_parser.add_argument('--output-dir', required=True, help='Directory with jobs.db, packages.csv and files.csv')
+    arg_parser.add_argument('-j', '--workers', type=int, default=4, help='Worker processes (0 = one per CPU)')
+    arg_parser.add_argument('--catalog', help='Also record the hashes in this SQLite catalog')
+    arg_parser.add_argument('--store', help='Also record the hashes in this deduplicated file store')
+    arg_parser.add_argument('--timeout', type=float, default=60, help='Download timeout in seconds')
+    arg_parser.add_argument('--retries', type=int, default=3, help='Retries per download')
+    arg_parser.add_argument('--digests', default=','.join(DEFAULT_ALGORITHMS),
+                            help=f"Comma separated digest algorithms ({', '.join(ALGORITHMS)} or all)")
+    arg_parser.add_argument('--jobs', help='Job queue database (default: <output-dir>/jobs.db)')
+    arg_parser.add_argument('--max-attempts', type=int, default=3,
+                            help='Stop retrying packages that failed this many times')
+    arg_parser.add_argument('--metadata', action='append', default=[],
+                            help='Parser CSV (or output/<distro> directory) with the published sha256 of '
+                                 'each package; may be repeated')
+    arg_parser.add_argument('--hashed', help='Index of already hashed archives (default: <output-dir>/hashed.db)')
+    arg_parser.add_argument('--rehash', action='store_true',
+                            help='Download and hash packages even when their published sha256 was hashed before')
+    arg_parser.add_argument('packages', nargs='*',
+                            help='Package URLs or paths to hash (default: pending jobs of the queue)')
+    args = arg_parser.parse_args()
+    try:
+        algorithms = parse_algorithms(args.digests)
+    except ValueError as e:
+        arg_parser.error(str(e))
+
+    output_dir = Path(args.output_dir)
+    jobs = None
+    if args.packages:
+        sources = args.packages
+        logger.info(f"{len(sources)} packages to hash with {resolve_jobs(args.workers)} workers")
+    else:
+        jobs_path = Path(args.jobs) if args.jobs else output_dir / 'jobs.db'
+        urls_path = output_dir / 'urls.csv'
+        is_new = not jobs_path.exists()
+        jobs = JobQueue(jobs_path)
+        if is_new and urls_path.exists():
+            logger.info(f"Imported {jobs.import_csv(urls_path)} URLs from {urls_path}")
+        requeued = jobs.requeue(args.max_attempts)
+        counts = jobs.counts()
+        logger.info(f"{counts['pending']} of {counts['total']} packages to hash ({requeued} retried) "
+                    f"with {resolve_jobs(args.workers)} workers")
+        sources = jobs.iter_claimed()
+
+    hashed_path = Path(args.hashed) if args.hashed else output_dir / 'hashed.db'
+    packages_path = output_dir / 'packages.csv'
+    is_new = not hashed_path.exists()
+    hashed = HashedArchives(hashed_path)
+    if is_new and packages_path.exists():
+        logger.info(f"Recorded {hashed.import_csv(packages_path)} hashed archives from {packages_path}")
+
+    # Content already hashed under its published digest is not downloaded again
+    published = {} if args.rehash else load_published(args.distro, args.metadata, args.catalog)
+    if published:
+        logger.info(f"{len(published)} published package digests")
+    skipped = 0
+
+    def skip(source: str, known_url: str):
+        nonlocal skipped
+        logger.debug(f"{source}: already hashed from {known_url}")
+        if jobs is not None:
+            jobs.complete([source])
+        skipped += 1
+
+    hasher = FileHasher(args.distro, HTTPClient(max_retries=args.retries, timeout=args.timeout),
+                        algorithms=algorithms)
+    done = failed = files = 0
+    try:
+        with HashOutput(output_dir, args.distro, args.catalog, jobs=jobs, algorithms=hasher.algorithms,
+                        store=args.store, hashed=hashed) as output:
+            sources = hashed.iter_unhashed(sources, published, hasher.algorithms, skip)
+            for result in hasher.iter_results(sources, args.workers):
+                if result['error']:
+                    logger.error(f"{result['url']}: {result['error']}")
+                    if jobs is not None:
+                        jobs.fail(result['url'], result['error'])
+                    failed += 1
+                else:
+                    expected = published.get(archive_filename(result['url']))
+                    if expected and expected != result['sha256']:
+                        logger.warning(f"{result['url']}: sha256 {result['sha256']} differs from the published "
+                                       f"{expected}")
+                    output.add(result)
+                    done += 1
+                    files += len(result['files'])
+                if (done + failed) % 1000 == 0:
+                    logger.info(f"Progress: {done + failed} packages, {files} files hashed, {failed} failed, "
+                                f"{skipped} already hashed")
+    except ValueError as e:  # output written with other --digests
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        hashed.close()
+        if jobs is not None:
+            jobs.close()
+
+    logger.info(f"Finished – {done} packages, {files} files hashed, {failed} failed, {skipped} already hashed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+
+import csv
+import json
+import logging
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.catalog import csv_distro
+from utils.digests import ALGORITHMS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE = Path(__file__).resolve().parent.parent / 'output' / 'file_store.db'
+
+# Digests stored per blob besides sha256 (filled when the input has them)
+EXTRA_DIGESTS = [name for name in ALGORITHMS if name != 'sha256']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS distros (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    distro_id INTEGER NOT NULL REFERENCES distros(id),
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    sha256 BLOB,
+    url TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL REFERENCES dirs(id),
+    name TEXT NOT NULL,
+    UNIQUE (dir_id, name)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    id INTEGER PRIMARY KEY,
+    sha256 BLOB NOT NULL,
+    sha1 BLOB,
+    sha512 BLOB,
+    blake2b BLOB,
+    md5 BLOB
+);
+CREATE TABLE IF NOT EXISTS package_files (
+    package_id INTEGER NOT NULL REFERENCES packages(id),
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    blob_id INTEGER NOT NULL REFERENCES blobs(id),
+    PRIMARY KEY (package_id, path_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_blobs_prefix ON blobs (substr(sha256, 1, 4));
+CREATE INDEX IF NOT EXISTS idx_package_files_blob ON package_files (blob_id, package_id, path_id);
+CREATE INDEX IF NOT EXISTS idx_packages_name ON packages (name, version);
+DROP VIEW IF EXISTS file_entries;
+CREATE VIEW file_entries AS
+    SELECT d.name AS distro, p.name, p.version, lower(hex(b.sha256)) AS sha256,
+           CASE dr.path WHEN '' THEN pa.name ELSE dr.path || '/' || pa.name END AS file, p.url,
+           pf.package_id, pf.blob_id
+    FROM package_files pf
+    JOIN packages p ON p.id = pf.package_id
+    JOIN distros d ON d.id = p.distro_id
+    JOIN paths pa ON pa.id = pf.path_id
+    JOIN dirs dr ON dr.id = pa.dir_id
+    JOIN blobs b ON b.id = pf.blob_id;
+"""
+
+BATCH_SIZE = 10000
+
+# Interned paths whose ids are kept in memory (the cache is cleared when full)
+PATH_CACHE_SIZE = 1 << 20
+
+
+class FileStore:
+    """
+    Deduplicated store of the files inside hashed packages.
+
+    files.csv repeats the package name, version and URL and the full path
+    and digest on every row, although most files (licences, man pages,
+    locale files, unchanged binaries) recur across versions and releases.
+    Here each distinct content digest is one row of blobs (raw bytes, with
+    any extra digests), each distinct path one row of paths whose directory
+    is interned in dirs, and a package file is just three integers in
+    package_files. The (blob_id, package_id, path_id) index answers "which
+    packages ship this file" without touching package_files itself.
+
+    Blobs are looked up through an index on the first 4 bytes of the
+    digest rather than a UNIQUE index on all 32, which would store every
+    digest a second time; the rare prefix collisions are told apart by
+    comparing the full digest in the row.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        """
+        Args:
+            path: SQLite database file (created if missing unless readonly)
+            readonly: Open for queries only
+        """
+        self.path = Path(path)
+        if readonly:
+            self.conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, isolation_level=None)
+            self.conn.execute('PRAGMA query_only = ON')
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            self.conn.executescript(SCHEMA)
+        self.conn.execute('PRAGMA temp_store = MEMORY')
+        self.conn.execute('PRAGMA cache_size = -65536')
+        self._distros: Dict[str, int] = {}
+        self._dirs: Dict[str, int] = {}
+        self._paths: Dict[Tuple[int, str], int] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        if self.conn.in_transaction:
+            self.conn.execute('ROLLBACK')
+        self.conn.close()
+
+    def begin(self):
+        """Start a write transaction."""
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def commit(self):
+        """Commit the current transaction."""
+        self.conn.execute('COMMIT')
+
+    def rollback(self):
+        """Roll back the current transaction."""
+        self.conn.execute('ROLLBACK')
+        self._reset_caches()
+
+    def _reset_caches(self):
+        # Ids of rolled back or pruned rows may be handed out again
+        self._distros = {}
+        self._dirs = {}
+        self._paths = {}
+
+    # ------------------------------------------------------------------
+    # Interning
+    # ------------------------------------------------------------------
+
+    def _distro_id(self, distro: str) -> int:
+        distro_id = self._distros.get(distro)
+        if distro_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO distros (name) VALUES (?)", (distro,))
+            distro_id = self.conn.execute("SELECT id FROM distros WHERE name = ?", (distro,)).fetchone()[0]
+            self._distros[distro] = distro_id
+        return distro_id
+
+    def _dir_id(self, directory: str) -> int:
+        dir_id = self._dirs.get(directory)
+        if dir_id is None:
+            row = self.conn.execute("SELECT id FROM dirs WHERE path = ?", (directory,)).fetchone()
+            if row is None:
+                dir_id = self.conn.execute("INSERT INTO dirs (path) VALUES (?)", (directory,)).lastrowid
+            else:
+                dir_id = row[0]
+            self._dirs[directory] = dir_id
+        return dir_id
+
+    def path_id(self, path: str) -> int:
+        """
+        Intern a file path (directory and file name).
+
+        Args:
+            path: Path relative to the package root
+
+        Returns:
+            Row id in paths
+        """
+        directory, _, name = path.rpartition('/')
+        key = (self._dir_id(directory), name)
+        path_id = self._paths.get(key)
+        if path_id is None:
+            row = self.conn.execute("SELECT id FROM paths WHERE dir_id = ? AND name = ?", key).fetchone()
+            if row is None:
+                path_id = self.conn.execute("INSERT INTO paths (dir_id, name) VALUES (?, ?)", key).lastrowid
+            else:
+                path_id = row[0]
+            if len(self._paths) >= PATH_CACHE_SIZE:
+                self._paths = {}
+            self._paths[key] = path_id
+        return path_id
+
+    def blob_id(self, digests: Union[str, Dict[str, str]]) -> int:
+        """
+        Intern a file content digest.
+
+        Args:
+            digests: Hex sha256, or a dictionary of algorithm name to hex digest (must include sha256)
+
+        Returns:
+            Row id in blobs
+        """
+        if isinstance(digests, str):
+            digests = {'sha256': digests}
+        sha256 = bytes.fromhex(digests['sha256'])
+        row = self.conn.execute("SELECT id FROM blobs WHERE substr(sha256, 1, 4) = ? AND sha256 = ?",
+                                (sha256[:4], sha256)).fetchone()
+        extra = {name: bytes.fromhex(digests[name]) for name in EXTRA_DIGESTS if digests.get(name)}
+        if row is None:
+            columns = ['sha256'] + list(extra)
+            return self.conn.execute(
+                f"INSERT INTO blobs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [sha256] + list(extra.values())).lastrowid
+        if extra:
+            # Fill in digests a previous run did not compute
+            self.conn.execute(f"UPDATE blobs SET {', '.join(f'{n} = COALESCE({n}, ?)' for n in extra)} WHERE id = ?",
+                              list(extra.values()) + [row[0]])
+        return row[0]
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def add_package(self, distro: str, name: str, version: str, sha256: str, url: str,
+                    files: Iterable[Tuple[Union[str, Dict[str, str]], str]] = ()) -> int:
+        """
+        Record a hashed package and its files, replacing any earlier record of the same URL.
+
+        Args:
+            distro: Distribution name
+            name: Package name
+            version: Package version
+            sha256: Hex SHA-256 of the package file ('' if unknown)
+            url: URL the package file was downloaded from
+            files: (digest, path) pairs; digest is a hex sha256 or a dictionary of digests
+
+        Returns:
+            Row id of the package
+        """
+        package_id = self._package_id(distro, name, version, sha256, url)
+        self.conn.execute("DELETE FROM package_files WHERE package_id = ?", (package_id,))
+        self.add_files(package_id, files)
+        return package_id
+
+    def _package_id(self, distro: str, name: str, version: str, sha256: str, url: str) -> int:
+        distro_id = self._distro_id(distro)
+        digest = bytes.fromhex(sha256) if sha256 else None
+        row = self.conn.execute("SELECT id FROM packages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return self.conn.execute("INSERT INTO packages (distro_id, name, version, sha256, url) VALUES (?, ?, ?, ?, ?)",
+                                     (distro_id, name, version, digest, url)).lastrowid
+        self.conn.execute("UPDATE packages SET distro_id = ?, name = ?, version = ?, sha256 = COALESCE(?, sha256) "
+                          "WHERE id = ?", (distro_id, name, version, digest, row[0]))
+        return row[0]
+
+    def add_files(self, package_id: int, files: Iterable[Tuple[Union[str, Dict[str, str]], str]]) -> int:
+        """
+        Add files to a package.
+
+        Args:
+            package_id: Row id of the package
+            files: (digest, path) pairs; digest is a hex sha256 or a dictionary of digests
+
+        Returns:
+            Number of files added
+        """
+        rows = [(package_id, self.path_id(path), self.blob_id(digests)) for digests, path in files]
+        self.conn.executemany("INSERT OR REPLACE INTO package_files (package_id, path_id, blob_id) VALUES (?, ?, ?)",
+                              rows)
+        return len(rows)
+
+    def import_csv(self, csv_path: Path, distro: Optional[str] = None) -> int:
+        """
+        Load a files.csv (or packages.csv) written by hash_distro_files.sh.
+
+        Extra digest columns (sha1, sha512, ...) are stored with the blobs.
+        Rows without a valid sha256 (older runs wrote "error") are skipped.
+
+        Args:
+            csv_path: CSV to load
+            distro: Distribution name (defaults to the distro whose directory holds the CSV, see csv_distro)
+
+        Returns:
+            Number of rows loaded
+
+        Raises:
+            ValueError: If no distro is given and the CSV is not in a known distro's directory
+        """
+        csv_path = Path(csv_path)
+        distro = distro or csv_distro(csv_path)
+        count = skipped = 0
+        self.begin()
+        try:
+            with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                has_files = 'file' in (reader.fieldnames or [])
+                extra = [name for name in EXTRA_DIGESTS if name in (reader.fieldnames or [])]
+                packages: Dict[str, int] = {}
+                for row in reader:
+                    url = row['url']
+                    if not has_files:
+                        self._package_id(distro, row['name'], row['version'], row['sha256'], url)
+                    else:
+                        package_id = packages.get(url)
+                        if package_id is None:
+                            package_id = self._package_id(distro, row['name'], row['version'], '', url)
+                            self.conn.execute("DELETE FROM package_files WHERE package_id = ?", (package_id,))
+                            packages[url] = package_id
+                        digests = {name: row[name] for name in ['sha256'] + extra}
+                        if len(digests['sha256']) != 64:
+                            skipped += 1
+                            continue
+                        self.add_files(package_id, [(digests, row['file'])])
+                    count += 1
+                    if count % BATCH_SIZE == 0:
+                        self.commit()
+                        self.begin()
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+        if skipped:
+            logger.warning(f"Skipped {skipped} rows of {csv_path} without a valid sha256")
+        return count
+
+    def prune(self) -> int:
+        """
+        Delete blobs, paths and directories no package refers to any more.
+
+        Returns:
+            Number of rows deleted
+        """
+        self.begin()
+        deleted = self.conn.execute("DELETE FROM blobs WHERE id NOT IN (SELECT blob_id FROM package_files)").rowcount
+        deleted += self.conn.execute("DELETE FROM paths WHERE id NOT IN (SELECT path_id FROM package_files)").rowcount
+        deleted += self.conn.execute("DELETE FROM dirs WHERE id NOT IN (SELECT dir_id FROM paths)").rowcount
+        self.commit()
+        self._reset_caches()
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def which(self, sha256: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Find every package file with the given content.
+
+        Args:
+            sha256: Hex SHA-256 of the file content
+            limit: Maximum number of results
+
+        Returns:
+            List of dictionaries with distro, name, version, file and url
+        """
+        try:
+            digest = bytes.fromhex(sha256.strip())
+        except ValueError:
+            return []
+        cursor = self.conn.execute(
+            "SELECT distro, name, version, file, url FROM file_entries "
+            "WHERE blob_id IN (SELECT id FROM blobs WHERE substr(sha256, 1, 4) = ? AND sha256 = ?) "
+            "ORDER BY name, version, file LIMIT ?",
+            (digest[:4], digest, -1 if limit is None else limit))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def package_files(self, url: str) -> List[Tuple[str, str]]:
+        """
+        List the files of a package.
+
+        Args:
+            url: Package URL
+
+        Returns:
+            List of (sha256, path) tuples, ordered by path
+        """
+        return self.conn.execute("SELECT sha256, file FROM file_entries "
+                                 "WHERE package_id = (SELECT id FROM packages WHERE url = ?) ORDER BY file",
+                                 (url,)).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Count the rows of each table.
+
+        Returns:
+            Dictionary with packages, files (package files), paths, dirs, blobs and bytes (database size)
+        """
+        tables = {'packages': 'packages', 'files': 'package_files', 'paths': 'paths', 'dirs': 'dirs', 'blobs': 'blobs'}
+        stats = {key: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for key, table in tables.items()}
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        stats['bytes'] = page_size * self.conn.execute('PRAGMA page_count').fetchone()[0]
+        return stats
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description='Load or query the deduplicated file hash store')
+    arg_parser.add_argument('--db', default=str(DEFAULT_STORE), help='File store database')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Load files.csv / packages.csv from hash_distro_files.sh')
+    import_parser.add_argument('--distro', help='Distribution name (required unless each CSV is in <distro>/output/)')
+    import_parser.add_argument('csv', nargs='+')
+
+    which_parser = subparsers.add_parser('which', help='List the packages that ship a file with this sha256')
+    which_parser.add_argument('sha256')
+    which_parser.add_argument('--limit', type=int)
+
+    files_parser = subparsers.add_parser('files', help='List the files of a package URL')
+    files_parser.add_argument('url')
+
+    subparsers.add_parser('stats', help='Show row counts and database size')
+    subparsers.add_parser('prune', help='Drop blobs and paths no package uses')
+
+    args = arg_parser.parse_args()
+
+    if args.command == 'import':
+        # Check every CSV before loading any of them
+        try:
+            distros = {csv_path: args.distro or csv_distro(Path(csv_path)) for csv_path in args.csv}
+        except ValueError as e:
+            arg_parser.error(str(e))
+
+    readonly = args.command in ('which', 'files', 'stats')
+    with FileStore(Path(args.db), readonly=readonly) as store:
+        if args.command == 'import':
+            for csv_path in args.csv:
+                count = store.import_csv(Path(csv_path), distros[csv_path])
+                logger.info(f"Loaded {count} rows from {csv_path} into {args.db}")
+        elif args.command == 'which':
+            results = store.which(args.sha256, args.limit)
+            if not results:
+                print("No match found")
+                sys.exit(1)
+            for row in results:
+                print(json.dumps(row))
+        elif args.command == 'files':
+            for sha256, path in store.package_files(args.url):
+                print(f"{sha256}\t{path}")
+        elif args.command == 'stats':
+            for key, value in store.stats().items():
+                print(f"{key}: {value}")
+        else:
+            logger.info(f"Pruned {store.prune()} unused rows")
+
+
+if __name__ == "__main__":
+    main()
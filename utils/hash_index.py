@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+
+import csv
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class HashIndexBuilder:
+    """Compiles parser CSV outputs into memory-mappable sha256 lookup shards."""
+
+    MAGIC = b'LPMIDX01'
+    # magic, sha entry count, key entry count, sha section offset, key section offset, records offset
+    HEADER = struct.Struct('<8sQQQQQ')
+    # raw sha256 digest, record offset
+    SHA_ENTRY = struct.Struct('<32sQ')
+    # blake2b-128 of "package|architecture|release", record offset
+    KEY_ENTRY = struct.Struct('<16sQ')
+    FIELD_SEPARATOR = '\x1f'
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, output_dir: Path, index_dir: Optional[Path] = None):
+        self.output_dir = Path(output_dir)
+        self.index_dir = Path(index_dir) if index_dir else self.output_dir / 'index'
+
+    @staticmethod
+    def package_key(package: str, architecture: str, release: str) -> bytes:
+        """
+        Compute the secondary lookup key for a package.
+
+        Args:
+            package: Package name
+            architecture: Package architecture
+            release: Distribution release
+
+        Returns:
+            16-byte digest of "package|architecture|release"
+        """
+        key = f"{package}|{architecture}|{release}".encode('utf-8')
+        return hashlib.blake2b(key, digest_size=16).digest()
+
+    def discover_sources(self) -> List[Path]:
+        """
+        Find the parser CSVs to index (output/*/*_packages.csv).
+
+        When a distro directory holds a combined <distro>_packages.csv only that
+        file is indexed, since the per-release files repeat the same rows.
+
+        Returns:
+            Sorted list of CSV paths
+        """
+        sources = []
+        index_dir = self.index_dir.resolve()
+        for distro_dir in sorted(p for p in self.output_dir.iterdir() if p.is_dir()):
+            if distro_dir.resolve() == index_dir:
+                continue
+            combined = distro_dir / f"{distro_dir.name}_packages.csv"
+            if combined.is_file():
+                sources.append(combined)
+            else:
+                sources.extend(sorted(distro_dir.glob('*_packages.csv')))
+        return sources
+
+    def load_manifest(self) -> Dict:
+        """Load the shard manifest, or an empty one if the index does not exist yet."""
+        manifest_path = self.index_dir / self.MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'version': 1, 'shards': {}}
+
+    def build(self, force: bool = False) -> Dict[str, int]:
+        """
+        Bring the index up to date with the parser outputs.
+
+        Only CSVs whose size or modification time changed since the last build
+        are recompiled; shards of CSVs that disappeared are removed.
+
+        Args:
+            force: Rebuild every shard regardless of the manifest
+
+        Returns:
+            Dictionary with 'built', 'unchanged' and 'removed' shard counts
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self.load_manifest()
+        old_shards = manifest.get('shards', {})
+        new_shards = {}
+        stats = {'built': 0, 'unchanged': 0, 'removed': 0}
+
+        for csv_path in self.discover_sources():
+            source = csv_path.relative_to(self.output_dir).as_posix()
+            stat = csv_path.stat()
+            entry = old_shards.get(source)
+            shard_path = self.index_dir / (source[:-len('.csv')] + '.idx')
+
+            if (not force and entry and entry.get('size') == stat.st_size
+                    and entry.get('mtime_ns') == stat.st_mtime_ns and shard_path.exists()):
+                new_shards[source] = entry
+                stats['unchanged'] += 1
+                continue
+
+            logger.info(f"Indexing {csv_path}")
+            rows = self.build_shard(csv_path, shard_path)
+            new_shards[source] = {
+                'shard': shard_path.relative_to(self.index_dir).as_posix(),
+                'distro': csv_path.parent.name,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'rows': rows
+            }
+            stats['built'] += 1
+
+        for source, entry in old_shards.items():
+            if source not in new_shards:
+                stale = self.index_dir / entry['shard']
+                if stale.exists():
+                    stale.unlink()
+                stats['removed'] += 1
+
+        manifest = {'version': 1, 'shards': new_shards}
+        tmp_manifest = self.index_dir / (self.MANIFEST_NAME + '.tmp')
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_manifest, self.index_dir / self.MANIFEST_NAME)
+
+        return stats
+
+    def build_shard(self, csv_path: Path, shard_path: Path) -> int:
+        """
+        Compile one CSV into a shard file.
+
+        Layout: header, fieldnames (JSON), sha256 entries sorted by digest,
+        package key entries sorted by key, then one separator-joined record per row.
+
+        Args:
+            csv_path: Parser CSV to compile
+            shard_path: Destination shard file
+
+        Returns:
+            Number of rows indexed
+        """
+        shard_path.parent.mkdir(parents=True, exist_ok=True)
+        sha_entries = []
+        key_entries = []
+        rows = 0
+
+        with tempfile.TemporaryFile(dir=shard_path.parent) as records, \
+                open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            try:
+                fieldnames = next(reader)
+            except StopIteration:
+                fieldnames = []
+            columns = {name: i for i, name in enumerate(fieldnames)}
+            sha_col = columns.get('sha256')
+            package_col = columns.get('package')
+            arch_col = columns.get('architecture')
+            release_col = columns.get('release')
+
+            offset = 0
+            for row in reader:
+                if len(row) != len(fieldnames):
+                    continue
+                record = (self.FIELD_SEPARATOR.join(v.replace('\n', ' ') for v in row) + '\n').encode('utf-8')
+                records.write(record)
+
+                if sha_col is not None:
+                    digest = self._parse_sha256(row[sha_col])
+                    if digest:
+                        sha_entries.append((digest, offset))
+                if package_col is not None and arch_col is not None and release_col is not None:
+                    key_entries.append((self.package_key(row[package_col], row[arch_col], row[release_col]), offset))
+
+                offset += len(record)
+                rows += 1
+
+            sha_entries.sort()
+            key_entries.sort()
+
+            fields_blob = json.dumps(fieldnames).encode('utf-8')
+            sha_offset = self.HEADER.size + len(fields_blob)
+            key_offset = sha_offset + len(sha_entries) * self.SHA_ENTRY.size
+            records_offset = key_offset + len(key_entries) * self.KEY_ENTRY.size
+
+            tmp_path = shard_path.with_suffix('.idx.tmp')
+            with open(tmp_path, 'wb') as out:
+                out.write(self.HEADER.pack(self.MAGIC, len(sha_entries), len(key_entries),
+                                           sha_offset, key_offset, records_offset))
+                out.write(fields_blob)
+                out.write(b''.join(self.SHA_ENTRY.pack(d, o) for d, o in sha_entries))
+                out.write(b''.join(self.KEY_ENTRY.pack(k, o) for k, o in key_entries))
+                records.seek(0)
+                shutil.copyfileobj(records, out, 1 << 20)
+            os.replace(tmp_path, shard_path)
+
+        return rows
+
+    @staticmethod
+    def _parse_sha256(value: str) -> Optional[bytes]:
+        value = value.strip()
+        if len(value) != 64:
+            return None
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return None
+
+
+class _Shard:
+    """A single memory-mapped index shard."""
+
+    def __init__(self, path: Path, distro: str):
+        self.path = path
+        self.distro = distro
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.sha_count, self.key_count, self.sha_offset,
+         self.key_offset, self.records_offset) = HashIndexBuilder.HEADER.unpack_from(self._mm, 0)
+        if magic != HashIndexBuilder.MAGIC:
+            raise ValueError(f"Not a hash index shard: {path}")
+        self.fieldnames = json.loads(self._mm[HashIndexBuilder.HEADER.size:self.sha_offset])
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _find(self, key: bytes, section_offset: int, count: int, entry: struct.Struct) -> List[int]:
+        """Binary search a sorted entry section and return the offsets of all matching records."""
+        mm = self._mm
+        size = entry.size
+        key_len = len(key)
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = section_offset + mid * size
+            if mm[pos:pos + key_len] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        offsets = []
+        while lo < count:
+            found, offset = entry.unpack_from(mm, section_offset + lo * size)
+            if found != key:
+                break
+            offsets.append(offset)
+            lo += 1
+        return offsets
+
+    def _record(self, offset: int) -> Dict[str, str]:
+        start = self.records_offset + offset
+        end = self._mm.find(b'\n', start)
+        values = self._mm[start:end].decode('utf-8').split(HashIndexBuilder.FIELD_SEPARATOR)
+        record = dict(zip(self.fieldnames, values))
+        record['distro'] = self.distro
+        return record
+
+    def lookup_sha256(self, digest: bytes) -> List[Dict[str, str]]:
+        offsets = self._find(digest, self.sha_offset, self.sha_count, HashIndexBuilder.SHA_ENTRY)
+        return [self._record(o) for o in offsets]
+
+    def lookup_key(self, key: bytes) -> List[Dict[str, str]]:
+        offsets = self._find(key, self.key_offset, self.key_count, HashIndexBuilder.KEY_ENTRY)
+        return [self._record(o) for o in offsets]
+
+
+class HashIndex:
+    """Read-only query API over the shards written by HashIndexBuilder."""
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+        manifest = HashIndexBuilder(self.index_dir.parent, self.index_dir).load_manifest()
+        self.shards = [
+            _Shard(self.index_dir / entry['shard'], entry.get('distro', ''))
+            for _, entry in sorted(manifest.get('shards', {}).items())
+        ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+    def lookup_sha256(self, sha256: str) -> List[Dict[str, str]]:
+        """
+        Find every package row with the given sha256.
+
+        Args:
+            sha256: Hex encoded SHA256 digest
+
+        Returns:
+            List of row dictionaries (with an extra 'distro' key), empty if not found
+        """
+        digest = HashIndexBuilder._parse_sha256(sha256 or '')
+        if digest is None:
+            return []
+        results = []
+        for shard in self.shards:
+            results.extend(shard.lookup_sha256(digest))
+        return results
+
+    def lookup_package(self, package: str, architecture: str, release: str) -> List[Dict[str, str]]:
+        """
+        Find every row for a package|architecture|release key.
+
+        Args:
+            package: Package name
+            architecture: Package architecture
+            release: Distribution release as written in the CSV (e.g. jammy, el9, fc40)
+
+        Returns:
+            List of row dictionaries (with an extra 'distro' key), empty if not found
+        """
+        key = HashIndexBuilder.package_key(package, architecture, release)
+        results = []
+        for shard in self.shards:
+            for row in shard.lookup_key(key):
+                if (row.get('package') == package and row.get('architecture') == architecture
+                        and row.get('release') == release):
+                    results.append(row)
+        return results
+
+    def purl_for(self, sha256: str, distro: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        Resolve a sha256 to its (purl, distro) pair.
+
+        Args:
+            sha256: Hex encoded SHA256 digest
+            distro: Only consider rows of this distro
+
+        Returns:
+            Tuple of (purl, distro) for the first matching row, or None
+        """
+        digest = HashIndexBuilder._parse_sha256(sha256 or '')
+        if digest is None:
+            return None
+        for shard in self.shards:
+            if distro is not None and shard.distro != distro:
+                continue
+            for row in shard.lookup_sha256(digest):
+                if row.get('purl'):
+                    return row['purl'], row['distro']
+        return None
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    root_dir = Path(__file__).parent.parent
+    arg_parser = argparse.ArgumentParser(description='Build or query the sha256 package index')
+    arg_parser.add_argument('--output-dir', default=str(root_dir / 'output'), help='Parser output directory')
+    arg_parser.add_argument('--index-dir', help='Index directory (default: <output-dir>/index)')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build or incrementally update the index')
+    build_parser.add_argument('--force', action='store_true', help='Rebuild every shard')
+
+    sha_parser = subparsers.add_parser('sha256', help='Look up a sha256')
+    sha_parser.add_argument('sha256')
+
+    pkg_parser = subparsers.add_parser('package', help='Look up package|architecture|release')
+    pkg_parser.add_argument('package')
+    pkg_parser.add_argument('architecture')
+    pkg_parser.add_argument('release')
+
+    args = arg_parser.parse_args()
+    builder = HashIndexBuilder(Path(args.output_dir), Path(args.index_dir) if args.index_dir else None)
+
+    if args.command == 'build':
+        stats = builder.build(force=args.force)
+        logger.info(f"Index up to date: {stats['built']} built, {stats['unchanged']} unchanged, "
+                    f"{stats['removed']} removed")
+        return
+
+    with HashIndex(builder.index_dir) as index:
+        if args.command == 'sha256':
+            results = index.lookup_sha256(args.sha256)
+        else:
+            results = index.lookup_package(args.package, args.architecture, args.release)
+
+    if not results:
+        print("No match found")
+        sys.exit(1)
+    for row in results:
+        print(json.dumps(row))
+
+if __name__ == "__main__":
+    main()
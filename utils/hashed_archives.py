@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import csv
+import logging
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.digests import parse_algorithms
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+
+# Package files whose index publishes no digest of the file itself: the
+# APKINDEX C: checksum covers only the control segment of an .apk
+UNPUBLISHED_EXTENSIONS = ('.apk',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    sha256 BLOB PRIMARY KEY,
+    digests TEXT NOT NULL,
+    url TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def archive_filename(url: str) -> str:
+    """
+    File name of a package URL or path, the key published digests are matched on.
+
+    Mirrors serve the same pool under different hosts and prefixes, but the
+    file name of a package is unique within a distro's repository.
+
+    Args:
+        url: Package URL or local path
+
+    Returns:
+        Last path component, without any query string
+    """
+    return os.path.basename(url.split('?', 1)[0].rstrip('/'))
+
+
+def metadata_csvs(path: Path) -> List[Path]:
+    """
+    Resolve a parser output CSV, or a directory of them, to the CSVs to read.
+
+    In a directory holding a combined <distro>_packages.csv only that file
+    is read, since the per-release files repeat the same rows.
+
+    Args:
+        path: Parser CSV or output/<distro> directory
+
+    Returns:
+        List of CSV paths
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return [path]
+    combined = path / f"{path.name}_packages.csv"
+    if combined.is_file():
+        return [combined]
+    return sorted(path.glob('*_packages.csv'))
+
+
+def load_published(distro: str, metadata: Iterable[Path] = (), catalog: Optional[Path] = None) -> Dict[str, str]:
+    """
+    Collect the archive sha256 that the repository publishes for each package file.
+
+    Args:
+        distro: Distribution whose catalog rows are read
+        metadata: Parser CSVs or output/<distro> directories (sha256 and deb_url columns)
+        catalog: SQLite catalog whose packages table is read
+
+    Returns:
+        Dictionary of archive file name to sha256; file names published with
+        different digests are left out, since their content is ambiguous, and
+        so are Alpine packages (see UNPUBLISHED_EXTENSIONS), whose rows may
+        carry a control-segment digest from older parser runs
+    """
+    published: Dict[str, Optional[str]] = {}
+
+    def add(url: str, sha256: str):
+        sha256 = sha256.strip().lower()
+        if len(sha256) != 64 or not url:
+            return
+        filename = archive_filename(url)
+        if filename.lower().endswith(UNPUBLISHED_EXTENSIONS):
+            return
+        if published.setdefault(filename, sha256) != sha256:
+            published[filename] = None
+
+    for path in metadata:
+        for csv_path in metadata_csvs(path):
+            with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                columns = {name: i for i, name in enumerate(next(reader, []))}
+                if 'sha256' not in columns or 'deb_url' not in columns:
+                    logger.warning(f"{csv_path} has no sha256 / deb_url columns, skipped")
+                    continue
+                sha_col, url_col = columns['sha256'], columns['deb_url']
+                for row in reader:
+                    if len(row) == len(columns):
+                        add(row[url_col], row[sha_col])
+
+    if catalog and Path(catalog).exists():
+        from utils.catalog import Catalog
+        with Catalog(Path(catalog), readonly=True) as db:
+            for url, sha256 in db.conn.execute(
+                    "SELECT p.url, p.sha256 FROM packages p JOIN releases r ON r.id = p.release_id "
+                    "JOIN distros d ON d.id = r.distro_id WHERE d.name = ?", (distro,)):
+                add(url, sha256)
+
+    return {filename: sha256 for filename, sha256 in published.items() if sha256}
+
+
+class HashedArchives:
+    """
+    Local index of the package archives that have already been hashed, keyed by archive sha256.
+
+    Each entry records the URL the archive was hashed from and the digest
+    algorithms that were computed for it. Before a download, the sha256 the
+    repository publishes for the package file is looked up here; when that
+    content has been hashed (with every algorithm now requested) its rows
+    are already in the output and the download is skipped. Only new or
+    changed package files are fetched.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def add(self, archives: Iterable[Tuple[str, str]], algorithms: Sequence[str]) -> int:
+        """
+        Record hashed archives, replacing earlier records of the same content.
+
+        Args:
+            archives: (sha256, url) pairs
+            algorithms: Digest algorithms computed for the archives and their files
+
+        Returns:
+            Number of archives recorded
+        """
+        digests = ','.join(parse_algorithms(algorithms))
+        count = 0
+        batch = []
+        for sha256, url in archives:
+            batch.append((bytes.fromhex(sha256), digests, url))
+            if len(batch) >= BATCH_SIZE:
+                count += self._insert(batch)
+                batch = []
+        if batch:
+            count += self._insert(batch)
+        return count
+
+    def _insert(self, batch: List[Tuple[bytes, str, str]]) -> int:
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO archives (sha256, digests, url) VALUES (?, ?, ?)", batch)
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return len(batch)
+
+    def import_csv(self, csv_path: Path) -> int:
+        """
+        Record the archives of a packages.csv written by an earlier run.
+
+        Args:
+            csv_path: packages.csv from file_hasher.py or hash_distro_files.sh
+
+        Returns:
+            Number of archives recorded
+        """
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            # Extra digest columns follow name,version,sha256,url
+            algorithms = ['sha256'] + fieldnames[4:]
+            return self.add(((row['sha256'], row['url']) for row in reader
+                             if len(row.get('sha256') or '') == 64 and row.get('url')), algorithms)
+
+    def lookup(self, sha256: str, algorithms: Sequence[str] = ('sha256',)) -> Optional[str]:
+        """
+        Find an archive that was hashed with (at least) the given algorithms.
+
+        Args:
+            sha256: Hex encoded archive SHA256 digest
+            algorithms: Digest algorithms the caller needs
+
+        Returns:
+            URL the archive was hashed from, or None
+        """
+        try:
+            key = bytes.fromhex(sha256)
+        except ValueError:
+            return None
+        row = self.conn.execute("SELECT digests, url FROM archives WHERE sha256 = ?", (key,)).fetchone()
+        if row is None or not set(algorithms) <= set(row[0].split(',')):
+            return None
+        return row[1]
+
+    def iter_unhashed(self, sources: Iterable[str], published: Dict[str, str], algorithms: Sequence[str],
+                      skipped: Callable[[str, str], None]) -> Iterator[str]:
+        """
+        Filter out the packages whose published sha256 has already been hashed.
+
+        Args:
+            sources: Package URLs or paths
+            published: Archive file name to published sha256 (from load_published)
+            algorithms: Digest algorithms the run computes
+            skipped: Called with (source, URL it was hashed from) for each skipped package
+
+        Returns:
+            Iterator of the sources that still have to be downloaded and hashed
+        """
+        for source in sources:
+            sha256 = published.get(archive_filename(source))
+            known = self.lookup(sha256, algorithms) if sha256 else None
+            if known is None:
+                yield source
+            else:
+                skipped(source, known)
+
+    def count(self) -> int:
+        """Number of archives recorded."""
+        return self.conn.execute("SELECT COUNT(*) FROM archives").fetchone()[0]
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description='Inspect the index of already hashed package archives')
+    arg_parser.add_argument('--db', required=True, help='Index database (e.g. <distro>/output/hashed.db)')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='Record the archives of a packages.csv')
+    import_parser.add_argument('csv')
+    lookup_parser = subparsers.add_parser('lookup', help='Print the URL an archive sha256 was hashed from')
+    lookup_parser.add_argument('sha256')
+    subparsers.add_parser('count', help='Print the number of archives recorded')
+
+    args = arg_parser.parse_args()
+
+    with HashedArchives(Path(args.db)) as index:
+        if args.command == 'import':
+            count = index.import_csv(Path(args.csv))
+            logger.info(f"Recorded {count} archives from {args.csv} in {args.db}")
+        elif args.command == 'lookup':
+            url = index.lookup(args.sha256.lower())
+            if url is None:
+                print(f"{args.sha256} has not been hashed")
+                sys.exit(1)
+            print(url)
+        else:
+            print(index.count())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HTTPClient:
+    """
+    Shared HTTP client for the network based parsers.
+
+    One keep-alive session is reused for every request, failed requests are
+    retried with exponential backoff, and the number of concurrent requests
+    to any one host is capped so parallel downloads stay polite to mirrors.
+    """
+
+    def __init__(self, max_retries: int = 3, backoff_factor: float = 0.5, per_host_limit: int = 4,
+                 pool_size: int = 16, timeout: float = 60, user_agent: Optional[str] = None):
+        """
+        Args:
+            max_retries: Retries for connection errors and 429/5xx responses
+            backoff_factor: Base delay in seconds, doubled on each retry
+            per_host_limit: Maximum concurrent requests to the same host
+            pool_size: Keep-alive connections kept per host
+            timeout: Default request timeout in seconds
+            user_agent: User-Agent header sent with every request
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.per_host_limit = per_host_limit
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self._setup()
+
+    def _setup(self):
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if self.user_agent:
+            self.session.headers['User-Agent'] = self.user_agent
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Sessions and locks cannot be pickled; workers get a fresh session
+        state = self.__dict__.copy()
+        for key in ('session', '_host_slots', '_lock'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+    @contextmanager
+    def request(self, method: str, url: str, **kwargs) -> Iterator[requests.Response]:
+        """
+        Send a request while holding one of the host's concurrency slots.
+
+        The slot (and a streamed response's connection) is released when the
+        with block exits, so a streamed body counts against the host limit
+        for as long as it is being read.
+
+        Args:
+            method: HTTP method
+            url: URL to request
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            Context manager yielding the response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._host_slot(url):
+            response = self.session.request(method, url, **kwargs)
+            try:
+                yield response
+            finally:
+                response.close()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET a URL and read the whole body.
+
+        Args:
+            url: URL to request
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            Response with its content already loaded
+        """
+        kwargs['stream'] = False
+        with self.request('GET', url, **kwargs) as response:
+            return response
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send a HEAD request.
+
+        Args:
+            url: URL to request
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            Response (without a body)
+        """
+        with self.request('HEAD', url, **kwargs) as response:
+            return response
+
+    @contextmanager
+    def stream(self, url: str, **kwargs) -> Iterator[requests.Response]:
+        """
+        GET a URL for streaming; response.raw yields the decoded body.
+
+        Args:
+            url: URL to request
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            Context manager yielding a response whose status has been checked
+        """
+        kwargs['stream'] = True
+        with self.request('GET', url, **kwargs) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            # Keep EOF reads returning b'' (instead of raising on a closed
+            # file) so wrappers such as io.BufferedReader see a clean end
+            response.raw.auto_close = False
+            yield response
+
+    def fan_out(self, func: Callable[..., Any], tasks: Sequence[Tuple], workers: int = 8) -> Iterator[Any]:
+        """
+        Call func(*task) for every task from a pool of threads, yielding results in task order.
+
+        Meant for I/O bound work such as downloading several indexes at once;
+        requests made through this client still respect the per-host limit.
+        Tasks are submitted as results are consumed, so at most one result
+        per worker is held at a time.
+
+        Args:
+            func: Function to call for each task
+            tasks: Argument tuples, one per call
+            workers: Maximum number of threads
+
+        Returns:
+            Iterator of results in the same order as tasks
+        """
+        workers = min(workers, len(tasks))
+        if workers <= 1:
+            for task in tasks:
+                yield func(*task)
+            return
+
+        tasks = iter(tasks)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque(executor.submit(func, *task) for _, task in zip(range(workers), tasks))
+            while in_flight:
+                result = in_flight.popleft().result()
+                for task in tasks:
+                    in_flight.append(executor.submit(func, *task))
+                    break
+                yield result
+
+    @contextmanager
+    def _host_slot(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+        with slot:
+            yield
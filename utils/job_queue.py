@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+import csv
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+STATES = (PENDING, RUNNING, DONE, FAILED)
+
+# urls.csv state column as written by earlier versions of hash_distro_files.sh
+CSV_STATES = {'-1': PENDING, '0': PENDING, '1': DONE}
+
+BATCH_SIZE = 10000
+
+# UPDATE ... RETURNING needs SQLite 3.35; older system libraries (Ubuntu 20.04, EL8)
+# claim with a SELECT and an UPDATE inside one write transaction instead
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (state, id);
+"""
+
+
+class JobQueue:
+    """
+    Durable queue of package URLs to process, stored in SQLite.
+
+    Every URL is a job with a state (pending, running, done, failed), the
+    number of attempts, the last error and created / updated timestamps.
+    Claiming, completing and failing jobs are single indexed statements,
+    so several processes can share the queue and a run that is interrupted
+    picks up where it stopped (see requeue()). The database runs in WAL
+    mode, so progress can be read while workers are writing.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        Queue URLs as pending jobs; URLs already queued are left as they are.
+
+        Args:
+            urls: Package URLs
+
+        Returns:
+            Number of new jobs
+        """
+        count = 0
+        batch = []
+        for url in urls:
+            url = url.strip()
+            if url:
+                batch.append(url)
+            if len(batch) >= BATCH_SIZE:
+                count += self._insert([(url, PENDING) for url in batch])
+                batch = []
+        if batch:
+            count += self._insert([(url, PENDING) for url in batch])
+        return count
+
+    def import_csv(self, csv_path: Path) -> int:
+        """
+        Load a urls.csv (url,state) from an earlier run, keeping finished URLs done.
+
+        Args:
+            csv_path: urls.csv written by hash_distro_files.sh or mirror_collect.py
+
+        Returns:
+            Number of new jobs
+        """
+        count = 0
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            batch = []
+            for row in reader:
+                if row and row[0]:
+                    batch.append((row[0], CSV_STATES.get(row[1] if len(row) > 1 else '-1', PENDING)))
+                if len(batch) >= BATCH_SIZE:
+                    count += self._insert(batch)
+                    batch = []
+            if batch:
+                count += self._insert(batch)
+        return count
+
+    def _insert(self, jobs: List[Tuple[str, str]]) -> int:
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany("INSERT OR IGNORE INTO jobs (url, state, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                                  [(url, state, now, now) for url, state in jobs])
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return self.conn.total_changes - before
+
+    def claim(self, limit: int = 1) -> List[str]:
+        """
+        Atomically take pending jobs, marking them running.
+
+        Args:
+            limit: Maximum number of jobs to take
+
+        Returns:
+            URLs of the claimed jobs, oldest first (empty when the queue is drained)
+        """
+        if not HAS_RETURNING:
+            return self._claim_without_returning(limit)
+        rows = self.conn.execute(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE id IN (SELECT id FROM jobs WHERE state = ? ORDER BY id LIMIT ?) RETURNING id, url",
+            (RUNNING, time.time(), PENDING, limit)).fetchall()
+        return [url for _, url in sorted(rows)]
+
+    def _claim_without_returning(self, limit: int) -> List[str]:
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.conn.execute("SELECT id, url FROM jobs WHERE state = ? ORDER BY id LIMIT ?",
+                                     (PENDING, limit)).fetchall()
+            self.conn.executemany("UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                                  [(RUNNING, time.time(), job_id) for job_id, _ in rows])
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return [url for _, url in rows]
+
+    def iter_claimed(self, batch_size: int = 32) -> Iterator[str]:
+        """
+        Claim and yield pending jobs until none are left.
+
+        Jobs are claimed batch_size at a time as the iterator is consumed.
+
+        Args:
+            batch_size: Jobs claimed per statement
+
+        Returns:
+            Iterator of URLs
+        """
+        while True:
+            urls = self.claim(batch_size)
+            if not urls:
+                return
+            yield from urls
+
+    def complete(self, urls: Iterable[str]):
+        """
+        Mark jobs as done.
+
+        Args:
+            urls: URLs of the finished jobs
+        """
+        now = time.time()
+        self.conn.executemany("UPDATE jobs SET state = ?, last_error = NULL, updated_at = ? WHERE url = ?",
+                              [(DONE, now, url) for url in urls])
+
+    def fail(self, url: str, error: str):
+        """
+        Mark a job as failed.
+
+        Args:
+            url: URL of the job
+            error: Error message recorded in last_error
+        """
+        self.conn.execute("UPDATE jobs SET state = ?, last_error = ?, updated_at = ? WHERE url = ?",
+                          (FAILED, error, time.time(), url))
+
+    def set_state(self, url: str, state: str) -> bool:
+        """
+        Force the state of one job.
+
+        Args:
+            url: URL of the job
+            state: One of STATES
+
+        Returns:
+            True if the job exists
+        """
+        if state not in STATES:
+            raise ValueError(f"Unknown job state: {state}")
+        cursor = self.conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE url = ?",
+                                   (state, time.time(), url))
+        return cursor.rowcount > 0
+
+    def requeue(self, max_attempts: Optional[int] = 3) -> int:
+        """
+        Make interrupted and retryable jobs pending again before a new run.
+
+        Running jobs were left behind by a run that did not finish; failed
+        jobs are retried until they have been attempted max_attempts times.
+        Only call this when no other process is working on the queue.
+
+        Args:
+            max_attempts: Attempts after which failed jobs stay failed (None = retry all)
+
+        Returns:
+            Number of requeued jobs
+        """
+        cursor = self.conn.execute(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ? OR (state = ? AND attempts < ?)",
+            (PENDING, time.time(), RUNNING, FAILED, sys.maxsize if max_attempts is None else max_attempts))
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Count the jobs in each state (an index-only scan).
+
+        Returns:
+            Dictionary of state to count, with every STATES key and 'total'
+        """
+        counts = dict.fromkeys(STATES, 0)
+        for state, count in self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[state] = count
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def failures(self, limit: int = 20) -> List[Tuple[str, int, str]]:
+        """
+        List failed jobs, most recent first.
+
+        Args:
+            limit: Maximum number of jobs
+
+        Returns:
+            List of (url, attempts, last_error) tuples
+        """
+        return self.conn.execute("SELECT url, attempts, last_error FROM jobs WHERE state = ? "
+                                 "ORDER BY updated_at DESC LIMIT ?", (FAILED, limit)).fetchall()
+
+
+def main():
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    arg_parser = argparse.ArgumentParser(description='Manage the package URL job queue of hash_distro_files.sh')
+    arg_parser.add_argument('--db', required=True, help='Job queue database (e.g. <distro>/output/jobs.db)')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('add', help='Queue the URLs read from stdin (one per line)')
+    import_parser = subparsers.add_parser('import', help='Load a urls.csv (url,state) from an earlier run')
+    import_parser.add_argument('csv')
+    counts_parser = subparsers.add_parser('counts', help='Print job counts')
+    counts_parser.add_argument('--plain', action='store_true',
+                               help='Print "total done running failed pending" on one line')
+    state_parser = subparsers.add_parser('set-state', help='Force the state of one job')
+    state_parser.add_argument('url')
+    state_parser.add_argument('state', choices=STATES)
+    requeue_parser = subparsers.add_parser('requeue', help='Make interrupted and failed jobs pending again')
+    requeue_parser.add_argument('--max-attempts', type=int, help='Leave jobs attempted this often failed')
+    failures_parser = subparsers.add_parser('failures', help='List failed jobs with their last error')
+    failures_parser.add_argument('--limit', type=int, default=20)
+
+    args = arg_parser.parse_args()
+
+    with JobQueue(Path(args.db)) as jobs:
+        if args.command == 'add':
+            count = jobs.add(sys.stdin)
+            logger.info(f"Queued {count} new URLs in {args.db}")
+        elif args.command == 'import':
+            count = jobs.import_csv(Path(args.csv))
+            logger.info(f"Imported {count} URLs from {args.csv} into {args.db}")
+        elif args.command == 'counts':
+            counts = jobs.counts()
+            if args.plain:
+                print(' '.join(str(counts[key]) for key in ('total', DONE, RUNNING, FAILED, PENDING)))
+            else:
+                for key, count in counts.items():
+                    print(f"{key}: {count}")
+        elif args.command == 'set-state':
+            if not jobs.set_state(args.url, args.state):
+                print(f"No job for {args.url}")
+                sys.exit(1)
+        elif args.command == 'requeue':
+            count = jobs.requeue(args.max_attempts)
+            logger.info(f"Requeued {count} jobs")
+        else:
+            for url, attempts, error in jobs.failures(args.limit):
+                print(f"{url}\t{attempts}\t{error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 #!/usr/bin/env python3
 
 import re
+from functools import lru_cache
 from typing import Optional, List, Dict
 
 class LicenseDetector:
     """Detects and normalizes software licenses to SPDX identifiers."""
     
-    def __init__(self):
+    # Metadata fields consulted by guess_license_from_fields, in order
+    LICENSE_FIELDS = (
+        'license', 'licence', 'copyright', 'rights',
+        'description', 'summary', 'homepage'
+    )
+    
+    # Strings longer than this (package descriptions, copyright files) rarely
+    # repeat, so they bypass the result cache instead of filling it
+    MAX_CACHED_LENGTH = 256
+    
+    def __init__(self, cache_size: int = 16384):
+        """
+        Args:
+            cache_size: Maximum number of detect_license results kept in the LRU cache
+        """
+        self.cache_size = cache_size
         self.license_patterns = {
             'GPL-2.0': [
                 r'GPL.*version\s*2',
@@ -77,11 +93,41 @@ class LicenseDetector:
                 r'AGPLv3'
             ]
         }
+        
+        self._compile_patterns()
+    
+    def _compile_patterns(self):
+        """Compile one regex per license plus a combined alternation of every pattern."""
+        self._compiled_patterns = {
+            spdx_id: re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+            for spdx_id, patterns in self.license_patterns.items()
+        }
+        # Most texts (descriptions especially) match nothing; one search rejects them
+        self._any_license = re.compile(
+            '|'.join(f'(?:{pattern.pattern})' for pattern in self._compiled_patterns.values()),
+            re.IGNORECASE
+        )
+        self._cached_detect = lru_cache(maxsize=self.cache_size)(self._detect_uncached)
+        self._uncached_calls = 0
+    
+    def __getstate__(self):
+        # The cache wraps a bound method and cannot be pickled (e.g. for worker processes)
+        state = self.__dict__.copy()
+        for key in ('_compiled_patterns', '_any_license', '_cached_detect', '_uncached_calls'):
+            state.pop(key, None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile_patterns()
     
     def detect_license(self, text: str) -> Optional[str]:
         """
         Detect license from text and return SPDX identifier.
         
+        Licenses are tried in the order of license_patterns and the first one
+        with a matching pattern wins. Results for short strings are cached.
+        
         Args:
             text: Text to analyze for license information
             
@@ -90,16 +136,51 @@ class LicenseDetector:
         """
         if not text:
             return None
-            
-        text_lower = text.lower()
         
-        for spdx_id, patterns in self.license_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, text_lower, re.IGNORECASE):
-                    return spdx_id
+        if len(text) > self.MAX_CACHED_LENGTH:
+            self._uncached_calls += 1
+            return self._detect_uncached(text)
+        return self._cached_detect(text)
+    
+    def _detect_uncached(self, text: str) -> Optional[str]:
+        if not self._any_license.search(text):
+            return None
+        
+        for spdx_id, pattern in self._compiled_patterns.items():
+            if pattern.search(text):
+                return spdx_id
         
         return None
     
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Report how well the detect_license cache is doing in this process.
+        
+        Returns:
+            Dictionary with hits, misses, uncached (too long to cache), size and maxsize
+        """
+        info = self._cached_detect.cache_info()
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'uncached': self._uncached_calls,
+            'size': info.currsize,
+            'maxsize': info.maxsize
+        }
+    
+    def format_cache_stats(self) -> str:
+        """
+        Summarize cache_stats() for logging.
+        
+        Returns:
+            Human readable one-line summary
+        """
+        stats = self.cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = 100.0 * stats['hits'] / lookups if lookups else 0.0
+        return (f"{stats['hits']} hits, {stats['misses']} misses ({hit_rate:.1f}% hit rate), "
+                f"{stats['uncached']} uncached, {stats['size']}/{stats['maxsize']} entries")
+    
     def guess_license_from_fields(self, package_fields: Dict[str, str]) -> Optional[str]:
         """
         Guess license from various package metadata fields.
@@ -110,12 +191,7 @@ class LicenseDetector:
         Returns:
             SPDX license identifier or None if not detected
         """
-        license_fields = [
-            'license', 'licence', 'copyright', 'rights',
-            'description', 'summary', 'homepage'
-        ]
-        
-        for field in license_fields:
+        for field in self.LICENSE_FIELDS:
             if field in package_fields:
                 detected = self.detect_license(package_fields[field])
                 if detected:
@@ -137,11 +213,9 @@ class LicenseDetector:
         if not copyright_text:
             return licenses
             
-        for spdx_id, patterns in self.license_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, copyright_text, re.IGNORECASE):
-                    if spdx_id not in licenses:
-                        licenses.append(spdx_id)
+        for spdx_id, pattern in self._compiled_patterns.items():
+            if pattern.search(copyright_text):
+                licenses.append(spdx_id)
         
         return licenses
     
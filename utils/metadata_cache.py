@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from .http_client import HTTPClient
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+
+
+class MetadataCache:
+    """
+    Content-addressed local cache for repository metadata downloads.
+
+    Files are stored under objects/ by the SHA-256 of their content, and
+    index.json maps each URL to its stored object and the ETag /
+    Last-Modified validators it was served with. Refreshing a cached URL
+    sends a conditional GET, so an unchanged index costs one 304 response.
+    Files that a repomd.xml lists with a checksum are not requested at all
+    when an object with that checksum is already cached, whichever mirror
+    it came from.
+    """
+
+    def __init__(self, cache_dir: Path, http_client: Optional[HTTPClient] = None):
+        """
+        Args:
+            cache_dir: Directory holding index.json and the objects/ store
+            http_client: Client used for downloads (a new one if None)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_path = self.cache_dir / "index.json"
+        self.http_client = http_client or HTTPClient()
+        self.stats = {'hits': 0, 'not_modified': 0, 'downloaded': 0}
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str, timeout: float = 60) -> Path:
+        """
+        Return a local copy of a URL, revalidating a cached copy with a conditional GET.
+
+        Args:
+            url: URL to fetch
+            timeout: Request timeout in seconds
+
+        Returns:
+            Path of the cached file
+        """
+        entry = self._entry(url)
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with self.http_client.stream(url, headers=headers, timeout=timeout) as response:
+            if response.status_code == 304 and entry is not None:
+                logger.info(f"Not modified since last run: {url}")
+                self._count('not_modified')
+                return self._object_path(entry['digest'])
+            path = self._store(response.raw, url)
+            self._update(url, path.name,
+                         etag=response.headers.get('ETag', ''),
+                         last_modified=response.headers.get('Last-Modified', ''))
+        return path
+
+    def fetch_verified(self, url: str, checksum_type: str, checksum: str, timeout: float = 60) -> Path:
+        """
+        Return a local copy of a file whose checksum is published (e.g. primary.xml in repomd.xml).
+
+        If an object with that checksum is already cached no request is made.
+        Otherwise the file is downloaded and its checksum verified.
+
+        Args:
+            url: URL to fetch
+            checksum_type: Checksum algorithm (sha256, sha512, sha1, ...)
+            checksum: Expected hex digest of the file as served
+            timeout: Request timeout in seconds
+
+        Returns:
+            Path of the cached file
+        """
+        checksum_type = (checksum_type or '').lower()
+        checksum_type = 'sha1' if checksum_type == 'sha' else checksum_type  # old createrepo name
+        checksum = (checksum or '').lower()
+        if not checksum_type or not checksum:
+            return self.fetch(url, timeout)
+
+        key = f"{checksum_type}:{checksum}"
+        with self._lock:
+            digest = self._index['checksums'].get(key)
+        if digest and self._object_path(digest).exists():
+            logger.info(f"Checksum unchanged, using cached copy of {url}")
+            self._count('hits')
+            return self._object_path(digest)
+
+        with self.http_client.stream(url, timeout=timeout) as response:
+            path = self._store(response.raw, url)
+        actual = self._checksum_of(path, checksum_type) if checksum_type != 'sha256' else path.name
+        if actual != checksum:
+            self._discard(path.name)
+            raise ValueError(f"Checksum mismatch for {url}: expected {checksum}, got {actual}")
+        self._update(url, path.name, checksum=key)
+        return path
+
+    def save(self):
+        """Write index.json (also done after every change)."""
+        with self._lock:
+            self._save_index()
+
+    def format_stats(self) -> str:
+        """Summarize how many fetches were served from the cache."""
+        return (f"{self.stats['hits']} unchanged by checksum, {self.stats['not_modified']} not modified, "
+                f"{self.stats['downloaded']} downloaded")
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable metadata cache index {self.index_path}: {e}")
+            index = {}
+        index.setdefault('urls', {})
+        index.setdefault('checksums', {})
+        return index
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + '.part')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def _entry(self, url: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._index['urls'].get(url)
+        if entry is None or not self._object_path(entry['digest']).exists():
+            return None
+        return entry
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _store(self, stream, url: str) -> Path:
+        """Copy a response body into the object store, named by its SHA-256."""
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        sha256 = hashlib.sha256()
+        tmp_path = self.objects_dir / f".{threading.get_ident()}.part"
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                f.write(chunk)
+        digest = sha256.hexdigest()
+        path = self._object_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+        logger.debug(f"Cached {url} as {digest}")
+        self._count('downloaded')
+        return path
+
+    @staticmethod
+    def _checksum_of(path: Path, checksum_type: str) -> str:
+        digest = hashlib.new(checksum_type)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _update(self, url: str, digest: str, etag: str = '', last_modified: str = '', checksum: str = ''):
+        with self._lock:
+            previous = self._index['urls'].get(url)
+            self._index['urls'][url] = {'digest': digest, 'etag': etag, 'last_modified': last_modified}
+            if checksum:
+                self._index['checksums'][checksum] = digest
+            if previous and previous['digest'] != digest:
+                self._release(previous['digest'])
+            self._save_index()
+
+    def _release(self, digest: str):
+        """Delete an object no URL or checksum refers to any more (lock held)."""
+        if any(entry['digest'] == digest for entry in self._index['urls'].values()):
+            return
+        for key in [key for key, value in self._index['checksums'].items() if value == digest]:
+            del self._index['checksums'][key]
+        self._object_path(digest).unlink(missing_ok=True)
+
+    def _discard(self, digest: str):
+        with self._lock:
+            self._release(digest)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
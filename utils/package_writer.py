@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+import csv
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .catalog import Catalog
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for --format parquet/arrow
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = ['package', 'version', 'sha256', 'sha512', 'component',
+              'architecture', 'deb_url', 'license', 'purl', 'release',
+              'signature_verified', 'signature_method', 'signer']
+
+# Output formats and the file extension each one uses
+FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrows'}
+
+# Columns with few distinct values, stored dictionary encoded in columnar output
+DICTIONARY_COLUMNS = {'component', 'architecture', 'license', 'release',
+                      'signature_verified', 'signature_method', 'signer'}
+
+BATCH_SIZE = 65536
+
+
+class _CsvSink:
+    """One output CSV, written to a temporary file and renamed into place on close."""
+
+    def __init__(self, path: Path, fieldnames: List[str]):
+        self.path = path
+        self.count = 0
+        self._tmp_path = path.with_name(path.name + '.part')
+        self._file = open(self._tmp_path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(fieldnames)
+
+    def write(self, values: List[str]):
+        self._writer.writerow(values)
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class _ColumnarSink:
+    """
+    One Parquet or Arrow IPC stream output, written in dictionary encoded record batches.
+
+    Rows are buffered column by column and flushed every BATCH_SIZE rows.
+    Arrow output uses the IPC stream format, which (unlike the file format)
+    allows each batch to carry its own dictionaries.
+    """
+
+    def __init__(self, path: Path, fieldnames: List[str], output_format: str):
+        self.path = path
+        self.count = 0
+        self.fieldnames = fieldnames
+        self._tmp_path = path.with_name(path.name + '.part')
+        self._columns: List[List[str]] = [[] for _ in fieldnames]
+        self._dictionary = [field in DICTIONARY_COLUMNS for field in fieldnames]
+        self.schema = pyarrow.schema([
+            pyarrow.field(field, pyarrow.dictionary(pyarrow.int32(), pyarrow.string()) if dictionary else pyarrow.string())
+            for field, dictionary in zip(fieldnames, self._dictionary)
+        ])
+        if output_format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(str(self._tmp_path), self.schema, compression='zstd',
+                                                         use_dictionary=True)
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression='zstd')
+            self._writer = pyarrow.ipc.new_stream(str(self._tmp_path), self.schema, options=options)
+
+    def write(self, values: List[str]):
+        for column, value in zip(self._columns, values):
+            column.append(value)
+        self.count += 1
+        if len(self._columns[0]) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._columns[0]:
+            return
+        arrays = []
+        for column, dictionary in zip(self._columns, self._dictionary):
+            array = pyarrow.array(column, type=pyarrow.string())
+            arrays.append(array.dictionary_encode() if dictionary else array)
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self._columns = [[] for _ in self.fieldnames]
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._writer.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class PackageWriter:
+    """
+    Streams package rows to per-release files and a combined file as they are produced.
+
+    Rows are never accumulated, so memory use does not depend on how many
+    releases are processed. Each file is only created once its first row
+    arrives and only replaces the previous output when the writer is closed.
+    Output is CSV by default, or Parquet / Arrow (which need pyarrow).
+    Rows can also be loaded into a SQLite catalog in the same pass; the
+    catalog load is one transaction committed when the writer is closed.
+    """
+
+    def __init__(self, output_dir: Path, distro: str, per_release: bool = True, combined: bool = True,
+                 fieldnames: Optional[List[str]] = None, output_format: str = 'csv',
+                 catalog: Optional[Path] = None):
+        """
+        Args:
+            output_dir: Directory the output files are written to
+            distro: Distribution name used in the file names
+            per_release: Write <distro>_<release>_packages.<ext> for each release
+            combined: Write <distro>_packages.<ext> with every row
+            fieldnames: Output columns (defaults to FIELDNAMES)
+            output_format: One of FORMATS (csv, parquet, arrow)
+            catalog: SQLite catalog database that also receives the rows
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        if output_format != 'csv' and pyarrow is None:
+            raise RuntimeError(f"pyarrow is required for --format {output_format}: pip3 install pyarrow")
+        self.output_dir = Path(output_dir)
+        self.distro = distro
+        self.per_release = per_release
+        self.combined = combined
+        self.fieldnames = list(fieldnames or FIELDNAMES)
+        self.output_format = output_format
+        self.extension = FORMATS[output_format]
+        self.total = 0
+        self._release_sinks = {}
+        self._combined_sink = None
+        self.catalog_path = catalog
+        self._catalog = None
+        self._catalog_loader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, row: Dict[str, str], release: Optional[str] = None):
+        """
+        Write one package row.
+
+        Args:
+            row: Package metadata dictionary with the FIELDNAMES keys
+            release: Release whose per-release file receives the row
+        """
+        values = [row.get(field, '') for field in self.fieldnames]
+        self.total += 1
+
+        if self.per_release and release is not None:
+            sink = self._release_sinks.get(release)
+            if sink is None:
+                sink = self._open(self.output_dir / f"{self.distro}_{release}_packages{self.extension}")
+                self._release_sinks[release] = sink
+            sink.write(values)
+
+        if self.combined:
+            if self._combined_sink is None:
+                self._combined_sink = self._open(self.output_dir / f"{self.distro}_packages{self.extension}")
+            self._combined_sink.write(values)
+
+        if self.catalog_path is not None:
+            if self._catalog_loader is None:
+                self._catalog = Catalog(self.catalog_path)
+                self._catalog.begin()
+                self._catalog_loader = self._catalog.package_loader(self.distro)
+            self._catalog_loader.add(row)
+
+    def write_rows(self, rows: Iterable[Dict[str, str]], release: Optional[str] = None) -> int:
+        """
+        Write several package rows.
+
+        Args:
+            rows: Package metadata dictionaries
+            release: Release whose per-release file receives the rows
+
+        Returns:
+            Number of rows written
+        """
+        count = 0
+        for row in rows:
+            self.write(row, release)
+            count += 1
+        return count
+
+    def close(self):
+        """Finish every file, moving it into place, and log the row counts."""
+        for sink in self._release_sinks.values():
+            sink.close()
+            logger.info(f"Written {sink.count} packages to {sink.path}")
+        if self._combined_sink is not None:
+            self._combined_sink.close()
+            label = "combined " if self.per_release else ""
+            logger.info(f"Written {self._combined_sink.count} packages to {label}{self._combined_sink.path}")
+        if self._catalog_loader is not None:
+            count = self._catalog_loader.finish()
+            self._catalog.commit()
+            self._catalog.close()
+            logger.info(f"Loaded {count} packages into catalog {self.catalog_path}")
+        self._release_sinks = {}
+        self._combined_sink = None
+        self._catalog = None
+        self._catalog_loader = None
+
+    def abort(self):
+        """Discard every partially written file, keeping any previous output."""
+        for sink in self._release_sinks.values():
+            sink.abort()
+        if self._combined_sink is not None:
+            self._combined_sink.abort()
+        if self._catalog is not None:
+            self._catalog.close()
+        self._release_sinks = {}
+        self._combined_sink = None
+        self._catalog = None
+        self._catalog_loader = None
+
+    def _open(self, path: Path):
+        try:
+            if self.output_format == 'csv':
+                return _CsvSink(path, self.fieldnames)
+            return _ColumnarSink(path, self.fieldnames, self.output_format)
+        except OSError as e:
+            logger.error(f"Error writing output file {path}: {e}")
+            raise
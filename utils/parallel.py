@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, Sequence, Tuple
+
+
+def resolve_jobs(jobs: int) -> int:
+    """
+    Turn a --jobs value into a worker count.
+
+    Args:
+        jobs: Requested number of workers; 0 or less means one per CPU
+
+    Returns:
+        Number of worker processes to use (at least 1)
+    """
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def map_ordered(func: Callable[..., Any], tasks: Sequence[Tuple], jobs: int = 1) -> Iterator[Any]:
+    """
+    Call func(*task) for every task, yielding the results in task order.
+
+    With more than one job the calls run in a pool of worker processes, so
+    func must be picklable (a module-level function or a method of a
+    picklable object). Results are still yielded in the order of tasks, so
+    the output of a parallel run matches a serial one.
+
+    Args:
+        func: Function to call for each task
+        tasks: Argument tuples, one per call
+        jobs: Number of worker processes (1 runs everything in this process)
+
+    Returns:
+        Iterator of results in the same order as tasks
+    """
+    jobs = min(resolve_jobs(jobs), len(tasks))
+    if jobs <= 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(func, *zip(*tasks))
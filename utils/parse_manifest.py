@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+import csv
+import hashlib
+import json
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .package_writer import FIELDNAMES
+from .parallel import map_ordered
+
+logger = logging.getLogger(__name__)
+
+# Version of the rows the parsers produce. Bump it whenever a parser, or a
+# normalizer it uses (licenses, PURLs, ...), changes the rows it emits, so
+# that rows cached by an earlier version are parsed again.
+PARSER_VERSION = 2
+
+CHANGE_FIELDNAMES = ['change', 'package', 'release', 'component', 'architecture',
+                     'old_version', 'version', 'sha256', 'purl']
+
+
+class ParseManifest:
+    """
+    Remembers which downloaded metadata files were parsed and what they produced.
+
+    For every input file the manifest stores the SHA-256 of its content and
+    its row count, and a copy of its rows is kept in <output_dir>/.parsed/.
+    An input whose digest is unchanged can then be skipped and its previous
+    rows reused, and the rows of a changed input can be diffed against the
+    previous run. Changes are staged and only become visible on save(), so
+    an aborted run leaves the previous state intact. Cached rows are only
+    reused when they were produced with the same PARSER_VERSION.
+    """
+
+    def __init__(self, output_dir: Path, distro: str, fieldnames: Optional[List[str]] = None):
+        """
+        Args:
+            output_dir: Directory holding the distribution's CSV output
+            distro: Distribution name used in the manifest file name
+            fieldnames: Row columns (defaults to FIELDNAMES)
+        """
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / f"{distro}_manifest.json"
+        self.rows_dir = self.output_dir / ".parsed"
+        self.fieldnames = list(fieldnames or FIELDNAMES)
+        self.entries: Dict[str, Dict] = {}
+        self._pending: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+        # Rows cached with different columns or by another parser version cannot be reused
+        if manifest.get('fieldnames') == self.fieldnames and manifest.get('version') == PARSER_VERSION:
+            self.entries = manifest.get('inputs', {})
+        else:
+            logger.info(f"Rows cached by {self.path} have other columns or an older parser version, parsing every input")
+
+    @staticmethod
+    def file_digest(path: Path) -> str:
+        """
+        Compute the SHA-256 of an input file.
+
+        Args:
+            path: Input file
+
+        Returns:
+            Hex digest
+        """
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def is_unchanged(self, path: Path, digest: str) -> bool:
+        """
+        Check whether an input was parsed before with exactly this content.
+
+        Args:
+            path: Input file
+            digest: Current SHA-256 of the file
+
+        Returns:
+            True if its previous rows can be reused
+        """
+        entry = self.entries.get(path.name)
+        return bool(entry) and entry.get('digest') == digest and self._rows_path(path.name).exists()
+
+    def load_rows(self, path: Path) -> List[Dict[str, str]]:
+        """
+        Load the rows an input produced when it was last parsed.
+
+        Args:
+            path: Input file
+
+        Returns:
+            List of package metadata dictionaries (empty if never parsed)
+        """
+        return list(self._iter_rows(self._rows_path(path.name)))
+
+    def record(self, path: Path, digest: str, rows: List[Dict[str, str]], **info: str):
+        """
+        Stage the result of parsing an input; it is committed by save().
+
+        Args:
+            path: Input file
+            digest: SHA-256 of the parsed content
+            rows: Rows the input produced
+            **info: Extra details stored in the entry (release, component, ...)
+        """
+        self.rows_dir.mkdir(parents=True, exist_ok=True)
+        part_path = self._rows_path(path.name + '.part')
+        with open(part_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.fieldnames)
+            for row in rows:
+                writer.writerow([row.get(field, '') for field in self.fieldnames])
+        self._pending[path.name] = dict(info, digest=digest, rows=len(rows))
+
+    def forget(self, name: str):
+        """
+        Drop an input that no longer exists; it is removed by save().
+
+        Args:
+            name: File name of the input
+        """
+        self._pending[name] = None
+
+    def save(self):
+        """Commit the staged inputs and write the manifest."""
+        for name, entry in self._pending.items():
+            if entry is None:
+                self.entries.pop(name, None)
+                self._rows_path(name).unlink(missing_ok=True)
+            else:
+                os.replace(self._rows_path(name + '.part'), self._rows_path(name))
+                self.entries[name] = entry
+        self._pending = {}
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.part')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PARSER_VERSION, 'fieldnames': self.fieldnames, 'inputs': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def discard(self):
+        """Throw away the staged inputs, keeping the previous state."""
+        for name, entry in self._pending.items():
+            if entry is not None:
+                self._rows_path(name + '.part').unlink(missing_ok=True)
+        self._pending = {}
+
+    def process(self, tasks: Sequence[Tuple], parse: Callable[..., List[Dict[str, str]]], jobs: int = 1,
+                full: bool = False, changes: Optional[List[Dict[str, str]]] = None,
+                release: Optional[str] = None) -> Iterator[Tuple[Tuple, List[Dict[str, str]]]]:
+        """
+        Yield the rows of every input, parsing only the inputs that changed.
+        
+        Each task is (input path, release, ...) and is parsed with
+        parse(*task), up to `jobs` at a time. Inputs whose content is
+        unchanged since the last run yield their previous rows instead.
+        Results are yielded in task order and staged for save().
+        
+        Args:
+            tasks: Parse tasks; the first two items must be the input path and release
+            parse: Function turning a task into its list of rows
+            jobs: Number of worker processes used for parsing
+            full: Parse every input even if it is unchanged
+            changes: List extended with the added / removed / updated packages
+            release: Only this release is being processed, so inputs of other releases are kept
+            
+        Returns:
+            Iterator of (task, rows) tuples
+        """
+        digests = {task[0]: self.file_digest(task[0]) for task in tasks}
+        parse_tasks = [task for task in tasks if full or not self.is_unchanged(task[0], digests[task[0]])]
+        to_parse = {task[0] for task in parse_tasks}
+        logger.info(f"{len(tasks) - len(parse_tasks)} of {len(tasks)} input files unchanged since the last run")
+        
+        parsed = map_ordered(parse, parse_tasks, jobs)
+        try:
+            for task in tasks:
+                path, task_release = task[0], task[1]
+                if path in to_parse:
+                    rows = next(parsed)
+                    if changes is not None:
+                        changes.extend(diff_rows(self.load_rows(path), rows))
+                    self.record(path, digests[path], rows, release=task_release)
+                else:
+                    rows = self.load_rows(path)
+                yield task, rows
+            
+            # Inputs that disappeared take their packages with them
+            current = {task[0].name for task in tasks}
+            for name, entry in list(self.entries.items()):
+                if name in current or (release and entry.get('release') != release):
+                    continue
+                if changes is not None:
+                    changes.extend(diff_rows(self._iter_rows(self._rows_path(name)), []))
+                self.forget(name)
+        except BaseException:
+            self.discard()
+            raise
+
+    def _rows_path(self, name: str) -> Path:
+        return self.rows_dir / f"{name}.csv"
+
+    @staticmethod
+    def _iter_rows(path: Path) -> Iterator[Dict[str, str]]:
+        try:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                fieldnames = next(reader, None)
+                if fieldnames:
+                    yield from (dict(zip(fieldnames, row)) for row in reader)
+        except FileNotFoundError:
+            return
+
+
+def diff_rows(old_rows: Iterable[Dict[str, str]], new_rows: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    """
+    Compare the rows one input produced in two runs.
+
+    Packages are matched by name, architecture and component. Repositories
+    such as updates or AppStream list several versions of one package, so
+    the rows of each package are compared as multisets: rows whose version
+    and sha256 are unchanged match each other, a remaining new row is
+    reported as an update of a remaining old row (one with the same version
+    first), and whatever is left over as added or removed.
+
+    Args:
+        old_rows: Rows from the previous run
+        new_rows: Rows from this run
+
+    Returns:
+        Iterator of change dictionaries with the CHANGE_FIELDNAMES keys
+    """
+    old: Dict[Tuple[str, str, str], List[Dict[str, str]]] = defaultdict(list)
+    for row in old_rows:
+        old[_package_key(row)].append(row)
+    new: Dict[Tuple[str, str, str], List[Dict[str, str]]] = defaultdict(list)
+    for row in new_rows:
+        new[_package_key(row)].append(row)
+
+    for key, rows in new.items():
+        previous = old.pop(key, [])
+        available: Dict[Tuple[str, str], int] = defaultdict(int)
+        for row in previous:
+            available[row['version'], row['sha256']] += 1
+        matched: Dict[Tuple[str, str], int] = defaultdict(int)
+        changed = []
+        for row in rows:
+            content = (row['version'], row['sha256'])
+            if matched[content] < available[content]:
+                matched[content] += 1
+            else:
+                changed.append(row)
+        # Old rows that were not matched, in their original order
+        leftover = []
+        for row in previous:
+            content = (row['version'], row['sha256'])
+            if matched[content] > 0:
+                matched[content] -= 1
+            else:
+                leftover.append(row)
+        for row in changed:
+            if not leftover:
+                yield _change('added', row)
+                continue
+            index = next((i for i, old_row in enumerate(leftover) if old_row['version'] == row['version']), 0)
+            yield _change('updated', row, leftover.pop(index)['version'])
+        for row in leftover:
+            yield _change('removed', row, row['version'], version='')
+
+    for rows in old.values():
+        for row in rows:
+            yield _change('removed', row, row['version'], version='')
+
+
+def _package_key(row: Dict[str, str]) -> Tuple[str, str, str]:
+    return row['package'], row['architecture'], row['component']
+
+
+def _change(change: str, row: Dict[str, str], old_version: str = '', version: Optional[str] = None) -> Dict[str, str]:
+    return {
+        'change': change,
+        'package': row['package'],
+        'release': row['release'],
+        'component': row['component'],
+        'architecture': row['architecture'],
+        'old_version': old_version,
+        'version': row['version'] if version is None else version,
+        'sha256': row['sha256'] if version is None else '',
+        'purl': row['purl']
+    }
+
+
+def write_changes(path: Path, changes: Iterable[Dict[str, str]]) -> int:
+    """
+    Write a changes CSV (added / removed / updated packages).
+
+    Args:
+        path: Output file
+        changes: Change dictionaries from diff_rows
+
+    Returns:
+        Number of changes written
+    """
+    count = 0
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.part')
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CHANGE_FIELDNAMES)
+        writer.writeheader()
+        for change in changes:
+            writer.writerow(change)
+            count += 1
+    os.replace(tmp_path, path)
+    return count
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Union
+
+from .compression import open_decompressed
+
+COMMON_NS = 'http://linux.duke.edu/metadata/common'
+RPM_NS = 'http://linux.duke.edu/metadata/rpm'
+REPO_NS = 'http://linux.duke.edu/metadata/repo'
+
+_NAME = f'{{{COMMON_NS}}}name'
+_ARCH = f'{{{COMMON_NS}}}arch'
+_VERSION = f'{{{COMMON_NS}}}version'
+_CHECKSUM = f'{{{COMMON_NS}}}checksum'
+_SUMMARY = f'{{{COMMON_NS}}}summary'
+_DESCRIPTION = f'{{{COMMON_NS}}}description'
+_PACKAGER = f'{{{COMMON_NS}}}packager'
+_URL = f'{{{COMMON_NS}}}url'
+_LOCATION = f'{{{COMMON_NS}}}location'
+_FORMAT = f'{{{COMMON_NS}}}format'
+_LICENSE = f'{{{RPM_NS}}}license'
+_GROUP = f'{{{RPM_NS}}}group'
+
+
+class RpmPackage(NamedTuple):
+    """The primary.xml fields the parsers use for one package."""
+    name: str = ''
+    arch: str = ''
+    epoch: str = '0'
+    ver: str = ''
+    rel: str = ''
+    checksum_type: str = ''
+    checksum: str = ''
+    location_href: str = ''
+    summary: str = ''
+    description: str = ''
+    url: str = ''
+    packager: str = ''
+    license: str = ''
+    group: str = ''
+
+    @property
+    def version(self) -> str:
+        """Full version string: [epoch:]ver-rel."""
+        if self.epoch and self.epoch != '0':
+            return f"{self.epoch}:{self.ver}-{self.rel}"
+        return f"{self.ver}-{self.rel}"
+
+    @property
+    def sha256(self) -> str:
+        """Package checksum if the repository publishes it as sha256, else ''."""
+        return self.checksum if self.checksum_type == 'sha256' else ''
+
+
+class RepomdEntry(NamedTuple):
+    """One <data> entry of repomd.xml."""
+    type: str
+    href: str
+    checksum_type: str
+    checksum: str
+
+
+class RepodataReader:
+    """Streams package records out of RPM repository (repomd.xml / primary.xml) metadata."""
+
+    COMMON_NS = COMMON_NS
+    PACKAGE_TAG = f'{{{COMMON_NS}}}package'
+
+    def parse_repomd(self, content: bytes) -> Dict[str, RepomdEntry]:
+        """
+        Parse repomd.xml into its metadata entries.
+
+        Args:
+            content: Raw repomd.xml document
+
+        Returns:
+            Dictionary mapping data type (primary, filelists, ...) to its entry
+        """
+        entries = {}
+        root = ET.fromstring(content)
+        for data in root.iter(f'{{{REPO_NS}}}data'):
+            location = data.find(f'{{{REPO_NS}}}location')
+            if location is None:
+                continue
+            checksum = data.find(f'{{{REPO_NS}}}checksum')
+            entries[data.get('type', '')] = RepomdEntry(
+                type=data.get('type', ''),
+                href=location.get('href', ''),
+                checksum_type=checksum.get('type', '').lower() if checksum is not None else '',
+                checksum=(checksum.text or '').strip() if checksum is not None else ''
+            )
+        return entries
+
+    def find_primary(self, content: bytes) -> Optional[RepomdEntry]:
+        """
+        Locate the primary metadata in repomd.xml.
+
+        Args:
+            content: Raw repomd.xml document
+
+        Returns:
+            The primary entry, or None if the repository does not list one
+        """
+        return self.parse_repomd(content).get('primary')
+
+    def iter_packages(self, source: Union[str, Path, BinaryIO], name: Optional[str] = None) -> Iterator[ET.Element]:
+        """
+        Yield each <package> element of a primary.xml document.
+
+        The document is parsed incrementally straight from the (gzip, xz, bz2
+        or zstd compressed) stream and every element is discarded once it has
+        been yielded, so memory use does not grow with the repository size.
+        A yielded element is only valid until the next one is requested.
+
+        Args:
+            source: Path to primary.xml[.gz|.xz|.zst] or a binary file object
+            name: File name or URL used to detect the compression of a file object
+
+        Returns:
+            Iterator of <package> elements
+        """
+        stream = open_decompressed(source, name)
+        try:
+            root = None
+            for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                    continue
+                if event == 'end' and elem.tag == self.PACKAGE_TAG:
+                    yield elem
+                    root.clear()
+        finally:
+            if stream is not source:
+                stream.close()
+
+    def iter_records(self, source: Union[str, Path, BinaryIO], name: Optional[str] = None) -> Iterator[RpmPackage]:
+        """
+        Yield an RpmPackage for each package of a primary.xml document.
+
+        Args:
+            source: Path to primary.xml[.gz|.xz|.zst] or a binary file object
+            name: File name or URL used to detect the compression of a file object
+
+        Returns:
+            Iterator of RpmPackage records
+        """
+        for elem in self.iter_packages(source, name):
+            yield self.parse_package(elem)
+
+    @staticmethod
+    def parse_package(elem: ET.Element) -> RpmPackage:
+        """
+        Extract an RpmPackage from a <package> element in one pass over its children.
+
+        Args:
+            elem: <package> element from primary.xml
+
+        Returns:
+            RpmPackage record
+        """
+        name = arch = ver = rel = ''
+        epoch = '0'
+        checksum_type = checksum = location_href = ''
+        summary = description = url = packager = license = group = ''
+
+        for child in elem:
+            tag = child.tag
+            if tag == _NAME:
+                name = child.text or ''
+            elif tag == _ARCH:
+                arch = child.text or ''
+            elif tag == _VERSION:
+                get = child.get
+                epoch = get('epoch', '0')
+                ver = get('ver', '')
+                rel = get('rel', '')
+            elif tag == _CHECKSUM:
+                checksum_type = child.get('type', '').lower()
+                checksum = child.text or ''
+            elif tag == _SUMMARY:
+                summary = child.text or ''
+            elif tag == _DESCRIPTION:
+                description = child.text or ''
+            elif tag == _URL:
+                url = child.text or ''
+            elif tag == _PACKAGER:
+                packager = child.text or ''
+            elif tag == _LOCATION:
+                location_href = child.get('href', '')
+            elif tag == _FORMAT:
+                for format_child in child:
+                    format_tag = format_child.tag
+                    if format_tag == _LICENSE:
+                        license = format_child.text or ''
+                    elif format_tag == _GROUP:
+                        group = format_child.text or ''
+
+        return RpmPackage(name, arch, epoch, ver, rel, checksum_type, checksum, location_href,
+                          summary, description, url, packager, license, group)
@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 
-import hashlib
+import base64
+import binascii
 import re
 from typing import Tuple, Optional, Dict
 
+from .digests import MultiDigest
+
+# Digest lengths (in hex characters) by checksum type name
+DIGEST_LENGTHS = {'sha1': 40, 'sha256': 64, 'sha512': 128}
+
+# apk checksum prefixes: Q1 is a base64 SHA-1, Q2 a base64 SHA-256
+APK_CHECKSUM_TYPES = {'Q1': 'sha1', 'Q2': 'sha256'}
+
 class SHASplitter:
     """Utility to extract and validate SHA256 and SHA512 hashes from various sources."""
     
+    # Fields that hold the sha256 / sha512 digest in each known metadata layout
+    KNOWN_LAYOUTS = {
+        'deb': ('SHA256', 'SHA512'),      # Debian/Ubuntu Packages stanzas
+        'alpm': ('sha256sum', None),      # Arch desc files (%SHA256SUM%)
+        # Alpine APKINDEX: C: is a digest of the control segment, not of the
+        # .apk file, so there is no package digest (see decode_apk_checksum)
+        'apk': (None, None),
+    }
+    
     def __init__(self):
         self.sha256_pattern = re.compile(r'\b[a-fA-F0-9]{64}\b')
         self.sha512_pattern = re.compile(r'\b[a-fA-F0-9]{128}\b')
@@ -79,9 +97,7 @@ class SHASplitter:
         Returns:
             True if valid SHA256 format
         """
-        if not hash_value:
-            return False
-        return bool(self.sha256_pattern.match(hash_value))
+        return self.normalize_hex(hash_value, 64) is not None
     
     def validate_sha512(self, hash_value: str) -> bool:
         """
@@ -93,9 +109,7 @@ class SHASplitter:
         Returns:
             True if valid SHA512 format
         """
-        if not hash_value:
-            return False
-        return bool(self.sha512_pattern.match(hash_value))
+        return self.normalize_hex(hash_value, 128) is not None
     
     def compute_file_hashes(self, file_path: str) -> Tuple[str, str]:
         """
@@ -107,15 +121,8 @@ class SHASplitter:
         Returns:
             Tuple of (sha256, sha512) hashes
         """
-        sha256_hash = hashlib.sha256()
-        sha512_hash = hashlib.sha512()
-        
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-                sha512_hash.update(chunk)
-        
-        return sha256_hash.hexdigest(), sha512_hash.hexdigest()
+        digests = MultiDigest(('sha256', 'sha512')).digest_file(file_path)
+        return digests['sha256'], digests['sha512']
     
     def extract_from_package_metadata(self, metadata: Dict[str, str]) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -149,4 +156,101 @@ class SHASplitter:
                     if extracted_sha512 and not sha512:
                         sha512 = extracted_sha512
         
-        return sha256, sha512
\ No newline at end of file
+        return sha256, sha512
+    
+    def normalize_hex(self, value: str, length: int) -> Optional[str]:
+        """
+        Validate a bare hex digest by length and alphabet, without regex scanning.
+        
+        Args:
+            value: Candidate digest
+            length: Expected number of hex characters
+            
+        Returns:
+            Lowercase digest, or None if value is not exactly one digest of that length
+        """
+        if not value or len(value) != length:
+            return None
+        try:
+            binascii.unhexlify(value)
+        except binascii.Error:
+            return None
+        return value.lower()
+    
+    def extract_checksum(self, checksum_type: str, checksum: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Split a typed checksum (as published in RPM primary.xml) into sha256/sha512.
+        
+        Args:
+            checksum_type: Checksum algorithm name (sha256, sha512, ...)
+            checksum: Hex digest
+            
+        Returns:
+            Tuple of (sha256, sha512); the slot not matching the type is None
+        """
+        checksum_type = (checksum_type or '').lower()
+        if checksum_type == 'sha256':
+            return self.normalize_hex(checksum, 64), None
+        if checksum_type == 'sha512':
+            return None, self.normalize_hex(checksum, 128)
+        return None, None
+    
+    def decode_apk_checksum(self, value: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Decode an Alpine APKINDEX checksum (the C: field).
+        
+        The checksum covers the control segment of the .apk only, so it
+        must not be used as the digest of the package file.
+        
+        Args:
+            value: Checksum such as "Q1<base64 sha1>" or "Q2<base64 sha256>"
+            
+        Returns:
+            Tuple of (algorithm, hex digest) or (None, None) if it cannot be decoded
+        """
+        if not value:
+            return None, None
+        value = value.strip()
+        algorithm = APK_CHECKSUM_TYPES.get(value[:2])
+        if algorithm is None:
+            return None, None
+        try:
+            digest = base64.b64decode(value[2:], validate=True)
+        except (binascii.Error, ValueError):
+            return None, None
+        if len(digest) * 2 != DIGEST_LENGTHS[algorithm]:
+            return None, None
+        return algorithm, digest.hex()
+    
+    def extract_known_hashes(self, metadata: Dict[str, str], layout: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Extract hashes from package metadata whose field names and formats are known.
+        
+        The digest fields of the layout are validated by length and hex check.
+        A field that does not hold exactly one bare digest falls back to the
+        regex scan of extract_hashes, and an unknown layout falls back to
+        extract_from_package_metadata. The 'apk' layout always yields
+        (None, None).
+        
+        Args:
+            metadata: Package metadata dictionary
+            layout: One of KNOWN_LAYOUTS ('deb', 'alpm', 'apk')
+            
+        Returns:
+            Tuple of (sha256, sha512) or (None, None)
+        """
+        fields = self.KNOWN_LAYOUTS.get(layout)
+        if fields is None:
+            return self.extract_from_package_metadata(metadata)
+        sha256_field, sha512_field = fields
+        
+        sha256 = sha512 = None
+        value = metadata.get(sha256_field) if sha256_field else None
+        if value:
+            sha256 = self.normalize_hex(value, 64) or self.extract_hashes(value)[0]
+        if sha512_field:
+            value = metadata.get(sha512_field)
+            if value:
+                sha512 = self.normalize_hex(value, 128) or self.extract_hashes(value)[1]
+        
+        return sha256, sha512
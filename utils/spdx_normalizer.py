@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+
+import re
+from typing import Dict, Iterable, List, Optional, Union
+
+# SPDX license identifiers seen in distro metadata, keyed by lower case for
+# case-insensitive lookups
+SPDX_LICENSES = {lid.lower(): lid for lid in [
+    '0BSD', 'AFL-2.1', 'AFL-3.0', 'AGPL-1.0-only', 'AGPL-3.0-only', 'AGPL-3.0-or-later',
+    'Apache-1.0', 'Apache-1.1', 'Apache-2.0', 'APSL-2.0', 'Artistic-1.0', 'Artistic-1.0-Perl',
+    'Artistic-2.0', 'Beerware', 'BitTorrent-1.1', 'BSD-1-Clause', 'BSD-2-Clause',
+    'BSD-2-Clause-Patent', 'BSD-3-Clause', 'BSD-3-Clause-Clear', 'BSD-4-Clause',
+    'BSD-Source-Code', 'BSL-1.0', 'bzip2-1.0.6', 'CC-BY-3.0', 'CC-BY-4.0', 'CC-BY-SA-3.0',
+    'CC-BY-SA-4.0', 'CC0-1.0', 'CDDL-1.0', 'CDDL-1.1', 'CECILL-2.1', 'ClArtistic', 'CPL-1.0',
+    'curl', 'EPL-1.0', 'EPL-2.0', 'EUPL-1.1', 'EUPL-1.2', 'FSFAP', 'FSFUL', 'FSFULLR',
+    'FTL', 'GFDL-1.1-only', 'GFDL-1.1-or-later', 'GFDL-1.2-only', 'GFDL-1.2-or-later',
+    'GFDL-1.3-only', 'GFDL-1.3-or-later', 'GPL-1.0-only', 'GPL-1.0-or-later', 'GPL-2.0-only',
+    'GPL-2.0-or-later', 'GPL-3.0-only', 'GPL-3.0-or-later', 'HPND', 'IJG', 'ImageMagick',
+    'Info-ZIP', 'IPA', 'IPL-1.0', 'ISC', 'JasPer-2.0', 'LGPL-2.0-only', 'LGPL-2.0-or-later',
+    'LGPL-2.1-only', 'LGPL-2.1-or-later', 'LGPL-3.0-only', 'LGPL-3.0-or-later', 'Libpng',
+    'libpng-2.0', 'libtiff', 'LPPL-1.3c', 'MirOS', 'MIT', 'MIT-0', 'MIT-CMU', 'MPL-1.0',
+    'MPL-1.1', 'MPL-2.0', 'MS-PL', 'MS-RL', 'NCSA', 'NTP', 'OFL-1.0', 'OFL-1.1', 'OLDAP-2.8',
+    'OpenSSL', 'OSL-3.0', 'PHP-3.0', 'PHP-3.01', 'PostgreSQL', 'PSF-2.0', 'Python-2.0',
+    'QPL-1.0', 'Ruby', 'SGI-B-2.0', 'Sleepycat', 'SMLNJ', 'SSPL-1.0', 'TCL', 'Unicode-3.0',
+    'Unicode-DFS-2016', 'Unlicense', 'UPL-1.0', 'Vim', 'W3C', 'WTFPL', 'X11', 'XFree86-1.1',
+    'Zlib', 'zlib-acknowledgement', 'ZPL-2.0', 'ZPL-2.1',
+]}
+
+# SPDX exception identifiers for the right hand side of WITH
+SPDX_EXCEPTIONS = {eid.lower(): eid for eid in [
+    'Autoconf-exception-2.0', 'Autoconf-exception-3.0', 'Bison-exception-2.2',
+    'Classpath-exception-2.0', 'Font-exception-2.0', 'GCC-exception-2.0', 'GCC-exception-3.1',
+    'LLVM-exception', 'Linux-syscall-note', 'OpenSSL-exception', 'Qt-LGPL-exception-1.1',
+    'Universal-FOSS-exception-1.0', 'WxWindows-exception-3.1',
+]}
+
+# Legacy Fedora/RHEL and Arch short names and deprecated SPDX ids, lower case.
+# Unversioned names mean "any version" and map to the oldest -or-later id.
+LEGACY_LICENSES = {
+    'gpl': 'GPL-1.0-or-later',
+    'gpl+': 'GPL-1.0-or-later',
+    'gplv1': 'GPL-1.0-only',
+    'gplv2': 'GPL-2.0-only',
+    'gplv2+': 'GPL-2.0-or-later',
+    'gplv3': 'GPL-3.0-only',
+    'gplv3+': 'GPL-3.0-or-later',
+    'gpl2': 'GPL-2.0-only',
+    'gpl2+': 'GPL-2.0-or-later',
+    'gpl3': 'GPL-3.0-only',
+    'gpl3+': 'GPL-3.0-or-later',
+    'gpl-2.0': 'GPL-2.0-only',
+    'gpl-2.0+': 'GPL-2.0-or-later',
+    'gpl-3.0': 'GPL-3.0-only',
+    'gpl-3.0+': 'GPL-3.0-or-later',
+    'lgpl': 'LGPL-2.0-or-later',
+    'lgplv2': 'LGPL-2.0-only',
+    'lgplv2+': 'LGPL-2.0-or-later',
+    'lgplv2.1': 'LGPL-2.1-only',
+    'lgplv2.1+': 'LGPL-2.1-or-later',
+    'lgplv3': 'LGPL-3.0-only',
+    'lgplv3+': 'LGPL-3.0-or-later',
+    'lgpl2.1': 'LGPL-2.1-only',
+    'lgpl2.1+': 'LGPL-2.1-or-later',
+    'lgpl-2.0': 'LGPL-2.0-only',
+    'lgpl-2.0+': 'LGPL-2.0-or-later',
+    'lgpl-2.1': 'LGPL-2.1-only',
+    'lgpl-2.1+': 'LGPL-2.1-or-later',
+    'lgpl-3.0': 'LGPL-3.0-only',
+    'lgpl-3.0+': 'LGPL-3.0-or-later',
+    'agplv3': 'AGPL-3.0-only',
+    'agplv3+': 'AGPL-3.0-or-later',
+    'agpl-3.0': 'AGPL-3.0-only',
+    'agpl-3.0+': 'AGPL-3.0-or-later',
+    'gfdl': 'GFDL-1.1-or-later',
+    'fdl': 'GFDL-1.1-or-later',
+    'gfdl-1.3': 'GFDL-1.3-only',
+    'asl 1.1': 'Apache-1.1',
+    'asl 2.0': 'Apache-2.0',
+    'asl-2.0': 'Apache-2.0',
+    'apache 2.0': 'Apache-2.0',
+    'apache-2': 'Apache-2.0',
+    'apache2': 'Apache-2.0',
+    'apache': 'Apache-2.0',
+    'mplv1.0': 'MPL-1.0',
+    'mplv1.1': 'MPL-1.1',
+    'mplv2.0': 'MPL-2.0',
+    'mpl': 'MPL-2.0',
+    'bsd': 'BSD-3-Clause',
+    'bsd with advertising': 'BSD-4-Clause',
+    'bsd-3': 'BSD-3-Clause',
+    'bsd-2': 'BSD-2-Clause',
+    'boost': 'BSL-1.0',
+    'zlib': 'Zlib',
+    'openssl': 'OpenSSL',
+    'python': 'Python-2.0',
+    'psfl': 'PSF-2.0',
+    'psf': 'PSF-2.0',
+    'zpl': 'ZPL-2.1',
+    'ofl': 'OFL-1.1',
+    'artistic': 'Artistic-1.0',
+    'artistic clarified': 'ClArtistic',
+    'perlartistic': 'Artistic-1.0-Perl',
+    'artistic 2.0': 'Artistic-2.0',
+    'artistic2.0': 'Artistic-2.0',
+    'cc0': 'CC0-1.0',
+    'epl': 'EPL-1.0',
+    'epl-1.0': 'EPL-1.0',
+    'cddl': 'CDDL-1.0',
+    'ucd': 'Unicode-DFS-2016',
+    'ijg': 'IJG',
+    'isc': 'ISC',
+    'mit': 'MIT',
+    'wtfpl': 'WTFPL',
+    'vim': 'Vim',
+    'ruby': 'Ruby',
+    'php': 'PHP-3.01',
+    'tcl': 'TCL',
+    'postgresql': 'PostgreSQL',
+    'sleepycat': 'Sleepycat',
+    'unlicense': 'Unlicense',
+    'public domain': 'LicenseRef-Public-Domain',
+    'copyright only': 'LicenseRef-Copyright-Only',
+}
+
+
+def _gnu_legacy_names() -> Dict[str, str]:
+    """Spellings of versioned GNU licenses: gpl2, gplv2, gpl-2, gpl-2.0, each also with "+"."""
+    names = {}
+    for family in ('gpl', 'lgpl', 'agpl'):
+        for license_id in SPDX_LICENSES.values():
+            match = re.fullmatch(rf'{family}-(\d+\.\d+)-only', license_id, re.IGNORECASE)
+            if not match:
+                continue
+            version = match.group(1)
+            or_later = SPDX_LICENSES.get(f"{family}-{version}-or-later")
+            for spelling in {version, version[:-2] if version.endswith('.0') else version}:
+                for separator in ('', 'v', '-'):
+                    names[f"{family}{separator}{spelling}"] = license_id
+                    if or_later:
+                        names[f"{family}{separator}{spelling}+"] = or_later
+    return names
+
+
+for _name, _license_id in _gnu_legacy_names().items():
+    LEGACY_LICENSES.setdefault(_name, _license_id)
+
+_OPERATORS = {'and': 'AND', '&': 'AND', '&&': 'AND', ',': 'AND', ';': 'AND',
+              'or': 'OR', '|': 'OR', '||': 'OR', 'with': 'WITH'}
+_OR_LATER = re.compile(r'\s*,?\s+or\s+(?:any\s+)?later(?:\s+version)?\b', re.IGNORECASE)
+# Operator words only count as whole words, so "GPL-2.0-or-later" stays one term
+_TOKEN_SPLIT = re.compile(r'\s*(\(|\)|&&|\|\||[&|,;]|(?<![\w.+-])(?:and|or|with)(?![\w.+-]))\s*', re.IGNORECASE)
+# License names written out ("GNU Lesser General Public License, version 2.1")
+# are reduced to a short name ("lgpl-2.1") that has to match exactly
+_NAME_PHRASES = [
+    (re.compile(r'\baffero\s+general\s+public\b'), 'agpl'),
+    (re.compile(r'\b(?:lesser|library)\s+general\s+public\b'), 'lgpl'),
+    (re.compile(r'\bgeneral\s+public\b'), 'gpl'),
+    (re.compile(r'\bfree\s+documentation\b'), 'gfdl'),
+    (re.compile(r'\bmozilla\s+public\b'), 'mpl'),
+    (re.compile(r'\beclipse\s+public\b'), 'epl'),
+]
+_FILLER_WORDS = {'gnu', 'the', 'license', 'licence', 'licensed', 'version', 'software'}
+_VERSION_WORD = re.compile(r'v\d+(?:\.\d+)*\+?$')
+# Characters an SPDX LicenseRef-<idstring> may not contain
+_REF_INVALID = re.compile(r'[^A-Za-z0-9.-]+')
+
+
+def _license_ref(term: str) -> str:
+    """Turn a name that is no SPDX id into a LicenseRef, e.g. custom:BSD -> LicenseRef-custom-BSD."""
+    return 'LicenseRef-' + (_REF_INVALID.sub('-', term.replace('+', '-plus')).strip('-') or 'Unknown')
+
+
+def _short_name(term: str) -> str:
+    """Reduce a written out license name to a short name, e.g. "Apache License, Version 2.0" -> "apache-2.0"."""
+    text = term.lower().replace(',', ' ')
+    for pattern, short in _NAME_PHRASES:
+        text = pattern.sub(short, text)
+    words = [word for word in text.split() if word not in _FILLER_WORDS]
+    return '-'.join(word[1:] if _VERSION_WORD.match(word) else word for word in words)
+
+
+class SPDXNormalizer:
+    """Turns distro license strings into SPDX license expressions."""
+
+    def __init__(self, cache_size: int = 65536):
+        """
+        Args:
+            cache_size: Maximum number of normalized strings remembered between calls
+        """
+        self.cache_size = cache_size
+        self._cache: Dict[str, str] = {}
+
+    def normalize(self, license_str: str) -> str:
+        """
+        Normalize a license string to an SPDX expression.
+
+        Legacy short names (GPLv2+, ASL 2.0, ...) and written out names
+        (Apache License, Version 2.0) are mapped to SPDX ids, the and/or/with
+        operators and parentheses are kept as AND/OR/WITH, and duplicate
+        operands are dropped. Only exact matches are mapped: any other term
+        (Arch custom:*, WITH clauses that are no SPDX exception) becomes a
+        LicenseRef-, and so does the whole string when it does not parse,
+        so the result is always a valid SPDX expression.
+
+        Args:
+            license_str: License string as published by the distribution
+
+        Returns:
+            SPDX license expression, or '' for an empty input
+        """
+        if not license_str:
+            return ''
+        result = self._cache.get(license_str)
+        if result is None:
+            result = self._normalize(license_str)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[license_str] = result
+        return result
+
+    def normalize_many(self, license_strs: Iterable[str]) -> Dict[str, str]:
+        """
+        Normalize a batch of license strings, each distinct string only once.
+
+        Args:
+            license_strs: License strings, typically one per package
+
+        Returns:
+            Dictionary mapping each distinct input string to its SPDX expression
+        """
+        return {license_str: self.normalize(license_str) for license_str in dict.fromkeys(license_strs)}
+
+    def normalize_term(self, term: str) -> str:
+        """
+        Map a single license name to its SPDX identifier.
+
+        Args:
+            term: One license name without operators
+
+        Returns:
+            SPDX identifier (or AND of identifiers), or a LicenseRef- for an unknown name
+        """
+        return self._resolve(term) or _license_ref(term.strip())
+
+    def _resolve(self, term: str) -> Optional[str]:
+        term = term.strip()
+        known = self._lookup(term)
+        if known:
+            return known
+        words = term.replace(',', ' ').split()
+        if len(words) > 1:
+            short_name = _short_name(term)
+            known = SPDX_LICENSES.get(short_name) or LEGACY_LICENSES.get(short_name)
+            if known:
+                return known
+            # "GPL-2.0-or-later LGPL-2.1-or-later" (space separated lists, as in
+            # Alpine and Arch metadata) are combined with AND
+            ids = [self._lookup(word) for word in words]
+            if all(ids):
+                return ' AND '.join(dict.fromkeys(ids))
+        return None
+
+    def _lookup(self, term: str) -> Optional[str]:
+        key = term.lower()
+        if key.startswith('licenseref-'):
+            return term
+        if key.startswith('custom') and ' ' not in key:  # Arch "custom" / "custom:<name>"
+            return _license_ref(term)
+        return SPDX_LICENSES.get(key) or LEGACY_LICENSES.get(key)
+
+    def _normalize(self, license_str: str) -> str:
+        # "GPLv2 or later" is a single term, not an OR
+        text = _OR_LATER.sub('+', license_str)
+        tokens = self._join_commas([token for token in _TOKEN_SPLIT.split(text) if token and not token.isspace()])
+        # Dangling operators ("MIT and", "GPL-2.0-or-later OR ") join nothing
+        while tokens and tokens[-1].lower() in _OPERATORS:
+            tokens.pop()
+        while tokens and tokens[0].lower() in _OPERATORS:
+            tokens.pop(0)
+        parser = _ExpressionParser(tokens)
+        try:
+            tree = parser.parse()
+        except ValueError:
+            return _license_ref(license_str.strip())
+        return self._render(tree, top_level=True)
+
+    def _join_commas(self, tokens: List[str]) -> List[str]:
+        # A comma lists licenses only between two known names ("MIT, BSD");
+        # in "Apache License, Version 2.0" it is part of the name
+        joined: List[str] = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token == ',':
+                previous = joined[-1] if joined else None
+                following = tokens[i + 1] if i + 1 < len(tokens) else None
+                if not _is_term(previous) or not _is_term(following):
+                    i += 1
+                    continue
+                if not (self._resolve(previous) and self._resolve(following)):
+                    joined[-1] = f"{previous}, {following}"
+                    i += 2
+                    continue
+            joined.append(token)
+            i += 1
+        return joined
+
+    def _render(self, node: Union[str, tuple], top_level: bool = False) -> str:
+        if isinstance(node, str):
+            return self.normalize_term(node)
+
+        operator, operands = node
+        if operator == 'WITH':
+            exception = operands[1].strip()
+            # Legacy names such as "BSD with advertising" are one license
+            if isinstance(operands[0], str):
+                known = self._lookup(f"{operands[0].strip()} with {exception}")
+                if known:
+                    return known
+            license_id = self._render(operands[0])
+            if ' ' in license_id:
+                license_id = f"({license_id})"
+            exception_id = SPDX_EXCEPTIONS.get(exception.lower())
+            if exception_id:
+                return f"{license_id} WITH {exception_id}"
+            # Not an SPDX exception ("LGPLv2+ with exceptions"): keep it as a reference of its own
+            return f"{license_id} AND {_license_ref(exception)}"
+
+        rendered: List[str] = []
+        for operand in operands:
+            text = self._render(operand)
+            # Keep nested groups explicit, e.g. "MIT AND (BSD-3-Clause OR ISC)"
+            if isinstance(operand, tuple) and (operand[0] != 'WITH' or ' WITH ' not in text):
+                text = f"({text})"
+            if text not in rendered:
+                rendered.append(text)
+        return f" {operator} ".join(rendered)
+
+
+def _is_term(token: Optional[str]) -> bool:
+    return token is not None and token not in '()' and token.lower() not in _OPERATORS
+
+
+class _ExpressionParser:
+    """Recursive descent parser: or-expr := and-expr (OR and-expr)*, and so on."""
+
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse(self) -> Union[str, tuple]:
+        if not self.tokens:
+            raise ValueError("empty license expression")
+        node = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"unexpected token {self.tokens[self.pos]!r}")
+        return node
+
+    def _peek_operator(self) -> Optional[str]:
+        if self.pos < len(self.tokens):
+            return _OPERATORS.get(self.tokens[self.pos].lower())
+        return None
+
+    def _parse_or(self):
+        operands = [self._parse_and()]
+        while self._peek_operator() == 'OR':
+            self.pos += 1
+            operands.append(self._parse_and())
+        return operands[0] if len(operands) == 1 else ('OR', operands)
+
+    def _parse_and(self):
+        operands = [self._parse_with()]
+        while self._peek_operator() == 'AND':
+            self.pos += 1
+            operands.append(self._parse_with())
+        return operands[0] if len(operands) == 1 else ('AND', operands)
+
+    def _parse_with(self):
+        node = self._parse_atom()
+        if self._peek_operator() == 'WITH':
+            self.pos += 1
+            if self.pos >= len(self.tokens) or self._peek_operator() or self.tokens[self.pos] in '()':
+                raise ValueError("WITH without an exception")
+            node = ('WITH', [node, self.tokens[self.pos]])
+            self.pos += 1
+        return node
+
+    def _parse_atom(self):
+        if self.pos >= len(self.tokens):
+            raise ValueError("unexpected end of license expression")
+        token = self.tokens[self.pos]
+        if token == '(':
+            self.pos += 1
+            node = self._parse_or()
+            if self.pos >= len(self.tokens) or self.tokens[self.pos] != ')':
+                raise ValueError("unbalanced parentheses")
+            self.pos += 1
+            return node
+        if token == ')' or self._peek_operator():
+            raise ValueError(f"unexpected token {token!r}")
+        self.pos += 1
+        return token
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import mmap
+import re
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Union
+
+from .compression import detect_compression, open_decompressed
+
+CHUNK_SIZE = 1 << 20
+
+# A field value runs to the end of its line plus any continuation lines
+_VALUE = rb'([^\n]*(?:\n[ \t][^\n]*)*)'
+_ANY_FIELD = rb'[^ \t\n:][^\n:]*'
+
+
+class StanzaParser:
+    """Byte-level parser for deb822 style stanzas (Debian/Ubuntu Packages files)."""
+
+    def __init__(self, fields: Optional[Iterable[str]] = None, encoding: str = 'utf-8'):
+        """
+        Args:
+            fields: Field names to extract; every field is extracted if None
+            encoding: Encoding of the field values (undecodable bytes are dropped)
+        """
+        self.encoding = encoding
+        self.fields = tuple(dict.fromkeys(fields)) if fields is not None else None
+
+        if self.fields is None:
+            self._names = {}
+            names = _ANY_FIELD
+            first = b''
+        else:
+            self._names = {field.encode(encoding): field for field in self.fields}
+            names = b'|'.join(re.escape(key) for key in self._names)
+            # Cheap first-byte check that rejects most lines before the alternation
+            first = b'(?=[\n' + re.escape(bytes(sorted({key[0] for key in self._names}))) + b'])'
+        # Every match starts at a newline and is either a stanza separator (the
+        # lookahead sees a blank line) or one of the wanted fields, so a whole
+        # chunk is tokenised by a single findall and unwanted fields are never
+        # materialised.
+        self._pattern = re.compile(rb'\n' + first + rb'(?:(?=(\n))|(' + names + rb'):' + _VALUE + rb')')
+
+    def iter_stanzas(self, source: Union[str, Path, BinaryIO], name: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """
+        Yield one dictionary per stanza of a Packages file.
+
+        Uncompressed files are memory mapped; gzip, xz, bz2 and zstd files (or
+        file objects) are decompressed on the fly and read in chunks.
+
+        Args:
+            source: Path to a Packages[.gz|.xz|...] file or a binary file object
+            name: File name or URL used to detect the compression of a file object
+
+        Returns:
+            Iterator of field name to value dictionaries
+        """
+        if isinstance(source, (str, Path)):
+            path = Path(source)
+            with open(path, 'rb') as f:
+                if not detect_compression(name or path.name, f.read(8)):
+                    if path.stat().st_size == 0:
+                        return
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        yield from self.iter_buffer(mm)
+                    return
+
+        stream = open_decompressed(source, name)
+        try:
+            for chunk in self._iter_chunks(stream):
+                yield from self._parse_chunk(chunk)
+        finally:
+            if stream is not source:
+                stream.close()
+
+    def iter_buffer(self, data: Union[bytes, mmap.mmap]) -> Iterator[Dict[str, str]]:
+        """
+        Yield one dictionary per stanza of an in-memory or memory mapped buffer.
+
+        Args:
+            data: Uncompressed Packages content
+
+        Returns:
+            Iterator of field name to value dictionaries
+        """
+        size = len(data)
+        pos = 0
+        while pos < size:
+            end = data.find(b'\n\n', pos + CHUNK_SIZE) if pos + CHUNK_SIZE < size else -1
+            end = size if end < 0 else end
+            yield from self._parse_chunk(data[pos:end])
+            pos = end + 1
+
+    def parse_stanza(self, block: bytes) -> Dict[str, str]:
+        """
+        Parse a single stanza.
+
+        Continuation lines are joined to their field with newlines, and field
+        values are stripped of surrounding whitespace.
+
+        Args:
+            block: Raw stanza bytes
+
+        Returns:
+            Dictionary of the requested (or all) fields present in the stanza
+        """
+        record = {}
+        for record in self._parse_chunk(block):
+            break
+        return record
+
+    def _parse_chunk(self, chunk: bytes) -> Iterator[Dict[str, str]]:
+        """Parse a run of whole stanzas."""
+        encoding = self.encoding
+        names = self._names
+        record = {}
+        for separator, field, value in self._pattern.findall(b'\n' + chunk):
+            if separator:
+                if record:
+                    yield record
+                    record = {}
+                continue
+            if b'\n' in value:
+                value = '\n'.join(line.decode(encoding, 'ignore').strip() for line in value.split(b'\n'))
+            else:
+                value = value.decode(encoding, 'ignore').strip()
+            record[names.get(field) or field.decode(encoding, 'ignore').strip()] = value
+        if record:
+            yield record
+
+    @staticmethod
+    def _iter_chunks(stream: BinaryIO) -> Iterator[bytes]:
+        """Read a stream in chunks that always end on a stanza boundary."""
+        rest = b''
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = rest + chunk
+            cut = data.rfind(b'\n\n')
+            if cut < 0:
+                rest = data
+                continue
+            yield data[:cut]
+            rest = data[cut + 1:]
+        if rest:
+            yield rest
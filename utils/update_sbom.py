@@ -2,17 +2,86 @@ import json
 import csv
 import argparse
 import os
+import sys
+from collections import Counter
+from pathlib import Path
 
 # Cyclonedx library
 from typing import TYPE_CHECKING
 
 from packageurl import PackageURL
 from cyclonedx.builder.this import this_component as cdx_lib_component
+from cyclonedx.model import HashAlgorithm
 from cyclonedx.model.bom import Bom
 from cyclonedx.output import make_outputter
 from cyclonedx.schema import OutputFormat, SchemaVersion
 
-matches=0
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.hash_index import HashIndex, HashIndexBuilder
+from utils.catalog import Catalog, DEFAULT_CATALOG
+
+def build_hash_index(csv_paths: list[str]) -> dict[str, tuple[str, str]]:
+    """
+    Build a single sha256 -> (purl, distro) index from the given CSV files.
+
+    Every CSV is read exactly once. When the same hash appears in several
+    rows the last one wins, matching the previous row-by-row behaviour.
+
+    Args:
+    - csv_paths (list[str]): Paths to parser output CSV files.
+
+    Returns:
+    - dict[str, tuple[str, str]]: Mapping of lowercase sha256 to (purl, distro).
+    """
+    index = {}
+    for path in csv_paths:
+        distro = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        with open(path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                sha256 = (row.get('sha256') or '').strip().lower()
+                purl = row.get('purl') or ''
+                if sha256 and purl:
+                    index[sha256] = (purl, distro)
+    return index
+
+
+def resolve_purls(sbom: Bom, lookup) -> dict:
+    """
+    Set the PURL of every SBOM component whose SHA-256 is in the index.
+
+    Each component costs one lookup per SHA-256 hash it carries, so the
+    enrichment is linear in the size of the SBOM.
+
+    Args:
+    - sbom (Bom): The CycloneDX SBOM to update.
+    - lookup: Callable mapping a lowercase sha256 to (purl, distro) or None,
+      e.g. the .get of a dict from build_hash_index, HashIndex.purl_for or Catalog.purl_for.
+
+    Returns:
+    - dict: Match statistics with 'matched' (per distro), 'unmatched' and 'no_sha256' counts.
+    """
+    stats = {'matched': Counter(), 'unmatched': 0, 'no_sha256': 0}
+
+    for component in sbom.components:
+        sha256_values = [h.content.lower() for h in component.hashes
+                         if h.alg == HashAlgorithm.SHA_256 and h.content]
+        if not sha256_values:
+            stats['no_sha256'] += 1
+            continue
+
+        for hash_value in sha256_values:
+            entry = lookup(hash_value)
+            if entry is not None:
+                purl, distro = entry
+                component.purl = PackageURL.from_string(purl)
+                stats['matched'][distro] += 1
+                break
+        else:
+            stats['unmatched'] += 1
+
+    return stats
+
 
 def update_purl(sbom: Bom, csv_data: list[dict]) -> Bom:
     """
@@ -25,27 +94,9 @@ def update_purl(sbom: Bom, csv_data: list[dict]) -> Bom:
     Returns:
     - Bom: The updated SBOM.
     """
-    global matches
-
-    for component in sbom.components:
-        # Get the package name and version
-        package_name = component.name
-        package_hashes = component.hashes
-
-        for row in csv_data:
-            # print(f"row {row} ")
-            for hash in package_hashes:
-                if hash.alg == 'SHA-256':
-
-                    # if hash.content:
-                        # print(hash.content)
-                    hash_value = hash.content
-                    # print(f"package hash: {hash_value}")
-                    if hash_value == row['sha256']:
-                        component.purl = PackageURL.from_string(row['purl'])
-                        matches += 1
-                        print(f"Found matching hash for: {hash_value}")
-
+    index = {row['sha256'].lower(): (row['purl'], 'csv')
+             for row in csv_data if row.get('sha256') and row.get('purl')}
+    resolve_purls(sbom, index.get)
     return sbom
 
 
@@ -170,20 +221,44 @@ def save_sbom(sbom: Bom, file_path: str) -> None:
     with open(file_path, 'w') as file:
         file.write(sorted_json_string)
 
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent.parent / 'output'
+
+DISTRO_CSV_FILES = {
+    'ubuntu': 'output/ubuntu/ubuntu_packages.csv',
+    'debian': 'output/debian/debian_packages.csv',
+    'fedora': 'output/fedora/fedora_packages.csv',
+    'rocky': 'output/rocky/rocky_packages.csv',
+    'centos': 'output/centos/centos_packages.csv',
+    'arch': 'output/arch/arch_packages.csv',
+    'alpine': 'output/alpine/alpine_packages.csv',
+}
+
 def main() -> None:
     parser = argparse.ArgumentParser(description='Update PURL in SBOM using CSV data')
     parser.add_argument('--sbom', help='Users sbom', required=True)
     parser.add_argument('-a', '--all', action='store_true', help='Use all csv files to find matching has')
     parser.add_argument('-d', '--distro', help='Pick from a distro specific of csv')
     parser.add_argument('-v', '--version', help='Pick an explicit file with its path')
+    parser.add_argument('-i', '--index', nargs='?', const='',
+                        help='Use the persistent sha256 index (default: <output-dir>/index), updating it first')
+    parser.add_argument('--output-dir', default=str(DEFAULT_OUTPUT_DIR),
+                        help=f'Parser output directory the index is built from (default: {DEFAULT_OUTPUT_DIR})')
+    parser.add_argument('-c', '--catalog', nargs='?', const=str(DEFAULT_CATALOG),
+                        help=f'Query the SQLite package catalog (default: {DEFAULT_CATALOG})')
 
     parser.add_argument('-o', '--output', default='updated_sbom.json', help='Path to output SBOM file')
     args = parser.parse_args()
 
+    if (args.catalog or args.index is not None) and args.version:
+        parser.error("-v/--version picks a CSV file and cannot be combined with --index or --catalog")
+    if args.distro and args.distro not in DISTRO_CSV_FILES:
+        parser.error(f"Unknown distro '{args.distro}', choose from {sorted(DISTRO_CSV_FILES)}")
+
     # Load the SBOM
     sbom = load_sbom(args.sbom)
 
-    # Load the CSV data
+    # Collect every CSV that should feed the index
+    csv_paths = []
     if args.all:
         # Define all paths to check
         paths_to_check = [
@@ -198,59 +273,43 @@ def main() -> None:
 
         for path in paths_to_check:
             if os.path.isfile(path):
-                # print(f"Loading CSV data from file: {path}")
-                for chunk in load_csv_data_in_chunks(path):
-                    # print(f"Loaded {len(chunk)} rows from file: {path}")
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
+                csv_paths.append(path)
             elif os.path.isdir(path):
-                # print(f"Loading CSV data from directory: {path}")
-                for file in os.listdir(path):
+                for file in sorted(os.listdir(path)):
                     if file.endswith('.csv'):
-                        # print(f"Loading CSV data from file: {os.path.join(path, file)}")
-                        for chunk in load_csv_data_in_chunks(os.path.join(path, file)):
-                            # print(f"Loaded {len(chunk)} rows from file: {os.path.join(path, file)}")
-                            updated_sbom = update_purl(sbom, chunk)
-                            sbom = updated_sbom
+                        csv_paths.append(os.path.join(path, file))
     elif args.distro:
-        match args.distro:
-            case 'ubuntu':
-                for chunk in load_csv_data_in_chunks('output/ubuntu/ubuntu_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
-            case 'debian':
-                for chunk in load_csv_data_in_chunks('output/debian/debian_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
-            case 'fedora':
-                for chunk in load_csv_data_in_chunks('output/fedora/fedora_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
-            case 'rocky':
-                for chunk in load_csv_data_in_chunks('output/rocky/rocky_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
-            case 'centos':
-                for chunk in load_csv_data_in_chunks('output/centos/centos_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
-            case 'arch':
-                for chunk in load_csv_data_in_chunks('output/arch/arch_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
-            case 'alpine':
-                for chunk in load_csv_data_in_chunks('output/alpine/alpine_packages.csv'):
-                    updated_sbom = update_purl(sbom, chunk)
-                    sbom = updated_sbom
+        csv_paths.append(DISTRO_CSV_FILES[args.distro])
     elif args.version:
-        for chunk in load_csv_data_in_chunks(args.version):
-            updated_sbom = update_purl(sbom, chunk)
-            sbom = updated_sbom
+        csv_paths.append(args.version)
+
+    # -d restricts the index and catalog lookups to one distro, -a (the default) uses them all
+    distro = None if args.all else args.distro
+
+    if args.catalog:
+        # The catalog already holds every loaded distro, indexed on sha256
+        with Catalog(Path(args.catalog), readonly=True) as catalog:
+            stats = resolve_purls(sbom, lambda sha256: catalog.purl_for(sha256, distro))
+    elif args.index is not None:
+        # Bring the on-disk index up to date (only rewritten CSVs are recompiled) and query it
+        output_dir = Path(args.output_dir)
+        index_dir = Path(args.index) if args.index else output_dir / 'index'
+        HashIndexBuilder(output_dir, index_dir).build()
+        with HashIndex(index_dir) as index:
+            stats = resolve_purls(sbom, lambda sha256: index.purl_for(sha256, distro))
+    else:
+        # Build the sha256 -> purl index once and resolve every component against it
+        index = build_hash_index(csv_paths)
+        print(f"Indexed {len(index)} hashes from {len(csv_paths)} CSV files")
+        stats = resolve_purls(sbom, index.get)
 
     # Save the updated SBOM
     save_sbom(sbom, args.output)
 
-    print(f"Found {matches} matches")
+    for distro, count in sorted(stats['matched'].items()):
+        print(f"  {distro}: {count} matched")
+    print(f"Found {sum(stats['matched'].values())} matches, "
+          f"{stats['unmatched']} unmatched, {stats['no_sha256']} without SHA-256")
 
 
 if __name__ == '__main__':
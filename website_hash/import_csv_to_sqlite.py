@@ -1,34 +1,22 @@
 # import_one_csv.py
-import csv, sqlite3, pathlib, sys
+import pathlib, sys
 
-def import_csv(csv_path: pathlib.Path, db_path: pathlib.Path):
-    cols = ["name", "version", "sha256", "file", "url"]
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("DROP TABLE IF EXISTS files")
-    cur.execute(f"CREATE TABLE files ({', '.join(c+' TEXT' for c in cols)})")
-    # create the same indexes as before
-    for c in cols:
-        cur.execute(f"CREATE INDEX idx_{c} ON files({c})")
-    conn.commit()
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+from utils.catalog import Catalog, csv_distro
 
-    batch = []
-    batch_sz = 10_000
-    with csv_path.open(newline="", encoding="utf-8") as f:
-        rdr = csv.DictReader(f)
-        for i, row in enumerate(rdr, 1):
-            batch.append(tuple(row[c] for c in cols))
-            if len(batch) >= batch_sz:
-                cur.executemany(f"INSERT INTO files VALUES ({','.join('?'*len(cols))})", batch)
-                conn.commit()
-                batch.clear()
-                print(f"\r{csv_path.name}: {i:,} rows imported …", end="")
-        if batch:
-            cur.executemany(f"INSERT INTO files VALUES ({','.join('?'*len(cols))})", batch)
-            conn.commit()
-    print(f"\n✅ {csv_path.name} → {db_path}")
+def import_csv(csv_path: pathlib.Path, db_path: pathlib.Path, distro: str = None):
+    # Rows land in the normalized catalog (archives + files, or packages for
+    # parser CSVs); indexes are built once after the load, not per row
+    # Without a distro the CSV has to sit in output/<distro>/ or <distro>/output/
+    distro = distro or csv_distro(csv_path)
+    with Catalog(db_path) as catalog:
+        count = catalog.import_csv(csv_path, distro)
+    print(f"✅ {csv_path.name}: {count:,} rows → {db_path}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        sys.exit("Usage: python import_one_csv.py <csv_path> <db_path>")
-    import_csv(pathlib.Path(sys.argv[1]), pathlib.Path(sys.argv[2]))
\ No newline at end of file
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python import_one_csv.py <csv_path> <db_path> [distro]")
+    try:
+        import_csv(pathlib.Path(sys.argv[1]), pathlib.Path(sys.argv[2]), sys.argv[3] if len(sys.argv) == 4 else None)
+    except ValueError as e:
+        sys.exit(str(e))
@@ -8,11 +8,22 @@ document.addEventListener("DOMContentLoaded", () => {
     const sourceSelect = document.getElementById("sourceSelect");
 
     // -----------------------------------------------------------------
-    // Pagination state
+    // Pagination state – the API pages with opaque cursors, so we keep
+    // the cursor of every page visited to be able to go back
     // -----------------------------------------------------------------
     let currentPage = 1;
     const pageSize = 50;               // must match backend DEFAULT_LIMIT
     let totalRows = 0;
+    let totalExact = true;
+    let cursors = [""];                // cursors[i] fetches page i + 1
+    let nextCursor = null;
+    let exactCount = false;            // ask the API for an exact total
+
+    function resetPaging() {
+        currentPage = 1;
+        cursors = [""];
+        exactCount = false;
+    }
 
     // -----------------------------------------------------------------
     // Sorting state
@@ -27,10 +38,11 @@ document.addEventListener("DOMContentLoaded", () => {
             q: searchBox.value.trim(),
             sort_by: currentSort.col,
             order: currentSort.order,
-            page: currentPage,
             limit: pageSize
         });
         params.append("source", sourceSelect.value);
+        if (cursors[currentPage - 1]) params.append("after", cursors[currentPage - 1]);
+        if (exactCount) params.append("exact", "1");
 
 
         const resp = await fetch(`/api/search?${params}`);
@@ -40,6 +52,8 @@ document.addEventListener("DOMContentLoaded", () => {
         }
         const data = await resp.json();   // <-- new shape
         totalRows = data.total;
+        totalExact = data.total_exact;
+        nextCursor = data.next;
         renderRows(data.results);
         renderPager();
         
@@ -74,12 +88,15 @@ document.addEventListener("DOMContentLoaded", () => {
     // Pagination UI
     // -----------------------------------------------------------------
     function renderPager() {
-        const totalPages = Math.ceil(totalRows / pageSize);
+        const totalPages = Math.max(Math.ceil(totalRows / pageSize), 1);
+        const totalText = totalExact
+            ? `${totalRows}`
+            : `${totalRows.toLocaleString()}+ <button id="countBtn">Count all</button>`;
         pagerDiv.innerHTML = `
-            Page ${currentPage} of ${totalPages}
+            Page ${currentPage}${totalExact ? ` of ${totalPages}` : ""}
             <button ${currentPage===1 ? "disabled" : ""} id="prevBtn">Prev</button>
-            <button ${currentPage===totalPages ? "disabled" : ""} id="nextBtn">Next</button>
-            (Total rows: ${totalRows})
+            <button ${nextCursor ? "" : "disabled"} id="nextBtn">Next</button>
+            (Total rows: ${totalText})
         `;
 
         document.getElementById("prevBtn").onclick = () => {
@@ -89,26 +106,38 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         };
         document.getElementById("nextBtn").onclick = () => {
-            if (currentPage < totalPages) {
+            if (nextCursor) {
+                cursors[currentPage] = nextCursor;
                 currentPage++;
                 fetchData();
             }
         };
+        const countBtn = document.getElementById("countBtn");
+        if (countBtn) {
+            countBtn.onclick = () => {
+                exactCount = true;
+                fetchData();
+            };
+        }
     }
 
     // -----------------------------------------------------------------
     // Search button / Enter key
     // -----------------------------------------------------------------
     searchBtn.addEventListener("click", () => {
-        currentPage = 1;          // reset to first page on a new search
+        resetPaging();            // reset to first page on a new search
         fetchData();
     });
     searchBox.addEventListener("keypress", e => {
         if (e.key === "Enter") {
-            currentPage = 1;
+            resetPaging();
             fetchData();
         }
     });
+    sourceSelect.addEventListener("change", () => {
+        resetPaging();
+        fetchData();
+    });
 
     // -----------------------------------------------------------------
     // Column‑header sorting
@@ -127,7 +156,8 @@ document.addEventListener("DOMContentLoaded", () => {
             headers.forEach(h => h.classList.remove("sort-asc", "sort-desc"));
             th.classList.add(currentSort.order === "asc" ? "sort-asc" : "sort-desc");
 
-            // keep the same page (or reset to 1 if you prefer)
+            // cursors are tied to the sort order, so start from the first page
+            resetPaging();
             fetchData();
         });
     });
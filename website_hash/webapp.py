@@ -1,98 +1,208 @@
 # app_multi_sqlite.py
-import os, sqlite3
+import base64, json, os, re, sqlite3, sys, threading, time
+from collections import OrderedDict
+from urllib.parse import unquote
 from flask import Flask, jsonify, request, render_template, g, abort
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.catalog import Catalog, CatalogPool, DEFAULT_CATALOG
+
 app = Flask(__name__)
 
 # -----------------------------------------------------------------
-# Configuration – list every CSV‑derived DB you want to expose
+# Configuration – the catalog built by the parsers / hash pipeline
 # -----------------------------------------------------------------
-DB_FILES = {
-    "data1": "data1.db",
-    # "data2": "data2.db",
-    # add more: "name": "filename.db"
-}
+CATALOG_DB = os.environ.get("CATALOG_DB", str(DEFAULT_CATALOG))
 COLUMNS = ["name", "version", "sha256", "file", "url"]
-TABLE   = "files"
+TABLE   = "file_rows"          # view over files + archives + distros
+ALL_SOURCES = "all"
 DEFAULT_LIMIT = 50
+MAX_LIMIT     = 1000
+COUNT_LIMIT   = 10_000         # rows counted before a total is reported as "10,000+"
+COUNT_TTL     = 300            # seconds an exact total stays cached
+COUNT_CACHE_SIZE = 1024
+POOL_SIZE     = int(os.environ.get("CATALOG_POOL_SIZE", 8))   # 0 = open a connection per request
 
 # -----------------------------------------------------------------
-# Helper – open a connection and ATTACH all DBs once per request
+# Helper – borrow a pooled read-only connection for the request
 # -----------------------------------------------------------------
+POOL = CatalogPool(CATALOG_DB, POOL_SIZE) if POOL_SIZE > 0 else None
+
 def get_conn():
-    if "conn" not in g:
-        conn = sqlite3.connect(":memory:")          # in‑memory master DB
-        conn.row_factory = sqlite3.Row
-        # Attach each physical DB under its own schema name
-        for alias, path in DB_FILES.items():
-            conn.execute(f"ATTACH DATABASE '{os.path.abspath(path)}' AS {alias}")
-        g.conn = conn
-    return g.conn
+    if "catalog" not in g:
+        g.catalog = POOL.acquire() if POOL else Catalog(CATALOG_DB, readonly=True)
+        g.catalog.conn.row_factory = sqlite3.Row
+    return g.catalog.conn
+
+def get_sources():
+    rows = get_conn().execute("SELECT name FROM distros ORDER BY name").fetchall()
+    return [ALL_SOURCES] + [r["name"] for r in rows]
 
 @app.teardown_appcontext
 def close_conn(exc):
-    conn = g.pop("conn", None)
-    if conn:
-        conn.close()
+    catalog = g.pop("catalog", None)
+    if catalog is None:
+        return
+    if POOL:
+        POOL.release(catalog)
+    else:
+        catalog.close()
 
 # -----------------------------------------------------------------
-# Build WHERE clause (same as before)
+# Build WHERE clause – every branch is served by an index
 # -----------------------------------------------------------------
+SHA256_RE     = re.compile(r"[0-9a-f]{64}")
+SHA256_PREFIX = re.compile(r"[0-9a-f]{16,63}")
+MIN_FTS_TERM  = 3              # the trigram tokenizer needs 3+ characters
+
+def prefix_range(prefix):
+    """Return (low, high) so that low <= value < high matches every value starting with prefix."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def purl_clause(purl):
+    # pkg:type/namespace/name@version?qualifiers – match on name (and version prefix)
+    path = purl[len("pkg:"):].split("?", 1)[0].split("#", 1)[0]
+    if "/" not in path:
+        return "", ()
+    name, _, version = unquote(path.rsplit("/", 1)[-1]).partition("@")
+    if not name:
+        return "", ()
+    if not _:
+        return "WHERE name >= ? AND name < ?", prefix_range(name)
+    if not version:
+        return "WHERE name = ?", (name,)
+    return "WHERE name = ? AND version >= ? AND version < ?", (name, *prefix_range(version))
+
 def build_search_clause(term):
     if not term:
         return "", ()
-    term_like = f"%{term.lower()}%"
-    cond = " OR ".join([f"LOWER({c}) LIKE ?" for c in COLUMNS])
-    return f"WHERE {cond}", tuple(term_like for _ in COLUMNS)
+    if SHA256_RE.fullmatch(term):
+        return "WHERE sha256 = ?", (term,)
+    if SHA256_PREFIX.fullmatch(term):
+        return "WHERE sha256 >= ? AND sha256 < ?", prefix_range(term)
+    if term.startswith("pkg:"):
+        return purl_clause(term)
+    if len(term) < MIN_FTS_TERM:
+        return "WHERE name >= ? AND name < ?", prefix_range(term)
+    # Substring search through the trigram indexes on file paths and on
+    # archive name / version / url
+    phrase = '"' + term.replace('"', '""') + '"'
+    return ("WHERE id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ?)"
+            " OR archive_id IN (SELECT rowid FROM archives_fts WHERE archives_fts MATCH ?)"), (phrase, phrase)
+
+# -----------------------------------------------------------------
+# Pagination helpers – keyset cursors and cached / capped counts
+# -----------------------------------------------------------------
+def add_condition(where_sql, where_params, cond, cond_params):
+    if not where_sql:
+        return f"WHERE {cond}", tuple(cond_params)
+    return f"WHERE ({where_sql[len('WHERE '):]}) AND {cond}", (*where_params, *cond_params)
+
+def encode_cursor(sort_by, order, row):
+    # Opaque token holding the sort key and id of the last row of a page
+    raw = json.dumps([sort_by, order, row[sort_by], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token, sort_by, order):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_sort, cursor_order, value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        abort(400, "Invalid after cursor")
+    if (cursor_sort, cursor_order) != (sort_by, order):
+        abort(400, "after cursor belongs to a different sort order")
+    return value, row_id
+
+_count_cache = OrderedDict()       # (q, source) -> (expires, total)
+_count_lock  = threading.Lock()
+
+def count_rows(conn, where_sql, where_params, key, exact):
+    """
+    Return (total, is_exact). Exact totals are cached for COUNT_TTL seconds;
+    otherwise counting stops after COUNT_LIMIT rows unless exact is requested.
+    """
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            _count_cache.move_to_end(key)
+            return cached[1], True
+
+    if exact:
+        total = conn.execute(f"SELECT COUNT(*) FROM {TABLE} {where_sql}", where_params).fetchone()[0]
+    else:
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {TABLE} {where_sql} LIMIT ?)", (*where_params, COUNT_LIMIT + 1)
+        ).fetchone()[0]
+        if total > COUNT_LIMIT:
+            return COUNT_LIMIT, False
+
+    with _count_lock:
+        _count_cache[key] = (now + COUNT_TTL, total)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total, True
 
 # -----------------------------------------------------------------
-# API – now you can query any attached DB via a `source` param
+# API – `source` filters by distro, `after` continues from a cursor
 # -----------------------------------------------------------------
 @app.route("/api/search")
 def api_search():
     q       = request.args.get("q", "").strip().lower()
     sort_by = request.args.get("sort_by", "name")
     order   = request.args.get("order", "asc").lower()
-    page    = max(int(request.args.get("page", 1)), 1)
-    limit   = max(int(request.args.get("limit", DEFAULT_LIMIT)), 1)
-    source  = request.args.get("source", "data1")   # default DB
+    after   = request.args.get("after", "")
+    limit   = min(max(int(request.args.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    source  = request.args.get("source", ALL_SOURCES)   # distro filter
+    exact   = request.args.get("exact") == "1"
 
-    if source not in DB_FILES:
-        abort(400, f"Unknown source – choose from {list(DB_FILES)}")
+    sources = get_sources()
+    if source not in sources:
+        abort(400, f"Unknown source – choose from {sources}")
     if sort_by not in COLUMNS:
         abort(400, f"Invalid sort_by – choose from {COLUMNS}")
     if order not in ("asc", "desc"):
         abort(400, "order must be asc or desc")
 
-    offset = (page - 1) * limit
     where_sql, where_params = build_search_clause(q)
+    if source != ALL_SOURCES:
+        where_sql, where_params = add_condition(where_sql, where_params, "distro = ?", (source,))
+
+    # Keyset pagination: continue after the last (sort key, id) seen, so any
+    # page is an index range scan instead of skipping OFFSET rows
+    page_sql, page_params = where_sql, where_params
+    if after:
+        value, row_id = decode_cursor(after, sort_by, order)
+        op = ">" if order == "asc" else "<"
+        page_sql, page_params = add_condition(where_sql, where_params, f"({sort_by}, id) {op} (?, ?)",
+                                              (value, row_id))
 
     sql = f"""
-        SELECT {', '.join(COLUMNS)}
-        FROM {source}.{TABLE}
-        {where_sql}
-        ORDER BY {sort_by} {order.upper()}
-        LIMIT ? OFFSET ?
+        SELECT id, {', '.join(COLUMNS)}
+        FROM {TABLE}
+        {page_sql}
+        ORDER BY {sort_by} {order.upper()}, id {order.upper()}
+        LIMIT ?
     """
-    params = (*where_params, limit, offset)
 
     conn = get_conn()
-    rows = conn.execute(sql, params).fetchall()
-    total = conn.execute(
-        f"SELECT COUNT(*) FROM {source}.{TABLE} {where_sql}", where_params
-    ).fetchone()[0]
+    rows = [dict(r) for r in conn.execute(sql, (*page_params, limit + 1)).fetchall()]
+    next_cursor = encode_cursor(sort_by, order, rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    total, total_exact = count_rows(conn, where_sql, where_params, (q, source), exact)
 
     return jsonify({
         "source": source,
-        "page": page,
         "limit": limit,
         "total": total,
-        "results": [dict(r) for r in rows]
+        "total_exact": total_exact,
+        "next": next_cursor,
+        "results": [{c: r[c] for c in COLUMNS} for r in rows]
     })
 
 @app.route("/")
 def index():
-    return render_template("index.html", columns=COLUMNS, sources=list(DB_FILES))
+    return render_template("index.html", columns=COLUMNS, sources=get_sources())
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)